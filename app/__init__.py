@@ -1,3 +1,6 @@
 from app.celery import app
+from app.tasks.batching import DebtBatchConsumer
+
+app.steps["consumer"].add(DebtBatchConsumer)
 
 __all__ = ("app",)
@@ -1,12 +1,50 @@
 from celery import Celery
 
-from app.config.settings import CELERY_BACKEND, CELERY_BROKER
+from app.config.settings import Settings, settings
+from app.utils.serialization import (
+    COLUMNAR_SERIALIZER,
+    register_columnar_serializer,
+)
+
+register_columnar_serializer()
+
+
+def celery_config(config: Settings) -> dict:
+    """
+    Builds the Celery configuration from the settings, so that the runtime
+    of the workers can be tuned per deployment.
 
-app = Celery("app", broker=CELERY_BROKER, backend=CELERY_BACKEND)
+    Args:
+        config (Settings): The settings of the application.
 
-app.conf.update(
-    task_default_queue="default",
-    result_expires=300,
+    Returns:
+        dict: The Celery configuration.
+    """
+    return {
+        "task_default_queue": "default",
+        "result_expires": config.CELERY_RESULT_EXPIRES,
+        "task_ignore_result": not config.CELERY_RESULT_BACKEND_ENABLED,
+        "worker_prefetch_multiplier": config.CELERY_PREFETCH_MULTIPLIER,
+        "worker_concurrency": config.WORKER_CONCURRENCY,
+        "worker_max_tasks_per_child": config.CELERY_MAX_TASKS_PER_CHILD,
+        "task_acks_late": config.CELERY_ACKS_LATE,
+        "task_reject_on_worker_lost": config.CELERY_REJECT_ON_WORKER_LOST,
+        "task_compression": config.CELERY_TASK_COMPRESSION,
+        "task_queue_max_priority": config.TASK_MAX_PRIORITY,
+        "accept_content": ["json", COLUMNAR_SERIALIZER],
+    }
+
+
+app = Celery(
+    "app",
+    broker=settings.CELERY_BROKER,
+    backend=(
+        settings.CELERY_BACKEND
+        if settings.CELERY_RESULT_BACKEND_ENABLED
+        else None
+    ),
 )
 
+app.conf.update(celery_config(settings))
+
 app.autodiscover_tasks(["app.tasks"])
@@ -1,5 +1,193 @@
-CHUNK_SIZE = 10000
-FILE_PROGRESS_KEY = "file_progress"
-CELERY_BROKER = "amqp://rabbitmq:5672//"
-CELERY_BACKEND = "redis://redis:6379/0"
-PROCESSED_DEBTS_KEY = "processed_debts"
+from typing import Literal, Optional
+
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Settings of the application, read from environment variables of the
+    same name, then from a `.env` file in the working directory, then from
+    the defaults below. Values are validated when the settings are loaded,
+    so that a typo fails at startup rather than in the middle of a job.
+
+    Tuples, such as `DUE_DATE_PRIORITIES`, are given as JSON.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    )
+
+    # Celery
+    CELERY_BROKER: str = Field(
+        "amqp://rabbitmq:5672//",
+        validation_alias=AliasChoices("CELERY_BROKER", "CELERY_BROKER_URL"),
+    )
+    CELERY_BACKEND: str = Field(
+        "redis://redis:6379/0",
+        validation_alias=AliasChoices(
+            "CELERY_BACKEND", "CELERY_RESULT_BACKEND"
+        ),
+    )
+    CELERY_RESULT_BACKEND_ENABLED: bool = True
+    CELERY_RESULT_EXPIRES: int = Field(300, gt=0)
+    CHUNK_TASKS_IGNORE_RESULT: bool = True
+    CELERY_PREFETCH_MULTIPLIER: int = Field(1, ge=0)
+    CELERY_ACKS_LATE: bool = False
+    CELERY_REJECT_ON_WORKER_LOST: bool = False
+    CELERY_MAX_TASKS_PER_CHILD: Optional[int] = Field(None, gt=0)
+    CELERY_TASK_COMPRESSION: Optional[
+        Literal["gzip", "bzip2", "zlib", "lzma", "zstd", "brotli"]
+    ] = None
+    TASK_MAX_PRIORITY: int = Field(9, ge=0, le=255)
+    DUE_DATE_PRIORITIES: tuple[tuple[int, int], ...] = (
+        (1, 9),
+        (3, 7),
+        (7, 5),
+        (30, 3),
+    )
+    WORKER_CONCURRENCY: int = Field(8, gt=0)
+    WORKER_METRICS_PORT: int = Field(9100, ge=0)
+
+    # Redis
+    REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = Field(50, gt=0)
+    REDIS_POOL_TIMEOUT: float = Field(20, gt=0)
+    REDIS_SOCKET_TIMEOUT: float = Field(10, gt=0)
+    REDIS_HEALTH_CHECK_INTERVAL: int = Field(30, ge=0)
+    FILE_PROGRESS_KEY: str = "file_progress"
+    PROCESSED_DEBTS_KEY: str = "processed_debts"
+    PROCESSING_DEBTS_KEY: str = "processing_debts"
+    PROCESSING_STATS_KEY: str = "processing_stats"
+    JOB_KEY_PREFIX: str = "job:"
+    CHECKPOINT_KEY_PREFIX: str = "checkpoint:"
+    ACTIVE_JOBS_KEY: str = "active_jobs"
+    ACTIVE_JOB_TTL: int = Field(60, gt=0)
+
+    # Ingestion and chunking
+    CHUNK_SIZE: int = Field(10000, gt=0)
+    INGESTION_WORKERS: int = Field(4, gt=0)
+    INGESTION_READ_SIZE: int = Field(1024 * 1024, gt=0)
+    UPLOAD_STORAGE_DIR: str = "/data/uploads"
+    CLAIM_CHECK_RANGE_BYTES: int = Field(4 * 1024 * 1024, gt=0)
+    CHUNK_BLOCK_ROWS: int = Field(500, gt=0)
+    CHUNK_MIN_ROWS: int = Field(500, gt=0)
+    CHUNK_MAX_ROWS: int = Field(50000, gt=0)
+    CHUNK_TARGET_SECONDS: float = Field(20.0, gt=0)
+    CHUNKS_PER_WORKER: int = Field(4, gt=0)
+    CHUNK_STATS_WINDOW: int = Field(600, gt=0)
+
+    # Dispatch and processing
+    DISPATCH_MAX_IN_FLIGHT: int = Field(32, gt=0)
+    DISPATCH_MIN_IN_FLIGHT: int = Field(4, gt=0)
+    DISPATCH_POLL_INTERVAL: float = Field(0.5, gt=0)
+    PIPELINE_MODE: Literal["inline", "staged"] = "inline"
+    CHUNK_EXECUTION_MODE: Literal["sync", "asyncio"] = "sync"
+    ASYNC_CONCURRENCY: int = Field(100, gt=0)
+    CHUNK_ERROR_SAMPLES: int = Field(10, ge=0)
+    JOB_EVENTS_INTERVAL: float = Field(1.0, gt=0)
+    DEDUP_BACKEND: Literal["set", "sharded"] = "set"
+    DEDUP_SHARDS: int = Field(64, gt=0)
+    DEDUP_CLAIM_TTL: int = Field(300, gt=0)
+    DEBT_BATCH_ENABLED: bool = True
+    DEBT_BATCH_QUEUE: str = "debt_batch_queue"
+    DEBT_BATCH_SIZE: int = Field(500, gt=0)
+    DEBT_BATCH_MAX_WAIT: float = Field(0.2, gt=0)
+
+    # Email
+    EMAIL_BACKEND: Literal["simulated", "smtp"] = "simulated"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_SENDER: str = "billing@example.com"
+    SMTP_POOL_SIZE: int = Field(4, gt=0)
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = Field(100, gt=0)
+    SMTP_MAX_RETRIES: int = Field(3, ge=0)
+    SMTP_RETRY_BACKOFF: float = Field(0.5, ge=0)
+    SMTP_TIMEOUT: float = Field(30, gt=0)
+
+    # Boletos
+    BOLETO_BACKEND: Literal["simulated", "pdf"] = "simulated"
+    BOLETO_BANK_CODE: str = "001"
+    BOLETO_BENEFICIARY: str = "Async Billing System"
+    BOLETO_OUTPUT_DIR: str = "/data/boletos"
+
+    # Logging
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_QUEUE_ENABLED: bool = False
+    DEBT_LOG_MODE: Literal["all", "sample", "summary"] = "all"
+    DEBT_LOG_SAMPLE_RATE: float = Field(0.01, ge=0, le=1)
+
+
+settings = Settings()
+
+# Module-level names, imported throughout the application.
+CELERY_BROKER = settings.CELERY_BROKER
+CELERY_BACKEND = settings.CELERY_BACKEND
+CELERY_RESULT_BACKEND_ENABLED = settings.CELERY_RESULT_BACKEND_ENABLED
+CELERY_RESULT_EXPIRES = settings.CELERY_RESULT_EXPIRES
+CHUNK_TASKS_IGNORE_RESULT = settings.CHUNK_TASKS_IGNORE_RESULT
+CELERY_PREFETCH_MULTIPLIER = settings.CELERY_PREFETCH_MULTIPLIER
+CELERY_ACKS_LATE = settings.CELERY_ACKS_LATE
+CELERY_REJECT_ON_WORKER_LOST = settings.CELERY_REJECT_ON_WORKER_LOST
+CELERY_MAX_TASKS_PER_CHILD = settings.CELERY_MAX_TASKS_PER_CHILD
+CELERY_TASK_COMPRESSION = settings.CELERY_TASK_COMPRESSION
+TASK_MAX_PRIORITY = settings.TASK_MAX_PRIORITY
+DUE_DATE_PRIORITIES = settings.DUE_DATE_PRIORITIES
+WORKER_CONCURRENCY = settings.WORKER_CONCURRENCY
+WORKER_METRICS_PORT = settings.WORKER_METRICS_PORT
+REDIS_URL = settings.REDIS_URL
+REDIS_MAX_CONNECTIONS = settings.REDIS_MAX_CONNECTIONS
+REDIS_POOL_TIMEOUT = settings.REDIS_POOL_TIMEOUT
+REDIS_SOCKET_TIMEOUT = settings.REDIS_SOCKET_TIMEOUT
+REDIS_HEALTH_CHECK_INTERVAL = settings.REDIS_HEALTH_CHECK_INTERVAL
+FILE_PROGRESS_KEY = settings.FILE_PROGRESS_KEY
+PROCESSED_DEBTS_KEY = settings.PROCESSED_DEBTS_KEY
+PROCESSING_DEBTS_KEY = settings.PROCESSING_DEBTS_KEY
+PROCESSING_STATS_KEY = settings.PROCESSING_STATS_KEY
+JOB_KEY_PREFIX = settings.JOB_KEY_PREFIX
+CHECKPOINT_KEY_PREFIX = settings.CHECKPOINT_KEY_PREFIX
+ACTIVE_JOBS_KEY = settings.ACTIVE_JOBS_KEY
+ACTIVE_JOB_TTL = settings.ACTIVE_JOB_TTL
+CHUNK_SIZE = settings.CHUNK_SIZE
+INGESTION_WORKERS = settings.INGESTION_WORKERS
+INGESTION_READ_SIZE = settings.INGESTION_READ_SIZE
+UPLOAD_STORAGE_DIR = settings.UPLOAD_STORAGE_DIR
+CLAIM_CHECK_RANGE_BYTES = settings.CLAIM_CHECK_RANGE_BYTES
+CHUNK_BLOCK_ROWS = settings.CHUNK_BLOCK_ROWS
+CHUNK_MIN_ROWS = settings.CHUNK_MIN_ROWS
+CHUNK_MAX_ROWS = settings.CHUNK_MAX_ROWS
+CHUNK_TARGET_SECONDS = settings.CHUNK_TARGET_SECONDS
+CHUNKS_PER_WORKER = settings.CHUNKS_PER_WORKER
+CHUNK_STATS_WINDOW = settings.CHUNK_STATS_WINDOW
+DISPATCH_MAX_IN_FLIGHT = settings.DISPATCH_MAX_IN_FLIGHT
+DISPATCH_MIN_IN_FLIGHT = settings.DISPATCH_MIN_IN_FLIGHT
+DISPATCH_POLL_INTERVAL = settings.DISPATCH_POLL_INTERVAL
+PIPELINE_MODE = settings.PIPELINE_MODE
+CHUNK_EXECUTION_MODE = settings.CHUNK_EXECUTION_MODE
+ASYNC_CONCURRENCY = settings.ASYNC_CONCURRENCY
+CHUNK_ERROR_SAMPLES = settings.CHUNK_ERROR_SAMPLES
+JOB_EVENTS_INTERVAL = settings.JOB_EVENTS_INTERVAL
+DEDUP_BACKEND = settings.DEDUP_BACKEND
+DEDUP_SHARDS = settings.DEDUP_SHARDS
+DEDUP_CLAIM_TTL = settings.DEDUP_CLAIM_TTL
+DEBT_BATCH_ENABLED = settings.DEBT_BATCH_ENABLED
+DEBT_BATCH_QUEUE = settings.DEBT_BATCH_QUEUE
+DEBT_BATCH_SIZE = settings.DEBT_BATCH_SIZE
+DEBT_BATCH_MAX_WAIT = settings.DEBT_BATCH_MAX_WAIT
+EMAIL_BACKEND = settings.EMAIL_BACKEND
+SMTP_HOST = settings.SMTP_HOST
+SMTP_PORT = settings.SMTP_PORT
+SMTP_SENDER = settings.SMTP_SENDER
+SMTP_POOL_SIZE = settings.SMTP_POOL_SIZE
+SMTP_MAX_MESSAGES_PER_CONNECTION = settings.SMTP_MAX_MESSAGES_PER_CONNECTION
+SMTP_MAX_RETRIES = settings.SMTP_MAX_RETRIES
+SMTP_RETRY_BACKOFF = settings.SMTP_RETRY_BACKOFF
+SMTP_TIMEOUT = settings.SMTP_TIMEOUT
+BOLETO_BACKEND = settings.BOLETO_BACKEND
+BOLETO_BANK_CODE = settings.BOLETO_BANK_CODE
+BOLETO_BENEFICIARY = settings.BOLETO_BENEFICIARY
+BOLETO_OUTPUT_DIR = settings.BOLETO_OUTPUT_DIR
+LOG_FORMAT = settings.LOG_FORMAT
+LOG_QUEUE_ENABLED = settings.LOG_QUEUE_ENABLED
+DEBT_LOG_MODE = settings.DEBT_LOG_MODE
+DEBT_LOG_SAMPLE_RATE = settings.DEBT_LOG_SAMPLE_RATE
@@ -0,0 +1,392 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Optional
+
+from fastapi import UploadFile
+
+from app.config.settings import (
+    CHUNK_BLOCK_ROWS,
+    DISPATCH_MAX_IN_FLIGHT,
+    DISPATCH_MIN_IN_FLIGHT,
+    DISPATCH_POLL_INTERVAL,
+    INGESTION_READ_SIZE,
+    INGESTION_WORKERS,
+)
+from app.tasks.tasks import (
+    complete_job,
+    delete_job_file,
+    process_chunk_task,
+    process_file_range_task,
+)
+from app.utils.checkpoint import ChunkCheckpoint
+from app.utils.chunking import ChunkSizer
+from app.utils.csv_stream import CsvChunk, CsvChunkStream
+from app.utils.jobs import JobTracker
+from app.utils.logger import logger
+from app.utils.metrics import JOB_DISPATCH_SECONDS
+from app.utils.redis_client import redis_client
+from app.utils.scheduling import chunk_priority
+from app.utils.serialization import count_records
+
+ingestion_executor = ThreadPoolExecutor(
+    max_workers=INGESTION_WORKERS, thread_name_prefix="ingestion"
+)
+
+
+def resume_checkpoint(filename: str) -> Callable[[str], set[str]]:
+    """
+    Returns the `completed_blocks` callback of a `CsvChunkStream` for an
+    upload, which loads the checkpoint of the file content and registers
+    it under the file name.
+
+    Args:
+        filename (str): The name of the uploaded file.
+
+    Returns:
+        Callable[[str], set[str]]: Called with the digest of the first
+        block, returns the digests of the completed blocks.
+    """
+
+    def completed_blocks(root: str) -> set[str]:
+        checkpoint = ChunkCheckpoint(redis_client, root)
+        checkpoint.register(filename)
+        return checkpoint.completed()
+
+    return completed_blocks
+
+
+def chunk_sizer() -> ChunkSizer:
+    """
+    Returns a `ChunkSizer` for a new upload, based on the processing time
+    observed by the workers so far.
+
+    Returns:
+        ChunkSizer: The sizer.
+    """
+    return ChunkSizer.from_stats(redis_client)
+
+
+def file_size(fileobj: BinaryIO) -> Optional[int]:
+    """
+    Returns the number of bytes left in a file object, without moving it.
+
+    Args:
+        fileobj (BinaryIO): The file object.
+
+    Returns:
+        int | None: The number of bytes left, or None if the file object
+        is not seekable.
+    """
+    try:
+        position = fileobj.tell()
+        end = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(position)
+    except (AttributeError, OSError):
+        return None
+    return end - position
+
+
+class JobCancelled(Exception):
+    """
+    Raised by a `ChunkDispatcher` when its job has been cancelled.
+    """
+
+
+class ChunkDispatcher:
+    """
+    Feeds the chunks of a job to the broker with bounded backpressure.
+
+    At most `max_in_flight` chunks of the job are queued or being processed
+    at any time: once that many are in flight, `submit` blocks until the
+    workers complete some of them, as counted in the job (see
+    `app.utils.jobs.JobTracker`). The broker never holds more than a
+    window of each job, and there is no wall-clock limit on how long a job
+    may take.
+
+    The window is shared fairly between the jobs being dispatched at the
+    same time: with N concurrent jobs, each one may only have
+    `max_in_flight / N` chunks in flight (but at least `min_in_flight`),
+    so a small upload waits behind a bounded part of a giant one. Chunks
+    are sent with the priority of their most urgent debt (see
+    `app.utils.scheduling.chunk_priority`), so the workers pick chunks due
+    soon first among the queued ones.
+
+    The job is only read while the window is full, so dispatching is free
+    while the workers keep up. A cancelled job is noticed at that point,
+    and its already queued chunks are skipped by the workers.
+
+    Attributes:
+        job_id (str): The ID of the job.
+        max_in_flight (int): The maximum number of chunks in flight, for
+        a job dispatched alone.
+        min_in_flight (int): The minimum number of chunks in flight, with
+        many jobs dispatched at the same time.
+        poll_interval (float): Seconds to wait between two reads of the
+        job while the window is full.
+        dispatched (int): The number of chunks dispatched so far.
+        window (int): The current number of chunks the job may have in
+        flight.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        max_in_flight: int = DISPATCH_MAX_IN_FLIGHT,
+        poll_interval: float = DISPATCH_POLL_INTERVAL,
+        min_in_flight: int = DISPATCH_MIN_IN_FLIGHT,
+    ):
+        self.job_id = job_id
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min(min_in_flight, max_in_flight)
+        self.poll_interval = poll_interval
+        self.dispatched = 0
+        self.window = max_in_flight
+        self._completed = 0
+        self._tracker = JobTracker(redis_client)
+
+    def _wait_for_capacity(self) -> None:
+        while self.dispatched - self._completed >= self.window:
+            cancelled, self._completed, active_jobs = (
+                self._tracker.dispatch_state(self.job_id)
+            )
+            if cancelled:
+                raise JobCancelled(f"Job {self.job_id} was cancelled")
+            self.window = max(
+                self.min_in_flight, self.max_in_flight // max(active_jobs, 1)
+            )
+            if self.dispatched - self._completed >= self.window:
+                time.sleep(self.poll_interval)
+
+    def submit(
+        self, task, *args, rows: int = 0, priority: Optional[int] = None
+    ) -> None:
+        """
+        Sends a task of the job to the broker once the window has room
+        for it, and records it in the job.
+
+        Args:
+            task: The Celery task to send.
+            *args: The arguments of the task.
+            rows (int): The number of rows of the task, or 0 if unknown.
+            priority (int, optional): The priority of the task, from 0 up
+            to `TASK_MAX_PRIORITY`.
+
+        Raises:
+            JobCancelled: If the job has been cancelled.
+        """
+        self._wait_for_capacity()
+        task.apply_async(args, priority=priority)
+        self.dispatched += 1
+        pipeline = redis_client.pipeline(transaction=False)
+        self._tracker.record_dispatch(self.job_id, 1, rows, client=pipeline)
+        self._tracker.heartbeat(self.job_id, client=pipeline)
+        pipeline.execute()
+
+    def submit_chunk(
+        self, chunk: CsvChunk, root: str, priority: Optional[int] = None
+    ) -> None:
+        """
+        Sends a chunk of records to the workers, with the priority of its
+        most urgent debt.
+
+        The worker commits the blocks of the chunk to the checkpoint of the
+        file once it has been processed, so that they are skipped if the
+        file is uploaded again.
+
+        Args:
+            chunk (CsvChunk): The chunk.
+            root (str): The digest of the first block of the file.
+            priority (int, optional): The priority of the chunk, if already
+            computed.
+
+        Raises:
+            JobCancelled: If the job has been cancelled.
+        """
+        self.submit(
+            process_chunk_task,
+            chunk.data,
+            self.job_id,
+            [root, *chunk.digests],
+            rows=count_records(chunk.data),
+            priority=(
+                priority
+                if priority is not None
+                else chunk_priority(chunk.data)
+            ),
+        )
+
+    def close(self) -> None:
+        """
+        Releases the share of the dispatch capacity held by the job.
+        Errors are logged, as the share expires on its own anyway.
+        """
+        if not self.dispatched:
+            return
+        try:
+            self._tracker.finish_dispatch(self.job_id)
+        except Exception as e:
+            logger.error(f"Error releasing dispatch of job {self.job_id}: {e}")
+
+
+def detach_upload(file: UploadFile) -> BinaryIO:
+    """
+    Returns a file object for the upload that outlives the request.
+
+    FastAPI closes uploaded files once the endpoint returns, so the
+    ingestion pool cannot read from them directly. The spooled upload is
+    rolled over to disk and its file descriptor duplicated, which avoids
+    copying the data. Uploads without a file descriptor are copied to
+    a temporary file instead.
+
+    Args:
+        file (UploadFile): The uploaded file.
+
+    Returns:
+        BinaryIO: A file object positioned at the start of the upload.
+    """
+    try:
+        file.file.flush()
+        fileobj = os.fdopen(os.dup(file.file.fileno()), "rb")
+    except (AttributeError, OSError):
+        fileobj = tempfile.TemporaryFile()
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def run_dispatch(
+    job_id: str, dispatch: Callable[[ChunkDispatcher], None]
+) -> None:
+    """
+    Runs the dispatch of a job through a `ChunkDispatcher`, then marks the
+    job as dispatched, completing it if all of its chunks already
+    completed, or as failed if an error occurs. A cancelled job is
+    left as it is. The stored file of a failed or cancelled job, if any,
+    is deleted (see `app.tasks.tasks.delete_job_file`). The dispatch time
+    is recorded in `app.utils.metrics.JOB_DISPATCH_SECONDS`.
+
+    Args:
+        job_id (str): The ID of the job.
+        dispatch (Callable[[ChunkDispatcher], None]): Submits the chunks of
+        the job to the given dispatcher.
+    """
+    tracker = JobTracker(redis_client)
+    dispatcher = ChunkDispatcher(job_id)
+    try:
+        with JOB_DISPATCH_SECONDS.time():
+            dispatch(dispatcher)
+        if tracker.mark_dispatched(job_id):
+            complete_job(job_id)
+        logger.info(f"Job {job_id} dispatched {dispatcher.dispatched} chunks")
+    except JobCancelled as e:
+        logger.info(str(e))
+        delete_job_file(job_id)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed with error: {e}")
+        tracker.mark_failed(job_id, str(e))
+        delete_job_file(job_id)
+    finally:
+        dispatcher.close()
+
+
+def ingest_file(job_id: str, fileobj: BinaryIO, filename: str) -> None:
+    """
+    Parses an uploaded CSV file and dispatches its chunks to the workers.
+
+    This function runs inside the ingestion pool, away from the event loop.
+    The file is read block by block through a `CsvChunkStream`, skipping
+    the rows already completed by a previous upload of the same content
+    (see `app.utils.checkpoint.ChunkCheckpoint`). Chunks are sized from
+    the size of the file and the observed processing time (see
+    `app.utils.chunking.ChunkSizer`), and dispatched through a
+    `ChunkDispatcher`, so reading pauses while the workers are behind.
+
+    Args:
+        job_id (str): The identifier of the ingestion job.
+        fileobj (BinaryIO): The uploaded file, closed once ingested.
+        filename (str): The name of the uploaded file.
+    """
+
+    def dispatch(dispatcher: ChunkDispatcher) -> None:
+        stream = CsvChunkStream(
+            completed_blocks=resume_checkpoint(filename),
+            block_size=CHUNK_BLOCK_ROWS,
+            sizer=chunk_sizer(),
+            total_bytes=file_size(fileobj),
+        )
+        while True:
+            data = fileobj.read(INGESTION_READ_SIZE)
+            pieces = stream.feed(data) if data else stream.close()
+            for chunk in pieces:
+                dispatcher.submit_chunk(chunk, stream.root)
+            if not data:
+                break
+
+    try:
+        run_dispatch(job_id, dispatch)
+    finally:
+        fileobj.close()
+
+
+def dispatch_chunks(job_id: str, chunks: list[CsvChunk], root: str) -> None:
+    """
+    Dispatches already parsed chunks of a job to the workers, the most
+    urgent ones first (see `app.utils.scheduling.chunk_priority`).
+
+    This function runs in the background, as it may wait for the workers
+    to catch up.
+
+    Args:
+        job_id (str): The ID of the job.
+        chunks (list[CsvChunk]): The chunks.
+        root (str): The digest of the first block of the file.
+    """
+
+    def dispatch(dispatcher: ChunkDispatcher) -> None:
+        priorities = [chunk_priority(chunk.data) for chunk in chunks]
+        order = sorted(
+            range(len(chunks)), key=lambda i: priorities[i], reverse=True
+        )
+        for i in order:
+            dispatcher.submit_chunk(chunks[i], root, priorities[i])
+
+    run_dispatch(job_id, dispatch)
+
+
+def dispatch_file_ranges(
+    job_id: str,
+    file_id: str,
+    root: str,
+    ranges: list[tuple[int, int, str]],
+) -> None:
+    """
+    Dispatches the byte ranges of a stored file to the workers, in
+    claim-check mode.
+
+    This function runs inside the ingestion pool, as it may wait for the
+    workers to catch up.
+
+    Args:
+        job_id (str): The ID of the job.
+        file_id (str): The ID of the stored file.
+        root (str): The digest of the first range of the file.
+        ranges (list[tuple[int, int, str]]): The offset, length and digest
+        of each range to dispatch.
+    """
+
+    def dispatch(dispatcher: ChunkDispatcher) -> None:
+        for offset, length, digest in ranges:
+            dispatcher.submit(
+                process_file_range_task,
+                file_id,
+                offset,
+                length,
+                job_id,
+                [root, digest],
+            )
+
+    run_dispatch(job_id, dispatch)
@@ -1,17 +1,65 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-import pandas as pd
 import uvicorn
-from celery import chord
-from celery.exceptions import TimeoutError
-from fastapi import BackgroundTasks, FastAPI, HTTPException, UploadFile
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    HTTPException,
+    Request,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.config.settings import CHUNK_SIZE, FILE_PROGRESS_KEY
-from app.tasks.tasks import all_tasks_done_task, process_chunk_task
+from app.config.settings import (
+    CHUNK_BLOCK_ROWS,
+    INGESTION_READ_SIZE,
+    JOB_EVENTS_INTERVAL,
+)
+from app.ingestion import (
+    ChunkDispatcher,
+    JobCancelled,
+    chunk_sizer,
+    detach_upload,
+    dispatch_chunks,
+    dispatch_file_ranges,
+    ingest_file,
+    ingestion_executor,
+    resume_checkpoint,
+)
+from app.tasks.tasks import complete_job
+from app.utils.checkpoint import ChunkCheckpoint
+from app.utils.csv_stream import (
+    CsvChunkStream,
+    CsvStreamError,
+    MultipartCsvStream,
+)
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import AsyncJobTracker, JobTracker
 from app.utils.logger import logger
-from app.utils.redis_client import redis_client
+from app.utils.metrics import UPLOAD_PARSE_SECONDS, metrics_registry
+from app.utils.redis_client import async_redis_client, redis_client
+from app.utils.serialization import count_records
 
-web_app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Closes the connections of the asynchronous Redis client on shutdown.
+
+    :param app: The FastAPI application.
+    """
+    yield
+    await async_redis_client.connection_pool.disconnect()
+
+
+web_app = FastAPI(lifespan=lifespan)
 
 
 def validate_csv_file(file: UploadFile) -> Path:
@@ -19,7 +67,8 @@ def validate_csv_file(file: UploadFile) -> Path:
     Validate and save the uploaded CSV file.
 
     This function checks if the uploaded file is a valid CSV
-    and saves it to a temporary location.
+    and copies it, without loading it in memory, to a temporary file that
+    the caller must delete.
     If the file is invalid or empty, an HTTPException is raised.
 
     :param file: The uploaded file object to be validated and saved.
@@ -29,9 +78,9 @@ def validate_csv_file(file: UploadFile) -> Path:
     if file.content_type != "text/csv":
         raise HTTPException(status_code=400, detail="File must be a CSV")
 
-    temp_file = Path("temp_file.csv")
-    with open(temp_file, "wb") as buffer:
-        buffer.write(file.file.read())
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    temp_file = Path(buffer.name)
 
     if temp_file.stat().st_size == 0:
         temp_file.unlink()
@@ -48,76 +97,335 @@ async def upload_csv(
     Upload and process a CSV file in chunks.
 
     This endpoint allows the user to upload a CSV file. The file is validated,
-    and its contents are processed in chunks. Each chunk is handled
-    by a background task, and progress is tracked using Redis. Once all
-    chunks are processed, a final task is triggered to summarize the results.
+    and its contents are processed in chunks, sized from the number of
+    rows of the file and the observed processing time (see
+    `app.utils.chunking.ChunkSizer`). Each chunk is handled
+    by a background task, and progress is tracked using Redis: the workers
+    checkpoint every completed chunk, and uploading the same content again
+    only dispatches the rows that were never completed. Chunks are fed
+    to the broker in the background with bounded backpressure (see
+    `app.ingestion.ChunkDispatcher`), without any time limit on the job.
+    The progress and results of the job can be followed at
+    `/jobs/{job_id}`, and the job can be cancelled at
+    `/jobs/{job_id}/cancel`.
 
     :param file: The uploaded CSV file to be processed.
     :param background_tasks: FastAPI background task manager to handle
     asynchronous tasks.
-    :return: A message indicating that the file processing has started.
+    :return: A message indicating that the file processing has started,
+    along with the ID of the job.
     :raises HTTPException: If there is an error in file validation
     or processing.
     """
+    temp_file = None
     try:
         temp_file = validate_csv_file(file)
 
-        last_processed_line = (
-            redis_client.hget(FILE_PROGRESS_KEY, file.filename) or 0
+        stream = CsvChunkStream(
+            completed_blocks=resume_checkpoint(file.filename),
+            block_size=CHUNK_BLOCK_ROWS,
+            sizer=chunk_sizer(),
+            total_bytes=temp_file.stat().st_size,
         )
-        total_lines = sum(1 for _ in open(temp_file))
+        chunks = []
+        with UPLOAD_PARSE_SECONDS.labels("upload_csv").time():
+            with open(temp_file, "rb") as f:
+                for data in iter(lambda: f.read(INGESTION_READ_SIZE), b""):
+                    chunks.extend(stream.feed(data))
+            chunks.extend(stream.close())
 
-        if int(last_processed_line) >= total_lines:
+        if not chunks:
             raise HTTPException(
                 status_code=400, detail="No new rows to process"
             )
 
-        subtasks = []
-        for i, chunk in enumerate(
-            pd.read_csv(
-                temp_file,
-                chunksize=CHUNK_SIZE,
-                skiprows=int(last_processed_line),
-            )
-        ):
-            chunk_data = chunk.to_dict(orient="records")
-            subtasks.append(process_chunk_task.s(chunk_data))
-
-            redis_client.hset(
-                FILE_PROGRESS_KEY,
-                file.filename,
-                int(last_processed_line) + (i + 1) * CHUNK_SIZE,
-            )
+        job_id = JobTracker(redis_client).create(file.filename)
+        background_tasks.add_task(dispatch_chunks, job_id, chunks, stream.root)
 
-        def trigger_chord():
-            try:
-                result = chord(subtasks)(all_tasks_done_task.s())
-                logger.info(f"Process result ID: {result.id}")
-                try:
-                    final_result = result.get(timeout=60)
-                    logger.info(
-                        f"Process completed successfully.: {final_result}"
-                    )
-                except TimeoutError:
-                    logger.warning("Process timed out after 60 seconds.")
-                    partial_results = result.collect()
-                    processed_count = len(partial_results)
-                    logger.info(f"Partial tasks completed: {processed_count}")
-                    result.revoke(terminate=True)
-                    raise TimeoutError(
-                        "Processing exceeded the time limit of 60 seconds."
+        return {"message": "File processing started", "job_id": job_id}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if temp_file is not None:
+            temp_file.unlink(missing_ok=True)
+
+
+@web_app.post("/upload_csv/stream")
+async def upload_csv_stream(request: Request) -> dict:
+    """
+    Upload and process a CSV file while it is being received.
+
+    Unlike `/upload_csv`, the multipart request body is parsed
+    incrementally: each chunk is dispatched to a Celery task as soon as its
+    bytes arrive, and the line count and the hashing of the rows, used to
+    skip the rows completed by a previous upload of the same content,
+    happen in that same single pass. Chunks are sized from the
+    `Content-Length` of the request and the observed processing time (see
+    `app.utils.chunking.ChunkSizer`). The file
+    is never fully loaded in memory nor copied to disk, which keeps memory
+    usage flat for very large files. Parsing, hashing and the calls to
+    Redis and the broker run in the thread pool, so that a large upload
+    does not block the event loop. When the workers fall behind, reading
+    the request body pauses until they catch up (see
+    `app.ingestion.ChunkDispatcher`).
+
+    :param request: The incoming multipart/form-data request, with the CSV
+    file in the `file` field.
+    :return: A message indicating that the file processing has started,
+    along with the ID of the job and the number of dispatched chunks
+    and rows.
+    :raises HTTPException: If the upload is not a valid CSV, is empty,
+    its job is cancelled while it is being received, or there is an error
+    while processing it.
+    """
+    dispatcher = None
+    try:
+
+        def completed_blocks(root: str) -> set[str]:
+            return resume_checkpoint(stream.filename)(root)
+
+        content_length = request.headers.get("content-length")
+        stream = MultipartCsvStream(
+            request.headers.get("content-type", ""),
+            completed_blocks=completed_blocks,
+            block_size=CHUNK_BLOCK_ROWS,
+            sizer=await run_in_threadpool(chunk_sizer),
+            total_bytes=int(content_length) if content_length else None,
+        )
+
+        tracker = JobTracker(redis_client)
+        job_id = None
+        dispatched_rows = 0
+
+        async def dispatch(chunks: list) -> None:
+            nonlocal job_id, dispatcher, dispatched_rows
+            for chunk in chunks:
+                if dispatcher is None:
+                    job_id = await run_in_threadpool(
+                        tracker.create, stream.filename
                     )
-            except Exception as e:
-                logger.error(f"Process failed with error: {e}")
+                    dispatcher = ChunkDispatcher(job_id)
+                dispatched_rows += count_records(chunk.data)
+                await run_in_threadpool(
+                    dispatcher.submit_chunk, chunk, stream.csv.root
+                )
 
-        background_tasks.add_task(trigger_chord)
+        async for data in request.stream():
+            await dispatch(await run_in_threadpool(stream.feed, data))
+        await dispatch(await run_in_threadpool(stream.close))
 
-        return {"message": "File processing started"}
+        dispatched_chunks = dispatcher.dispatched if dispatcher else 0
+
+        if dispatched_chunks == 0:
+            raise HTTPException(
+                status_code=400, detail="No new rows to process"
+            )
+
+        if await run_in_threadpool(tracker.mark_dispatched, job_id):
+            await run_in_threadpool(complete_job, job_id)
+        logger.info(
+            f"Streamed {stream.csv.total_lines} lines from {stream.filename}"
+            f" into {dispatched_chunks} chunks"
+        )
+        return {
+            "message": "File processing started",
+            "job_id": job_id,
+            "chunks": dispatched_chunks,
+            "rows": dispatched_rows,
+        }
+    except CsvStreamError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobCancelled as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if dispatcher is not None:
+            await run_in_threadpool(dispatcher.close)
+
+
+@web_app.post("/upload_csv/async")
+async def upload_csv_async(file: UploadFile) -> dict:
+    """
+    Upload a CSV file and process it in the ingestion pool.
+
+    The endpoint only checks the file type and hands the upload over to
+    the ingestion thread pool, which parses the file, dispatches its chunks
+    to Celery and tracks its progress. It returns a job ID right away, so
+    the event loop is never blocked by disk I/O, Pandas parsing or Redis
+    calls, and the server stays responsive under many concurrent uploads.
+
+    :param file: The uploaded CSV file to be processed.
+    :return: A message indicating that the file processing has started,
+    along with the ID of the ingestion job.
+    :raises HTTPException: If the file is not a valid CSV, is empty,
+    or the job cannot be started.
+    """
+    if file.content_type != "text/csv":
+        raise HTTPException(status_code=400, detail="File must be a CSV")
+    if file.size == 0:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    try:
+        fileobj = await run_in_threadpool(detach_upload, file)
+        job_id = await run_in_threadpool(
+            JobTracker(redis_client).create, file.filename
+        )
+        ingestion_executor.submit(ingest_file, job_id, fileobj, file.filename)
+        return {"message": "File processing started", "job_id": job_id}
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@web_app.post("/upload_csv/claim_check")
+async def upload_csv_claim_check(file: UploadFile) -> dict:
+    """
+    Upload a CSV file and process it in claim-check mode.
+
+    The file is stored in the upload storage shared with the workers and
+    split into byte ranges aligned on line boundaries, without being
+    parsed. Only a (file ID, offset, length) descriptor is sent to the
+    broker for each range, and each worker reads its own range from the
+    shared storage, so large uploads do not flow through RabbitMQ. Ranges
+    completed by a previous upload of the same content are skipped. The
+    stored file is deleted once the job is completed, failed or
+    cancelled.
+
+    :param file: The uploaded CSV file to be processed.
+    :return: A message indicating that the file processing has started,
+    along with the ID of the job, the ID of the stored file and the number
+    of ranges.
+    :raises HTTPException: If the file is not a valid CSV, has no rows,
+    or there is an error while dispatching it.
+    """
+    if file.content_type != "text/csv":
+        raise HTTPException(status_code=400, detail="File must be a CSV")
+
+    try:
+        storage = LocalFileStorage()
+        file_id = await run_in_threadpool(storage.save, file.file)
+
+        def plan_pending_ranges() -> tuple[str, list[tuple[int, int, str]]]:
+            ranges = storage.plan_ranges(file_id)
+            if not ranges:
+                return "", []
+            digests = storage.range_digests(file_id, ranges)
+            checkpoint = ChunkCheckpoint(redis_client, digests[0])
+            checkpoint.register(file.filename)
+            completed = checkpoint.completed()
+            return checkpoint.root, [
+                (offset, length, digest)
+                for (offset, length), digest in zip(ranges, digests)
+                if digest not in completed
+            ]
+
+        root, ranges = await run_in_threadpool(plan_pending_ranges)
+        if not ranges:
+            await run_in_threadpool(storage.delete, file_id)
+            raise HTTPException(
+                status_code=400, detail="No new rows to process"
+            )
+
+        job_id = await run_in_threadpool(
+            JobTracker(redis_client).create, file.filename, file_id
+        )
+        ingestion_executor.submit(
+            dispatch_file_ranges, job_id, file_id, root, ranges
+        )
+        return {
+            "message": "File processing started",
+            "job_id": job_id,
+            "file_id": file_id,
+            "chunks": len(ranges),
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@web_app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict:
+    """
+    Get the progress of an upload job.
+
+    :param job_id: The ID of the job, as returned by the upload endpoints.
+    :return: The status of the job, its dispatched, completed, processed,
+    duplicate and failed counters, its throughput in rows per second and
+    its estimated time to completion in seconds.
+    :raises HTTPException: If the job does not exist or there is an error
+    while reading it.
+    """
+    try:
+        job = await AsyncJobTracker(async_redis_client).get(job_id)
+    except Exception as e:
+        logger.error(f"Error reading job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@web_app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str) -> StreamingResponse:
+    """
+    Stream the progress of an upload job as Server-Sent Events.
+
+    An event holding the same data as `/jobs/{job_id}` is sent every
+    `JOB_EVENTS_INTERVAL` seconds, until the job is completed, failed or
+    cancelled.
+
+    :param job_id: The ID of the job, as returned by the upload endpoints.
+    :return: A `text/event-stream` response.
+    :raises HTTPException: If the job does not exist.
+    """
+    tracker = AsyncJobTracker(async_redis_client)
+    job = await tracker.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        progress = job
+        while progress is not None:
+            yield f"data: {json.dumps(progress)}\n\n"
+            if progress["status"] in ("completed", "failed", "cancelled"):
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+            progress = await tracker.get(job_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@web_app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> dict:
+    """
+    Cancel an upload job.
+
+    No further chunk of the job is dispatched, and the chunks already
+    queued are skipped by the workers. Chunks being processed are
+    completed.
+
+    :param job_id: The ID of the job, as returned by the upload endpoints.
+    :return: A message indicating the job has been cancelled.
+    :raises HTTPException: If the job does not exist or there is an error
+    while cancelling it.
+    """
+    try:
+        found = await AsyncJobTracker(async_redis_client).cancel(job_id)
+    except Exception as e:
+        logger.error(f"Error cancelling job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not found:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": f"Job {job_id} has been cancelled."}
 
 
 @web_app.post("/reset_progress")
@@ -127,7 +435,8 @@ async def reset_progress(file_name: str) -> dict:
 
     This endpoint allows the user to reset the progress of a specific file
     that is being processed. The progress is tracked using Redis, and calling
-    this function removes the associated progress data.
+    this function removes the checkpoint of the latest upload of that file
+    name, so that all of its chunks are dispatched again.
 
     :param file_name: The name of the file for which the progress should
     be reset.
@@ -135,12 +444,27 @@ async def reset_progress(file_name: str) -> dict:
     :raises HTTPException: If an error occurs while resetting the progress.
     """
     try:
-        redis_client.hdel(FILE_PROGRESS_KEY, file_name)
+        ChunkCheckpoint.reset(redis_client, file_name)
         return {"message": f"Progress for {file_name} has been reset."}
     except Exception as e:
         logger.error(f"Error resetting progress for {file_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to reset progress")
 
 
+@web_app.get("/metrics")
+def metrics() -> Response:
+    """
+    Expose the metrics of the API in the Prometheus text format.
+
+    The metrics of the Celery workers are served by each worker on
+    `WORKER_METRICS_PORT` (see `app.utils.metrics`).
+
+    :return: The current value of every metric.
+    """
+    return Response(
+        generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(web_app, host="0.0.0.0", port=8000)
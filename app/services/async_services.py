@@ -0,0 +1,81 @@
+import asyncio
+from typing import Optional
+
+from pydantic import EmailStr
+
+from app.models import DebtRecord
+from app.services.interfaces import (
+    IAsyncBoletoService,
+    IAsyncEmailService,
+    IBoletoService,
+    IEmailService,
+)
+
+
+class ThreadedBoletoService(IAsyncBoletoService):
+    """
+    Adapts a synchronous boleto service to the asynchronous interface.
+
+    Each call runs in the default executor of the event loop, so that
+    blocking backends can be driven by the asyncio chunk processor. A
+    batch of debts is handed to the batch method of the service in a
+    single thread, as the boletos are rendered by CPU-bound code that
+    threads would not speed up (see `app.services.boleto_engine`).
+
+    Attributes:
+        service (IBoletoService): The wrapped synchronous service.
+    """
+
+    def __init__(self, service: IBoletoService):
+        self.service = service
+
+    async def generate_boleto(self, debt: DebtRecord) -> None:
+        """
+        Generates a boleto for the given debt record in a thread.
+
+        Args:
+            debt (DebtRecord): The debt record.
+        """
+        await asyncio.to_thread(self.service.generate_boleto, debt)
+
+    async def generate_boletos(
+        self, debts: list[DebtRecord], concurrency: int
+    ) -> list[Optional[Exception]]:
+        """
+        Generates the boletos of many debt records in a single thread,
+        through the batch method of the service.
+
+        Args:
+            debts (list[DebtRecord]): The debt records.
+            concurrency (int): Unused, as the batch is generated at once.
+
+        Returns:
+            list[Optional[Exception]]: One result per debt, in the same
+            order: None on success, or the exception raised for that debt.
+        """
+        return await asyncio.to_thread(self.service.generate_boletos, debts)
+
+
+class ThreadedEmailService(IAsyncEmailService):
+    """
+    Adapts a synchronous email service to the asynchronous interface.
+
+    Each call runs in the default executor of the event loop, so that
+    blocking backends can be driven by the asyncio chunk processor.
+
+    Attributes:
+        service (IEmailService): The wrapped synchronous service.
+    """
+
+    def __init__(self, service: IEmailService):
+        self.service = service
+
+    async def send_email(self, email: EmailStr, message: str) -> None:
+        """
+        Sends an email to the given email address in a thread.
+
+        Args:
+            email (EmailStr): The recipient's email address.
+            message (str): The message to be sent in the email.
+        """
+        await asyncio.to_thread(self.service.send_email, email, message)
@@ -0,0 +1,451 @@
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.config.settings import (
+    BOLETO_BANK_CODE,
+    BOLETO_BENEFICIARY,
+    BOLETO_OUTPUT_DIR,
+)
+from app.models import DebtRecord
+from app.services.interfaces import IBoletoSink
+
+CURRENCY_CODE = "9"
+DUE_FACTOR_BASE = date(1997, 10, 7)
+MAX_AMOUNT_CENTS = 10**10 - 1
+
+# Interleaved 2 of 5 patterns, True for wide elements.
+I25_PATTERNS = np.array(
+    [
+        [c == "w" for c in pattern]
+        for pattern in (
+            "nnwwn",
+            "wnnnw",
+            "nwnnw",
+            "wwnnn",
+            "nnwnw",
+            "wnwnn",
+            "nwwnn",
+            "nnnww",
+            "wnnwn",
+            "nwnwn",
+        )
+    ]
+)
+BAR_NARROW = 1.0
+BAR_WIDE = 3.0
+BAR_HEIGHT = 50.0
+BAR_X = 40.0
+BAR_Y = 60.0
+
+
+def due_factors(due_dates: list[datetime]) -> np.ndarray:
+    """
+    Computes the FEBRABAN due date factors of many dates.
+
+    The factor counts the days since 1997-10-07 and, as specified by
+    FEBRABAN, restarts at 1000 after reaching 9999 (on 2025-02-22).
+
+    Args:
+        due_dates (list[datetime]): The due dates.
+
+    Returns:
+        np.ndarray: The factors, -1 for dates before the base date.
+    """
+    days = (
+        np.array(
+            [
+                due.date() if isinstance(due, datetime) else due
+                for due in due_dates
+            ],
+            dtype="datetime64[D]",
+        )
+        - np.datetime64(DUE_FACTOR_BASE)
+    ).astype(np.int64)
+    factors = np.where(days > 9999, (days - 10000) % 9000 + 1000, days)
+    return np.where(days < 0, -1, factors)
+
+
+def mod10(digits: np.ndarray) -> np.ndarray:
+    """
+    Computes the modulo 10 check digit of each row of a digit matrix.
+
+    Args:
+        digits (np.ndarray): A (rows, length) matrix of digits.
+
+    Returns:
+        np.ndarray: The check digit of each row.
+    """
+    weights = np.where(np.arange(digits.shape[1])[::-1] % 2 == 0, 2, 1)
+    products = digits * weights
+    total = (products // 10 + products % 10).sum(axis=1)
+    return (10 - total % 10) % 10
+
+
+def mod11(digits: np.ndarray) -> np.ndarray:
+    """
+    Computes the modulo 11 check digit of each row of a digit matrix,
+    as used for the general check digit of the barcode.
+
+    Args:
+        digits (np.ndarray): A (rows, length) matrix of digits.
+
+    Returns:
+        np.ndarray: The check digit of each row. Results of 0, 10 and 11
+        are replaced by 1.
+    """
+    weights = np.arange(digits.shape[1])[::-1] % 8 + 2
+    check = 11 - (digits * weights).sum(axis=1) % 11
+    return np.where((check == 0) | (check > 9), 1, check)
+
+
+def _digit_matrix(values: list[str], width: int) -> np.ndarray:
+    raw = np.frombuffer("".join(values).encode("ascii"), dtype=np.uint8)
+    return (raw - ord("0")).astype(np.int64).reshape(len(values), width)
+
+
+def _join_digits(digits: np.ndarray) -> list[str]:
+    chars = (digits + ord("0")).astype(np.uint8)
+    return [
+        value.decode("ascii")
+        for value in chars.view(f"S{digits.shape[1]}").ravel()
+    ]
+
+
+def compute_codes(
+    amounts_cents: np.ndarray,
+    factors: np.ndarray,
+    free_fields: list[str],
+    bank_code: str = BOLETO_BANK_CODE,
+) -> tuple[list[str], list[str]]:
+    """
+    Computes the barcodes and digitable lines of many boletos at once.
+
+    The 44-digit barcode holds the bank code, the currency code, the
+    general check digit (modulo 11), the due date factor, the amount in
+    cents and the 25-digit free field. The 47-digit digitable line splits
+    it into five fields, the first three with their own modulo 10 check
+    digit. All check digits are computed on digit matrices, for the whole
+    batch at once.
+
+    Args:
+        amounts_cents (np.ndarray): The amounts, in cents.
+        factors (np.ndarray): The due date factors.
+        free_fields (list[str]): The 25-digit free fields.
+        bank_code (str): The 3-digit bank code.
+
+    Returns:
+        tuple[list[str], list[str]]: The barcodes and the digitable lines.
+    """
+    count = len(free_fields)
+    if count == 0:
+        return [], []
+    prefix = np.tile(_digit_matrix([bank_code + CURRENCY_CODE], 4), (count, 1))
+    factor_digits = _digit_matrix([f"{f:04d}" for f in factors], 4)
+    amount_digits = _digit_matrix([f"{a:010d}" for a in amounts_cents], 10)
+    free_digits = _digit_matrix(free_fields, 25)
+
+    body = np.hstack([prefix, factor_digits, amount_digits, free_digits])
+    general = mod11(body)[:, None]
+    barcode = np.hstack([prefix, general, body[:, 4:]])
+
+    field1 = np.hstack([prefix, free_digits[:, :5]])
+    field2 = free_digits[:, 5:15]
+    field3 = free_digits[:, 15:]
+    line = np.hstack(
+        [
+            field1,
+            mod10(field1)[:, None],
+            field2,
+            mod10(field2)[:, None],
+            field3,
+            mod10(field3)[:, None],
+            general,
+            factor_digits,
+            amount_digits,
+        ]
+    )
+    return _join_digits(barcode), _join_digits(line)
+
+
+def format_digitable_line(line: str) -> str:
+    """
+    Formats a 47-digit digitable line the way it is printed on boletos.
+
+    Args:
+        line (str): The digitable line digits.
+
+    Returns:
+        str: The formatted line, e.g.
+        "00190.00009 01234.567890 12345.678901 2 12340000010000".
+    """
+    return (
+        f"{line[0:5]}.{line[5:10]} {line[10:15]}.{line[15:21]} "
+        f"{line[21:26]}.{line[26:32]} {line[32]} {line[33:]}"
+    )
+
+
+def barcode_bars(barcodes: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the geometry of the Interleaved 2 of 5 bars of many barcodes.
+
+    Every 44-digit barcode is made of exactly 114 bars, so the positions
+    and widths of the bars of the whole batch are computed as matrices.
+
+    Args:
+        barcodes (list[str]): The 44-digit barcodes.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The x positions and the widths of
+        the bars, as (barcodes, 114) matrices.
+    """
+    digits = _digit_matrix(barcodes, 44)
+    bars_wide = I25_PATTERNS[digits[:, 0::2]]
+    spaces_wide = I25_PATTERNS[digits[:, 1::2]]
+    pairs = np.stack([bars_wide, spaces_wide], axis=-1).reshape(
+        len(barcodes), -1
+    )
+    wide = np.hstack(
+        [
+            np.zeros((len(barcodes), 4), dtype=bool),
+            pairs,
+            np.tile([True, False, False], (len(barcodes), 1)),
+        ]
+    )
+    widths = np.where(wide, BAR_WIDE, BAR_NARROW)
+    starts = BAR_X + np.cumsum(widths, axis=1) - widths
+    return starts[:, 0::2], widths[:, 0::2]
+
+
+def _pdf_string(raw: bytes) -> bytes:
+    return (
+        raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    )
+
+
+def _pdf_text(value: str, width: int) -> bytes:
+    raw = value.encode("latin-1", errors="replace")[:width]
+    text = _pdf_string(raw)
+    while len(text) > width:
+        raw = raw[:-1]
+        text = _pdf_string(raw)
+    return text.ljust(width)
+
+
+class BoletoPdfTemplate:
+    """
+    Pre-rendered single-page PDF boleto with fixed-width field slots.
+
+    The whole document, including its cross-reference table, is rendered
+    once. Every per-debt field is a fixed-width slot in the page content,
+    padded with spaces, and the barcode is a fixed number of fixed-width
+    rectangles, so filling a boleto is a matter of copying the template
+    and overwriting the slots, without re-laying out the page or
+    recomputing any offset.
+    """
+
+    FIELDS = {
+        "name": (60, 50, 700),
+        "government_id": (20, 50, 660),
+        "debt_id": (36, 50, 620),
+        "due_date": (10, 50, 580),
+        "amount": (20, 250, 580),
+        "digitable_line": (54, 50, 200),
+    }
+    BAR_FORMAT = "{:07.2f} {:06.2f} {:04.2f} {:05.2f} re\n"
+
+    def __init__(self, beneficiary: str = BOLETO_BENEFICIARY):
+        content = bytearray(b"BT /F1 16 Tf 50 780 Td (Boleto) Tj ET\n")
+        for label, y in (
+            ("Benefici\xe1rio: " + beneficiary, 750),
+            ("Pagador", 715),
+            ("CPF/CNPJ", 675),
+            ("N\xfamero do documento", 635),
+            ("Vencimento", 595),
+            ("Valor do documento", 595),
+            ("Linha digit\xe1vel", 215),
+        ):
+            x = 250 if label == "Valor do documento" else 50
+            content += (
+                f"BT /F1 8 Tf {x} {y} Td (".encode()
+                + _pdf_string(label.encode("latin-1", errors="replace"))
+                + b") Tj ET\n"
+            )
+
+        slots = {}
+        for field, (width, x, y) in self.FIELDS.items():
+            size = 12 if field == "digitable_line" else 10
+            content += f"BT /F1 {size} Tf {x} {y} Td (".encode()
+            slots[field] = (len(content), width)
+            content += b" " * width + b") Tj ET\n"
+
+        bar_size = len(self.BAR_FORMAT.format(0, 0, 0, 0))
+        content += b"0 g\n"
+        slots["bars"] = (len(content), bar_size * 114)
+        content += b" " * (bar_size * 114) + b"f\n"
+
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842]"
+            b" /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica"
+            b" /Encoding /WinAnsiEncoding >>",
+            b"<< /Length %d >>\nstream\n" % len(content),
+        ]
+        document = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(document))
+            document += b"%d 0 obj\n" % number + body
+            if number < len(objects):
+                document += b"\nendobj\n"
+        content_start = len(document)
+        document += content + b"\nendstream\nendobj\n"
+
+        xref = len(document)
+        document += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            document += b"%010d 00000 n \n" % offset
+        document += (
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, xref)
+        )
+
+        self.document = bytes(document)
+        self.slots = {
+            field: (content_start + offset, width)
+            for field, (offset, width) in slots.items()
+        }
+
+    def render(
+        self, fields: dict[str, str], bar_x: np.ndarray, bar_w: np.ndarray
+    ) -> bytes:
+        """
+        Fills the template with the fields of one boleto.
+
+        Args:
+            fields (dict[str, str]): The text of each field slot.
+            bar_x (np.ndarray): The x positions of the 114 barcode bars.
+            bar_w (np.ndarray): The widths of the 114 barcode bars.
+
+        Returns:
+            bytes: The PDF document.
+        """
+        document = bytearray(self.document)
+        for field, value in fields.items():
+            offset, width = self.slots[field]
+            end = offset + width
+            document[offset:end] = _pdf_text(value, width)
+        offset, width = self.slots["bars"]
+        end = offset + width
+        document[offset:end] = "".join(
+            self.BAR_FORMAT.format(x, BAR_Y, w, BAR_HEIGHT)
+            for x, w in zip(bar_x, bar_w)
+        ).encode("ascii")
+        return bytes(document)
+
+
+class LocalDirectoryBoletoSink(IBoletoSink):
+    """
+    Writes boleto documents to a local directory, one PDF per debt.
+
+    Attributes:
+        root (Path): The output directory.
+    """
+
+    def __init__(self, root: str = BOLETO_OUTPUT_DIR):
+        self.root = Path(root)
+
+    def write(self, debt_id: str, document: bytes) -> None:
+        """
+        Writes the boleto document of a debt to `<root>/<debt_id>.pdf`.
+
+        Args:
+            debt_id (str): The ID of the debt.
+            document (bytes): The PDF document.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / f"{debt_id}.pdf").write_bytes(document)
+
+
+class BoletoEngine:
+    """
+    Generates boleto documents for batches of debts.
+
+    The barcodes, digitable lines and bar geometries of a whole batch are
+    computed with NumPy, and each document is filled from a cached,
+    pre-rendered `BoletoPdfTemplate` before being handed over to the sink.
+    The free field of each barcode is derived from the debt ID.
+
+    Attributes:
+        bank_code (str): The 3-digit bank code.
+        template (BoletoPdfTemplate): The pre-rendered page template.
+        sink (IBoletoSink): Where the documents are written.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[IBoletoSink] = None,
+        bank_code: str = BOLETO_BANK_CODE,
+        template: Optional[BoletoPdfTemplate] = None,
+    ):
+        self.sink = sink or LocalDirectoryBoletoSink()
+        self.bank_code = bank_code
+        self.template = template or BoletoPdfTemplate()
+
+    def generate(self, debts: list[DebtRecord]) -> list[Optional[Exception]]:
+        """
+        Generates and writes the boletos of many debts.
+
+        Args:
+            debts (list[DebtRecord]): The validated debt records.
+
+        Returns:
+            list[Optional[Exception]]: One result per debt, in the same
+            order: None on success, or the exception raised for that debt.
+        """
+        amounts = np.array([debt.debtAmount for debt in debts], dtype=np.int64)
+        amounts_cents = amounts * 100
+        factors = due_factors([debt.debtDueDate for debt in debts])
+
+        results: list[Optional[Exception]] = [None] * len(debts)
+        valid = []
+        for i in range(len(debts)):
+            if not 0 <= amounts_cents[i] <= MAX_AMOUNT_CENTS:
+                results[i] = ValueError("Amount out of boleto range")
+            elif factors[i] < 0:
+                results[i] = ValueError("Due date before 1997-10-07")
+            else:
+                valid.append(i)
+
+        free_fields = [f"{debts[i].debtId.int % 10**25:025d}" for i in valid]
+        barcodes, lines = compute_codes(
+            amounts_cents[valid], factors[valid], free_fields, self.bank_code
+        )
+        bar_x, bar_w = (
+            barcode_bars(barcodes) if barcodes else (np.empty(0), np.empty(0))
+        )
+
+        for row, i in enumerate(valid):
+            debt = debts[i]
+            try:
+                document = self.template.render(
+                    {
+                        "name": debt.name,
+                        "government_id": str(debt.governmentId),
+                        "debt_id": str(debt.debtId),
+                        "due_date": debt.debtDueDate.strftime("%d/%m/%Y"),
+                        "amount": "R$ %s,00"
+                        % f"{debt.debtAmount:,}".replace(",", "."),
+                        "digitable_line": format_digitable_line(lines[row]),
+                    },
+                    bar_x[row],
+                    bar_w[row],
+                )
+                self.sink.write(str(debt.debtId), document)
+            except Exception as e:
+                results[i] = e
+        return results
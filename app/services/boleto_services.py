@@ -1,6 +1,9 @@
+from typing import Optional
+
 from app.models import DebtRecord
+from app.services.boleto_engine import BoletoEngine
 from app.services.interfaces import IBoletoService
-from app.utils.logger import logger
+from app.utils.logger import debt_logger
 
 
 class BoletoService(IBoletoService):
@@ -33,4 +36,73 @@ class BoletoService(IBoletoService):
         Returns:
             None
         """
-        logger.info(f"Simulating boleto generation for Debt ID: {debt.debtId}")
+        debt_logger.info(
+            "Simulating boleto generation for Debt ID: %s", debt.debtId
+        )
+
+
+class PdfBoletoService(IBoletoService):
+    """
+    Service class generating real boleto documents with the
+    `BoletoEngine`.
+
+    The engine, with its pre-rendered PDF template, is shared by all the
+    tasks of a worker process, and a whole batch of debts is handled by a
+    single vectorized call.
+
+    Methods:
+        generate_boleto(debt: DebtRecord) -> None:
+            Generates the boleto of a single debt.
+        generate_boletos(debts: list[DebtRecord])
+        -> list[Optional[Exception]]:
+            Generates the boletos of many debts at once.
+        get_instance() -> PdfBoletoService:
+            Returns the shared instance of the current process.
+    """
+
+    _instance = None
+
+    def __init__(self, engine: Optional[BoletoEngine] = None):
+        self.engine = engine or BoletoEngine()
+
+    @staticmethod
+    def get_instance() -> "PdfBoletoService":
+        """
+        Returns the instance shared by the tasks of the current process,
+        so that the PDF template is rendered only once.
+
+        Returns:
+            PdfBoletoService: The shared instance.
+        """
+        if PdfBoletoService._instance is None:
+            PdfBoletoService._instance = PdfBoletoService()
+        return PdfBoletoService._instance
+
+    def generate_boleto(self, debt: DebtRecord) -> None:
+        """
+        Generates the boleto of a single debt.
+
+        Args:
+            debt (DebtRecord): The debt record.
+
+        Raises:
+            Exception: If the boleto cannot be generated.
+        """
+        error = self.engine.generate([debt])[0]
+        if error is not None:
+            raise error
+
+    def generate_boletos(
+        self, debts: list[DebtRecord]
+    ) -> list[Optional[Exception]]:
+        """
+        Generates the boletos of many debts in a single engine call.
+
+        Args:
+            debts (list[DebtRecord]): The debt records.
+
+        Returns:
+            list[Optional[Exception]]: One result per debt, in the same
+            order: None on success, or the exception raised for that debt.
+        """
+        return self.engine.generate(debts)
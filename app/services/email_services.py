@@ -1,7 +1,7 @@
 from pydantic import EmailStr
 
 from app.services.interfaces import IEmailService
-from app.utils.logger import logger
+from app.utils.logger import debt_logger
 
 
 class EmailService(IEmailService):
@@ -34,6 +34,6 @@ class EmailService(IEmailService):
         Returns:
             None
         """
-        logger.info(
-            f"Simulating email sent to: {email} with message: {message}"
+        debt_logger.info(
+            "Simulating email sent to: %s with message: %s", email, message
         )
@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from pydantic import EmailStr
 
@@ -17,6 +19,9 @@ class IBoletoService(ABC):
     Methods:
         generate_boleto(debt: DebtRecord):
             Generates a boleto for the given debt record.
+        generate_boletos(debts: list[DebtRecord])
+        -> list[Optional[Exception]]:
+            Generates boletos for many debt records at once.
     """
 
     @abstractmethod
@@ -34,6 +39,31 @@ class IBoletoService(ABC):
         """
         pass
 
+    def generate_boletos(
+        self, debts: list[DebtRecord]
+    ) -> list[Optional[Exception]]:
+        """
+        Generates boletos for many debt records at once.
+
+        The default implementation calls `generate_boleto` for each debt.
+        Subclasses backed by a bulk registration API should override it.
+
+        Args:
+            debts (list[DebtRecord]): The debt records.
+
+        Returns:
+            list[Optional[Exception]]: One result per debt, in the same
+            order: None on success, or the exception raised for that debt.
+        """
+        results = []
+        for debt in debts:
+            try:
+                self.generate_boleto(debt)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
 
 class IEmailService(ABC):
     """
@@ -46,6 +76,9 @@ class IEmailService(ABC):
         send_email(email: EmailStr, message: str):
             Sends an email with the specified message to the provided
             email address.
+        send_emails(messages: list[tuple[EmailStr, str]])
+        -> list[Optional[Exception]]:
+            Sends many emails at once.
     """
 
     @abstractmethod
@@ -64,3 +97,152 @@ class IEmailService(ABC):
             a subclass.
         """
         pass
+
+    def send_emails(
+        self, messages: list[tuple[EmailStr, str]]
+    ) -> list[Optional[Exception]]:
+        """
+        Sends many emails at once.
+
+        The default implementation calls `send_email` for each message.
+        Subclasses able to pipeline deliveries, for example over a single
+        SMTP session, should override it.
+
+        Args:
+            messages (list[tuple[EmailStr, str]]): The (email address,
+            message) pairs to send.
+
+        Returns:
+            list[Optional[Exception]]: One result per message, in the same
+            order: None on success, or the exception raised for that
+            message.
+        """
+        results = []
+        for email, message in messages:
+            try:
+                self.send_email(email, message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class IAsyncBoletoService(ABC):
+    """
+    Abstract base class for asynchronous boleto services.
+
+    Asyncio-native counterpart of `IBoletoService`, for backends whose
+    boleto generation is I/O-bound (e.g. a bank registration API), so
+    that many generations can be in flight at the same time.
+
+    Methods:
+        generate_boleto(debt: DebtRecord):
+            Generates a boleto for the given debt record.
+        generate_boletos(debts: list[DebtRecord], concurrency: int)
+        -> list[Optional[Exception]]:
+            Generates boletos for many debt records at once.
+    """
+
+    @abstractmethod
+    async def generate_boleto(self, debt: DebtRecord):
+        """
+        Generates a boleto for the given debt record.
+
+        Args:
+            debt (DebtRecord): The debt record containing information
+            such as debt amount, debtor details, and due date.
+
+        Raises:
+            NotImplementedError: If this method is not implemented
+            in a subclass.
+        """
+        pass
+
+    async def generate_boletos(
+        self, debts: list[DebtRecord], concurrency: int
+    ) -> list[Optional[Exception]]:
+        """
+        Generates boletos for many debt records at once.
+
+        The default implementation calls `generate_boleto` for each debt,
+        with at most `concurrency` calls in flight at the same time.
+        Subclasses backed by a batch API should override it.
+
+        Args:
+            debts (list[DebtRecord]): The debt records.
+            concurrency (int): The maximum number of calls in flight.
+
+        Returns:
+            list[Optional[Exception]]: One result per debt, in the same
+            order: None on success, or the exception raised for that debt.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(debt: DebtRecord) -> Optional[Exception]:
+            async with semaphore:
+                try:
+                    await self.generate_boleto(debt)
+                except Exception as e:
+                    return e
+                return None
+
+        return await asyncio.gather(*(generate(debt) for debt in debts))
+
+
+class IAsyncEmailService(ABC):
+    """
+    Abstract base class for asynchronous email services.
+
+    Asyncio-native counterpart of `IEmailService`, so that many emails
+    can be in flight at the same time.
+
+    Methods:
+        send_email(email: EmailStr, message: str):
+            Sends an email with the specified message to the provided
+            email address.
+    """
+
+    @abstractmethod
+    async def send_email(self, email: EmailStr, message: str):
+        """
+        Sends an email with the specified message to the provided
+        email address.
+
+        Args:
+            email (EmailStr): The email address to which the message
+            will be sent.
+            message (str): The content of the email message.
+
+        Raises:
+            NotImplementedError: If this method is not implemented in
+            a subclass.
+        """
+        pass
+
+
+class IBoletoSink(ABC):
+    """
+    Abstract base class for boleto document sinks.
+
+    Defines where generated boleto documents are written, so that the
+    boleto engine does not depend on a specific storage.
+
+    Methods:
+        write(debt_id: str, document: bytes):
+            Writes the boleto document of a debt.
+    """
+
+    @abstractmethod
+    def write(self, debt_id: str, document: bytes):
+        """
+        Writes the boleto document of a debt.
+
+        Args:
+            debt_id (str): The ID of the debt.
+            document (bytes): The boleto document.
+
+        Raises:
+            NotImplementedError: If this method is not implemented in
+            a subclass.
+        """
+        pass
@@ -0,0 +1,237 @@
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from queue import Empty, LifoQueue
+from typing import Optional
+
+from pydantic import EmailStr
+
+from app.config.settings import (
+    SMTP_HOST,
+    SMTP_MAX_MESSAGES_PER_CONNECTION,
+    SMTP_MAX_RETRIES,
+    SMTP_POOL_SIZE,
+    SMTP_PORT,
+    SMTP_RETRY_BACKOFF,
+    SMTP_SENDER,
+    SMTP_TIMEOUT,
+)
+from app.services.interfaces import IEmailService
+from app.utils.logger import logger
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+
+
+class SMTPEmailService(IEmailService):
+    """
+    Service class sending emails through a pool of persistent SMTP
+    connections.
+
+    Connections are opened lazily, kept open between messages and reused
+    for up to `max_messages_per_connection` messages, so that many messages
+    are sent per SMTP session. At most `pool_size` connections are in use
+    at the same time, which bounds the delivery concurrency of each worker
+    process. Transient failures (4xx replies and dropped connections) are
+    retried with exponential backoff, while permanent 5xx replies are
+    raised right away. After a refused sender, recipient or message, the
+    connection is reset with `RSET` and kept in the pool.
+
+    Methods:
+        send_email(email: EmailStr, message: str) -> None:
+            Sends an email over a pooled connection.
+        send_emails(messages: list[tuple[EmailStr, str]])
+        -> list[Optional[Exception]]:
+            Sends many emails concurrently over the pooled connections.
+        close() -> None:
+            Closes the idle connections of the pool.
+        get_instance() -> SMTPEmailService:
+            Returns the shared instance of the current process.
+    """
+
+    _instance = None
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        sender: str = SMTP_SENDER,
+        pool_size: int = SMTP_POOL_SIZE,
+        max_messages_per_connection: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        max_retries: int = SMTP_MAX_RETRIES,
+        retry_backoff: float = SMTP_RETRY_BACKOFF,
+        timeout: float = SMTP_TIMEOUT,
+        subject: str = "Your boleto is ready",
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.pool_size = pool_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.subject = subject
+        self._idle: LifoQueue = LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    @staticmethod
+    def get_instance() -> "SMTPEmailService":
+        """
+        Returns the instance shared by the tasks of the current process,
+        so that its connections are reused across chunks.
+
+        Returns:
+            SMTPEmailService: The shared instance.
+        """
+        if SMTPEmailService._instance is None:
+            SMTPEmailService._instance = SMTPEmailService()
+        return SMTPEmailService._instance
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo_or_helo_if_needed()
+        return _PooledConnection(smtp)
+
+    def _acquire(self) -> _PooledConnection:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            return self._connect()
+
+    def _release(self, connection: _PooledConnection) -> None:
+        if connection.sent >= self.max_messages_per_connection:
+            self._discard(connection)
+        else:
+            self._idle.put(connection)
+
+    def _reset(self, connection: _PooledConnection) -> None:
+        try:
+            connection.smtp.rset()
+            self._release(connection)
+        except (smtplib.SMTPException, OSError):
+            connection.smtp.close()
+
+    @staticmethod
+    def _discard(connection: _PooledConnection) -> None:
+        try:
+            connection.smtp.quit()
+        except smtplib.SMTPException:
+            connection.smtp.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _refusal_codes(error: smtplib.SMTPException) -> list[int]:
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return [code for code, _ in error.recipients.values()]
+        return [error.smtp_code]
+
+    def _build_message(self, email: EmailStr, message: str) -> EmailMessage:
+        mail = EmailMessage()
+        mail["From"] = self.sender
+        mail["To"] = email
+        mail["Subject"] = self.subject
+        mail.set_content(message)
+        return mail
+
+    def send_email(self, email: EmailStr, message: str) -> None:
+        """
+        Sends an email to the given email address over a pooled
+        connection.
+
+        Args:
+            email (EmailStr): The recipient's email address.
+            message (str): The message to be sent in the email.
+
+        Raises:
+            smtplib.SMTPResponseException: If the server rejects the
+            sender or the message permanently, or keeps deferring it
+            after `max_retries` retries.
+            smtplib.SMTPRecipientsRefused: If the server refuses the
+            recipient permanently, or keeps deferring it after
+            `max_retries` retries.
+            smtplib.SMTPServerDisconnected: If the connection keeps
+            dropping after `max_retries` retries.
+        """
+        mail = self._build_message(email, message)
+        with self._slots:
+            for attempt in range(self.max_retries + 1):
+                connection = None
+                try:
+                    connection = self._acquire()
+                    connection.smtp.send_message(mail)
+                    connection.sent += 1
+                    self._release(connection)
+                    return
+                except (
+                    smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPSenderRefused,
+                    smtplib.SMTPDataError,
+                    smtplib.SMTPResponseException,
+                ) as e:
+                    if connection is not None:
+                        self._reset(connection)
+                    if not all(
+                        400 <= code < 500 for code in self._refusal_codes(e)
+                    ):
+                        raise
+                    error = e
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    if connection is not None:
+                        connection.smtp.close()
+                    error = e
+                except Exception:
+                    if connection is not None:
+                        self._reset(connection)
+                    raise
+                if attempt < self.max_retries:
+                    logger.warning(
+                        f"Retrying email to {email} after error: {error}"
+                    )
+                    time.sleep(self.retry_backoff * 2**attempt)
+            raise error
+
+    def send_emails(
+        self, messages: list[tuple[EmailStr, str]]
+    ) -> list[Optional[Exception]]:
+        """
+        Sends many emails concurrently, with at most `pool_size` messages
+        in flight, each one over a pooled connection.
+
+        Args:
+            messages (list[tuple[EmailStr, str]]): The (email address,
+            message) pairs to send.
+
+        Returns:
+            list[Optional[Exception]]: One result per message, in the same
+            order: None on success, or the exception raised for that
+            message.
+        """
+
+        def send(item: tuple[EmailStr, str]) -> Optional[Exception]:
+            try:
+                self.send_email(*item)
+                return None
+            except Exception as e:
+                return e
+
+        if len(messages) <= 1:
+            return [send(item) for item in messages]
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(send, messages))
+
+    def close(self) -> None:
+        """
+        Closes the idle connections of the pool.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except Empty:
+                return
@@ -0,0 +1,189 @@
+import time
+from typing import Callable, Optional
+
+from celery import bootsteps
+from kombu import Consumer, Exchange, Message, Queue
+
+from app.celery import app
+from app.config.settings import (
+    DEBT_BATCH_ENABLED,
+    DEBT_BATCH_MAX_WAIT,
+    DEBT_BATCH_QUEUE,
+    DEBT_BATCH_SIZE,
+)
+from app.tasks.tasks import process_chunk_task
+from app.utils.logger import logger
+from app.utils.scheduling import chunk_priority
+
+debt_batch_queue = Queue(
+    DEBT_BATCH_QUEUE,
+    Exchange(DEBT_BATCH_QUEUE, type="direct"),
+    routing_key=DEBT_BATCH_QUEUE,
+)
+
+
+def submit_debt(debt_data: dict) -> None:
+    """
+    Enqueues a single debt, to be processed in a batch with others.
+
+    The debt is published as a plain JSON message, without the envelope
+    of a Celery task, to the queue consumed by `DebtBatchConsumer`.
+
+    Args:
+        debt_data (dict): The debt details, as in a row of an uploaded
+        file.
+    """
+    with app.producer_or_acquire() as producer:
+        producer.publish(
+            debt_data,
+            exchange=debt_batch_queue.exchange,
+            routing_key=debt_batch_queue.routing_key,
+            serializer="json",
+            declare=[debt_batch_queue],
+            retry=True,
+        )
+
+
+class DebtBatcher:
+    """
+    Buffers single debts until a batch is full or has waited long enough.
+
+    Attributes:
+        process (Callable[[list[dict]], None]): Called with the debts of
+        each batch.
+        max_size (int): The maximum number of debts per batch.
+        max_wait (float): The maximum time in seconds a debt may wait in
+        the buffer.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[dict]], None],
+        max_size: int = DEBT_BATCH_SIZE,
+        max_wait: float = DEBT_BATCH_MAX_WAIT,
+    ):
+        self.process = process
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._debts: list[dict] = []
+        self._messages: list[Message] = []
+        self._oldest: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._debts)
+
+    def add(self, debt: dict, message: Message) -> None:
+        """
+        Adds a debt to the buffer, and flushes it once full.
+
+        Args:
+            debt (dict): The debt details.
+            message (Message): The message of the debt, acknowledged once
+            its batch has been handed over.
+        """
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._debts.append(debt)
+        self._messages.append(message)
+        if len(self._debts) >= self.max_size:
+            self.flush()
+
+    def flush_expired(self) -> None:
+        """
+        Flushes the buffer if its oldest debt waited for `max_wait`.
+        """
+        if (
+            self._oldest is not None
+            and time.monotonic() - self._oldest >= self.max_wait
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Processes the buffered debts as one batch.
+
+        The messages are acknowledged once the batch has been processed,
+        or requeued if it could not be, so that no debt is lost if the
+        worker stops in between.
+        """
+        debts, self._debts = self._debts, []
+        messages, self._messages = self._messages, []
+        self._oldest = None
+        if not debts:
+            return
+        try:
+            self.process(debts)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(debts)} debts: {e}")
+            for message in messages:
+                message.requeue()
+            return
+        for message in messages:
+            message.ack()
+
+
+def dispatch_debt_batch(debts: list[dict]) -> None:
+    """
+    Sends a batch of single debts to the workers as one chunk, so that
+    they are validated and deduplicated together (see
+    `app.tasks.tasks.process_chunk_task`).
+
+    Args:
+        debts (list[dict]): The debts of the batch.
+    """
+    process_chunk_task.apply_async((debts,), priority=chunk_priority(debts))
+    logger.info(f"Dispatched batch of {len(debts)} debts")
+
+
+class DebtBatchConsumer(bootsteps.ConsumerStep):
+    """
+    Worker bootstep consuming single debts in micro-batches.
+
+    Debts enqueued one by one with `submit_debt` would each pay the whole
+    overhead of a Celery task, and a Redis round-trip to be deduplicated.
+    This consumer reads them from `DEBT_BATCH_QUEUE` within the event loop
+    of the worker, buffers them up to `DEBT_BATCH_SIZE` debts or
+    `DEBT_BATCH_MAX_WAIT` seconds, and dispatches each batch as a single
+    chunk task. It is enabled by `DEBT_BATCH_ENABLED`, on the workers
+    consuming `debt_queue`.
+    """
+
+    enabled = DEBT_BATCH_ENABLED
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.batcher = DebtBatcher(dispatch_debt_batch)
+        self._timer = None
+
+    def include_if(self, parent) -> bool:
+        return (
+            self.enabled
+            and "debt_queue" in parent.app.amqp.queues.consume_from
+        )
+
+    def get_consumers(self, channel) -> list[Consumer]:
+        return [
+            Consumer(
+                channel,
+                queues=[debt_batch_queue],
+                callbacks=[self.on_message],
+                accept=["json"],
+                prefetch_count=2 * self.batcher.max_size,
+            )
+        ]
+
+    def on_message(self, body: dict, message: Message) -> None:
+        self.batcher.add(body, message)
+
+    def start(self, c) -> None:
+        super().start(c)
+        self._timer = c.timer.call_repeatedly(
+            self.batcher.max_wait / 2, self.batcher.flush_expired
+        )
+
+    def stop(self, c) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.batcher.flush()
+        super().stop(c)
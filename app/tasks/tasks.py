@@ -1,15 +1,234 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
+from uuid import UUID, uuid4
+
+import pandas as pd
 from celery import shared_task
 
 from app.celery import app
-from app.config.settings import PROCESSED_DEBTS_KEY
+from app.config.settings import (
+    ASYNC_CONCURRENCY,
+    BOLETO_BACKEND,
+    CHUNK_ERROR_SAMPLES,
+    CHUNK_EXECUTION_MODE,
+    CHUNK_TASKS_IGNORE_RESULT,
+    EMAIL_BACKEND,
+    PIPELINE_MODE,
+)
 from app.models import DebtRecord
-from app.services.boleto_services import BoletoService
+from app.services.async_services import (
+    ThreadedBoletoService,
+    ThreadedEmailService,
+)
+from app.services.boleto_services import BoletoService, PdfBoletoService
 from app.services.email_services import EmailService
-from app.utils.logger import logger
+from app.services.interfaces import (
+    IAsyncBoletoService,
+    IAsyncEmailService,
+    IBoletoService,
+    IEmailService,
+)
+from app.services.smtp_email_services import SMTPEmailService
+from app.utils.checkpoint import ChunkCheckpoint
+from app.utils.dedup import get_dedup_index
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import JobTracker
+from app.utils.logger import debt_logger, logger
+from app.utils.metrics import (
+    CHUNK_FAILURES,
+    CHUNK_TASK_SECONDS,
+    record_chunk_metrics,
+)
 from app.utils.redis_client import redis_client
+from app.utils.scheduling import chunk_priority
+from app.utils.serialization import (
+    COLUMNAR_SERIALIZER,
+    count_records,
+    iter_records,
+    to_columnar,
+)
+from app.utils.validation import to_frame, validate_chunk
 
 
-@shared_task(queue="debt_queue")
+def build_boleto_service() -> IBoletoService:
+    """
+    Returns the boleto service selected by the `BOLETO_BACKEND` setting.
+
+    Returns:
+        IBoletoService: The shared PDF boleto service for "pdf",
+        or the simulated service otherwise.
+    """
+    if BOLETO_BACKEND == "pdf":
+        return PdfBoletoService.get_instance()
+    return BoletoService()
+
+
+def build_email_service() -> IEmailService:
+    """
+    Returns the email service selected by the `EMAIL_BACKEND` setting.
+
+    Returns:
+        IEmailService: The shared pooled SMTP service for "smtp",
+        or the simulated service otherwise.
+    """
+    if EMAIL_BACKEND == "smtp":
+        return SMTPEmailService.get_instance()
+    return EmailService()
+
+
+def boleto_message(debt: DebtRecord) -> str:
+    """
+    Builds the email message notifying the debtor that a boleto is ready.
+
+    Args:
+        debt (DebtRecord): The debt record.
+
+    Returns:
+        str: The content of the email message.
+    """
+    return (
+        f"Your boleto with the debt uuid {debt.debtId} "
+        f"and value {debt.debtAmount} is ready."
+    )
+
+
+def handle_debt(
+    debt: DebtRecord,
+    boleto_service: IBoletoService,
+    email_service: IEmailService,
+) -> None:
+    """
+    Generates the boleto of a debt and notifies the debtor by email.
+
+    Args:
+        debt (DebtRecord): The validated debt record.
+        boleto_service (IBoletoService): The service generating the boleto.
+        email_service (IEmailService): The service sending the email.
+
+    Raises:
+        Exception: If any of the services fails.
+    """
+    boleto_service.generate_boleto(debt)
+    email_service.send_email(debt.email, boleto_message(debt))
+
+
+def process_debts(debts: list[DebtRecord]) -> list[Optional[Exception]]:
+    """
+    Generates the boletos of many debts, then emails the debtors whose
+    boleto was generated, through the batch methods of the services.
+
+    Args:
+        debts (list[DebtRecord]): The validated debt records.
+
+    Returns:
+        list[Optional[Exception]]: One result per debt, in the same order:
+        None on success, or the exception raised for that debt.
+    """
+    boleto_errors = build_boleto_service().generate_boletos(debts)
+    with_boleto = [
+        debt for debt, error in zip(debts, boleto_errors) if error is None
+    ]
+    email_errors = iter(
+        build_email_service().send_emails(
+            [(debt.email, boleto_message(debt)) for debt in with_boleto]
+        )
+    )
+    return [
+        next(email_errors) if error is None else error
+        for error in boleto_errors
+    ]
+
+
+async def process_debts_async(
+    debts: list[DebtRecord],
+    boleto_service: IAsyncBoletoService,
+    email_service: IAsyncEmailService,
+    concurrency: int = ASYNC_CONCURRENCY,
+) -> list[Optional[Exception]]:
+    """
+    Processes many debts concurrently in the running event loop.
+
+    The boletos of all the debts are generated first, through the batch
+    method of the boleto service, then the debtors whose boleto was
+    generated are emailed, with at most `concurrency` emails in flight at
+    the same time, so the time taken by a chunk is bounded by its slowest
+    calls rather than by the sum of all of them.
+
+    Args:
+        debts (list[DebtRecord]): The validated debt records.
+        boleto_service (IAsyncBoletoService): The service generating the
+        boletos.
+        email_service (IAsyncEmailService): The service sending the emails.
+        concurrency (int): The maximum number of calls in flight.
+
+    Returns:
+        list[Optional[Exception]]: One result per debt, in the same order:
+        None on success, or the exception raised for that debt.
+    """
+    boleto_errors = await boleto_service.generate_boletos(debts, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(debt: DebtRecord) -> Optional[Exception]:
+        async with semaphore:
+            try:
+                await email_service.send_email(
+                    debt.email, boleto_message(debt)
+                )
+            except Exception as e:
+                return e
+            return None
+
+    email_errors = iter(
+        await asyncio.gather(
+            *(
+                send(debt)
+                for debt, error in zip(debts, boleto_errors)
+                if error is None
+            )
+        )
+    )
+    return [
+        next(email_errors) if error is None else error
+        for error in boleto_errors
+    ]
+
+
+def run_debts_async(debts: list[DebtRecord]) -> list[Optional[Exception]]:
+    """
+    Runs `process_debts_async` in a new event loop, with the synchronous
+    services adapted to the asynchronous interfaces.
+
+    The default executor of the loop is sized to `ASYNC_CONCURRENCY`, so
+    that blocking services wrapped in threads can also keep that many
+    calls in flight. With the built-in services, this mode is a thread
+    pool around blocking calls rather than native asynchronous I/O: it
+    only pays off for emails, sent one per thread, when the latency of
+    the email backend dominates.
+
+    Args:
+        debts (list[DebtRecord]): The validated debt records.
+
+    Returns:
+        list[Optional[Exception]]: One result per debt, in the same order.
+    """
+
+    async def run() -> list[Optional[Exception]]:
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=ASYNC_CONCURRENCY)
+        )
+        return await process_debts_async(
+            debts,
+            ThreadedBoletoService(build_boleto_service()),
+            ThreadedEmailService(build_email_service()),
+        )
+
+    return asyncio.run(run())
+
+
+@shared_task(queue="debt_queue", ignore_result=CHUNK_TASKS_IGNORE_RESULT)
 def process_debt_task(debt_data) -> str:
     """
     Processes a single debt by generating a boleto and
@@ -33,120 +252,682 @@ def process_debt_task(debt_data) -> str:
     """
     try:
         debt = DebtRecord(**debt_data)
-        boleto_service = BoletoService()
-        boleto_service.generate_boleto(debt)
-        email_service = EmailService()
-        email_service.send_email(
-            debt.email,
-            f"Your boleto with the debt uuid {debt.debtId} "
-            f"and value {debt.debtAmount} is ready.",
-        )
+        handle_debt(debt, build_boleto_service(), build_email_service())
         result = f"Processed Debt ID: {debt.debtId}"
     except Exception as e:
         result = (
             f"Error processing Debt ID"
             f" {debt_data.get('debtId', 'Unknown')}: {e}"
         )
-    logger.info(result)
+    debt_logger.info(result)
     return result
 
 
-@shared_task(queue="debt_queue")
-def process_chunk_task(chunk_data) -> list:
+def chunk_summary(
+    processed: int = 0,
+    duplicates: int = 0,
+    failed: int = 0,
+    errors: Optional[list[str]] = None,
+) -> dict:
+    """
+    Builds the compact result of a chunk task.
+
+    Args:
+        processed (int): Number of debts successfully processed.
+        duplicates (int): Number of debts skipped because they were
+        already processed, being processed, or repeated in the chunk.
+        failed (int): Number of invalid or failed debts.
+        errors (list[str], optional): Sample error messages, at most
+        `CHUNK_ERROR_SAMPLES` of them.
+
+    Returns:
+        dict: The counters and error samples of the chunk.
+    """
+    return {
+        "processed": processed,
+        "duplicates": duplicates,
+        "failed": failed,
+        "errors": (errors or [])[:CHUNK_ERROR_SAMPLES],
+    }
+
+
+def merge_summary(
+    summary: dict,
+    processed: int = 0,
+    failed: int = 0,
+    errors: Optional[list[str]] = None,
+    duplicates: int = 0,
+) -> dict:
+    """
+    Adds the counters of a processing step to the summary of a chunk.
+
+    Args:
+        summary (dict): The summary of the chunk so far (see
+        `chunk_summary`).
+        processed (int): Number of debts processed by the step.
+        failed (int): Number of debts failed by the step.
+        errors (list[str], optional): The error messages of the step.
+        duplicates (int): Number of debts skipped by the step, as their
+        reservation was lost.
+
+    Returns:
+        dict: The updated summary.
+    """
+    return chunk_summary(
+        processed=summary.get("processed", 0) + processed,
+        duplicates=summary.get("duplicates", 0) + duplicates,
+        failed=summary.get("failed", 0) + failed,
+        errors=summary.get("errors", []) + (errors or []),
+    )
+
+
+def debt_records(frame: pd.DataFrame) -> list[DebtRecord]:
+    """
+    Builds debt records from validated rows, without validating them again.
+
+    Args:
+        frame (pd.DataFrame): Rows validated by `validate_chunk`.
+
+    Returns:
+        list[DebtRecord]: One record per row.
+    """
+    return [
+        DebtRecord.model_construct(
+            **{**record, "debtId": UUID(record["debtId"])}
+        )
+        for record in frame.to_dict(orient="records")
+    ]
+
+
+def split_results(
+    debt_ids: list[str], errors: list[Optional[Exception]]
+) -> tuple[list[str], list[str]]:
+    """
+    Splits the results of a batch of debts into successes and failures,
+    logging each of them through the per-debt logger (see
+    `app.utils.logger.configure_debt_logger`).
+
+    Args:
+        debt_ids (list[str]): The IDs of the debts.
+        errors (list[Optional[Exception]]): One result per debt: None on
+        success, or the exception raised for that debt.
+
+    Returns:
+        tuple[list[str], list[str]]: The IDs of the successful debts, and
+        the error messages of the failed ones.
+    """
+    succeeded = []
+    failures = []
+    for debt_id, error in zip(debt_ids, errors):
+        if error is None:
+            debt_logger.info("Processed Debt ID: %s", debt_id)
+            succeeded.append(debt_id)
+        else:
+            message = f"Error processing Debt ID {debt_id}: {error}"
+            debt_logger.info(message)
+            failures.append(message)
+    return succeeded, failures
+
+
+def finish_chunk(
+    job_id: Optional[str],
+    checkpoint: Optional[list[str]],
+    summary: dict,
+    seconds: float,
+    processed_ids: Optional[list[str]] = None,
+) -> None:
+    """
+    Completes a chunk once all of its debts went through the pipeline.
+
+    Commits the processed debts to the dedup index, the blocks of the
+    chunk to the checkpoint of its file, if any (see
+    `app.utils.checkpoint.ChunkCheckpoint`), and the counters and the
+    processing time of the chunk to its job, if any (see
+    `app.utils.jobs.JobTracker`), all in a single round-trip to Redis.
+    If the chunk was the last one of its job, triggers the completion of
+    the job (see `all_tasks_done_task`). Then logs a summary record of the
+    chunk, with its counters and error samples as structured fields, and
+    adds them to the metrics of the worker.
+
+    Args:
+        job_id (str, optional): The ID of the job the chunk belongs to.
+        checkpoint (list[str], optional): The digest of the first block
+        of the file, followed by the digests of the blocks of the chunk,
+        or None if the chunk must not be checkpointed.
+        summary (dict): The counters of the chunk.
+        seconds (float): The processing time of the chunk.
+        processed_ids (list[str], optional): The IDs of the debts claimed
+        and successfully processed by the chunk.
+    """
+    pipeline = redis_client.pipeline(transaction=False)
+    if processed_ids:
+        get_dedup_index(redis_client).commit(processed_ids, client=pipeline)
+    if checkpoint is not None:
+        root, *digests = checkpoint
+        ChunkCheckpoint(redis_client, root).commit(*digests, client=pipeline)
+    if job_id is None:
+        pipeline.execute()
+    else:
+        tracker = JobTracker(redis_client)
+        tracker.record_chunk(job_id, summary, seconds=seconds, client=pipeline)
+        if tracker.claim_completion(job_id, pipeline.execute()[-1]):
+            complete_job(job_id)
+    logger.info(
+        "Finished processing chunk: %d processed, %d duplicates, %d failed",
+        summary["processed"],
+        summary["duplicates"],
+        summary["failed"],
+        extra={"job_id": job_id, "seconds": seconds, **summary},
+    )
+    record_chunk_metrics(summary, seconds)
+
+
+@shared_task(
+    queue="debt_queue",
+    serializer=COLUMNAR_SERIALIZER,
+    ignore_result=CHUNK_TASKS_IGNORE_RESULT,
+)
+def process_chunk_task(
+    chunk_data,
+    job_id: Optional[str] = None,
+    checkpoint: Optional[list[str]] = None,
+) -> dict:
     """
     Processes a chunk of debt data by filtering out already
     processed debts and handling new ones.
 
-    This function performs the following steps:
-    1. Retrieves the set of already processed debts from Redis.
-    2. Filters the provided chunk of debt data to exclude debts that
-    have already been processed.
-    3. Processes the remaining debts by invoking the
-    `process_debt_task` function.
-    4. Adds the processed debts to the Redis set to prevent
-    future processing.
-    5. Returns a list of results indicating whether each debt was
-    successfully processed.
+    Chunks of a cancelled job are skipped. Otherwise, this function
+    performs the following steps:
+    1. Validates the whole chunk column-wise (see
+    `app.utils.validation.validate_chunk`), with the same rules as
+    `DebtRecord`. Invalid rows are reported as errors.
+    2. Atomically claims the IDs of the valid rows in the Redis dedup
+    index, in a single round-trip. Debts already processed, or being
+    processed by another worker, are not claimed.
+    3. Generates the boletos of the claimed debts, then emails the debtors
+    whose boleto was generated, either through the batch methods of the
+    services or, when `CHUNK_EXECUTION_MODE` is "asyncio", concurrently
+    in an event loop (see `process_debts_async`).
+    4. Commits the successfully processed debts to the dedup index to
+    prevent future processing. Failed debts keep their claim until it
+    expires, after which they can be retried. Steps 4 to 6 share a single
+    Redis round-trip (see `finish_chunk`).
+    5. Commits the blocks of the chunk to the checkpoint of its file, if
+    any (see `app.utils.checkpoint.ChunkCheckpoint`), unless some of its
+    debts failed to be processed, so that a later upload of the same file
+    only dispatches them again if they were not fully processed. Invalid
+    rows do not prevent the commit, as they would fail again.
+    6. Adds the counters and the processing time of the chunk to its job,
+    if any (see `app.utils.jobs.JobTracker`), and to the metrics of the
+    worker (see `app.utils.metrics`). A chunk that fails as a
+    whole counts all of its rows as failed, so that the job still
+    completes.
+    7. Returns compact counters for the chunk (see `chunk_summary`). They
+    are not stored in the result backend unless `CHUNK_TASKS_IGNORE_RESULT`
+    is disabled, as the job counters already track the progress and the
+    completion of the chunks.
+
+    When `PIPELINE_MODE` is "staged", steps 3 to 6 are instead carried out
+    by the next stages of the pipeline: the claimed debts are sent as a
+    single batch to `generate_boletos_task`, along with the token of their
+    claim, which sends the debts whose boleto was generated to
+    `send_emails_task`. Each stage has its own
+    queue, so that CPU-bound boleto rendering and I/O-bound email delivery
+    run on separately sized worker pools. The returned counters then only
+    cover the first stage.
+
+    The chunk is sent with the columnar serializer, so that field names
+    are not repeated on every row of the message.
 
     Args:
-        chunk_data (list): A list of dictionaries, each containing debt
-        details (e.g., debt ID, amount, etc.).
+        chunk_data (dict | list): A chunk in columnar format (see
+        `app.utils.serialization.to_columnar`), or a list of dictionaries,
+        each containing debt details (e.g., debt ID, amount, etc.).
+        job_id (str, optional): The ID of the job the chunk belongs to.
+        checkpoint (list[str], optional): The digest of the first block
+        of the file, followed by the digests of the blocks of this chunk.
 
     Returns:
-        list: A list of messages indicating success or failure
-        for each debt in the chunk.
+        dict: The number of processed, duplicate and failed debts of the
+        chunk, with a sample of the error messages.
     """
+    started = time.perf_counter()
     try:
-        processed_debts = redis_client.smembers(PROCESSED_DEBTS_KEY)
-        processed_debts = {id for id in processed_debts}
+        if job_id is not None and JobTracker(redis_client).is_cancelled(
+            job_id
+        ):
+            logger.info(f"Skipping chunk of cancelled job {job_id}")
+            summary = chunk_summary()
+            if JobTracker(redis_client).record_chunk(job_id, summary):
+                complete_job(job_id)
+            return summary
+
+        frame, errors = validate_chunk(to_frame(chunk_data))
+        rows = len(frame) + len(errors)
+        error_messages = [
+            f"Error processing Debt ID {error['debtId']}: {error['error']}"
+            for error in errors
+        ]
+        for message in error_messages:
+            debt_logger.info(message)
+
+        dedup_index = get_dedup_index(redis_client)
+        token = uuid4().hex
+        claimed = set(dedup_index.claim(frame["debtId"].tolist(), token))
+
+        to_process = []
+        for index, debt_id in zip(frame.index, frame["debtId"]):
+            if debt_id in claimed:
+                claimed.discard(debt_id)
+                to_process.append(index)
+        frame = frame.loc[to_process]
+
+        logger.info("Processing %d new debts", len(frame))
+        summary = chunk_summary(
+            duplicates=rows - len(error_messages) - len(frame),
+            failed=len(error_messages),
+            errors=error_messages,
+        )
+
+        if PIPELINE_MODE == "staged" and len(frame):
+            batch = to_columnar(
+                frame.assign(
+                    debtDueDate=frame["debtDueDate"].map(
+                        lambda date: date.isoformat()
+                    )
+                )
+            )
+            priority = chunk_priority(batch)
+            generate_boletos_task.apply_async(
+                (
+                    batch,
+                    job_id,
+                    checkpoint,
+                    summary,
+                    time.perf_counter() - started,
+                    token,
+                    priority,
+                ),
+                priority=priority,
+            )
+            return summary
+
+        debts = debt_records(frame)
+        if CHUNK_EXECUTION_MODE == "asyncio":
+            errors = run_debts_async(debts)
+        else:
+            errors = process_debts(debts)
+
+        processed_ids, failures = split_results(
+            frame["debtId"].tolist(), errors
+        )
+        summary = merge_summary(
+            summary,
+            processed=len(processed_ids),
+            failed=len(failures),
+            errors=failures,
+        )
+        finish_chunk(
+            job_id,
+            checkpoint if not failures else None,
+            summary,
+            time.perf_counter() - started,
+            processed_ids,
+        )
+        return summary
+    except Exception as e:
+        logger.error(f"Error processing chunk data: {e}")
+        CHUNK_FAILURES.labels("process_chunk_task").inc()
+        if job_id is not None:
+            record_failed_chunk(job_id, chunk_data, e)
+        raise
+    finally:
+        CHUNK_TASK_SECONDS.labels("process_chunk_task").observe(
+            time.perf_counter() - started
+        )
+
+
+@shared_task(
+    queue="boleto_queue",
+    serializer=COLUMNAR_SERIALIZER,
+    ignore_result=CHUNK_TASKS_IGNORE_RESULT,
+)
+def generate_boletos_task(
+    batch: dict,
+    job_id: Optional[str],
+    checkpoint: Optional[list[str]],
+    summary: dict,
+    seconds: float,
+    token: str,
+    priority: Optional[int] = None,
+) -> dict:
+    """
+    Generates the boletos of a batch of claimed debts, the second stage of
+    the staged pipeline (see `process_chunk_task`).
+
+    The reservations of the claimed debts are restarted first (see
+    `app.utils.dedup.DedupIndex.extend`), so that they do not expire while
+    the batch waits in the next queue, and another upload cannot claim them
+    again. Debts whose reservation expired while the batch waited in its
+    queue are skipped and counted as duplicates, as another upload may
+    have claimed them since. The debts whose boleto was generated are sent
+    as a single batch of messages to `send_emails_task`, with the same
+    priority as their chunk and the token of their claim.
+    If no boleto was generated, the chunk is completed right away.
+
+    Args:
+        batch (dict): The claimed debts, in columnar format.
+        job_id (str, optional): The ID of the job the chunk belongs to.
+        checkpoint (list[str], optional): The checkpoint digests of the
+        chunk.
+        summary (dict): The counters of the chunk so far.
+        seconds (float): The processing time of the chunk so far.
+        token (str): The token of the claim of the debts.
+        priority (int, optional): The priority of the chunk.
 
-        debts_to_process = [
-            debt
-            for debt in chunk_data
-            if str(debt["debtId"]) not in processed_debts
+    Returns:
+        dict: The counters of the chunk so far.
+    """
+    started = time.perf_counter()
+    try:
+        frame, _ = validate_chunk(to_frame(batch))
+        held = set(
+            get_dedup_index(redis_client).extend(
+                frame["debtId"].tolist(), token
+            )
+        )
+        held_rows = frame["debtId"].isin(held)
+        summary = merge_summary(summary, duplicates=int((~held_rows).sum()))
+        frame = frame[held_rows]
+        debts = debt_records(frame)
+        errors = build_boleto_service().generate_boletos(debts)
+        _, failures = split_results(frame["debtId"].tolist(), errors)
+        summary = merge_summary(summary, failed=len(failures), errors=failures)
+        if failures:
+            checkpoint = None
+
+        with_boleto = [
+            debt for debt, error in zip(debts, errors) if error is None
         ]
+        seconds += time.perf_counter() - started
+        if not with_boleto:
+            finish_chunk(job_id, checkpoint, summary, seconds)
+            return summary
+
+        messages = {
+            "columns": ["debtId", "email", "message"],
+            "data": [
+                [str(debt.debtId) for debt in with_boleto],
+                [debt.email for debt in with_boleto],
+                [boleto_message(debt) for debt in with_boleto],
+            ],
+        }
+        send_emails_task.apply_async(
+            (messages, job_id, checkpoint, summary, seconds, token),
+            priority=priority,
+        )
+        return summary
+    except Exception as e:
+        logger.error(f"Error generating boletos: {e}")
+        CHUNK_FAILURES.labels("generate_boletos_task").inc()
+        if job_id is not None:
+            record_failed_chunk(job_id, batch, e, summary)
+        raise
+    finally:
+        CHUNK_TASK_SECONDS.labels("generate_boletos_task").observe(
+            time.perf_counter() - started
+        )
 
-        logger.info(f"Processing {len(debts_to_process)} new debts")
 
-        results = []
-        for record in debts_to_process:
-            result = process_debt_task(record)
-            redis_client.sadd(PROCESSED_DEBTS_KEY, record["debtId"])
-            results.append(result)
+@shared_task(
+    queue="email_queue",
+    serializer=COLUMNAR_SERIALIZER,
+    ignore_result=CHUNK_TASKS_IGNORE_RESULT,
+)
+def send_emails_task(
+    messages: dict,
+    job_id: Optional[str],
+    checkpoint: Optional[list[str]],
+    summary: dict,
+    seconds: float,
+    token: str,
+) -> dict:
+    """
+    Emails the debtors of a batch of debts whose boleto was generated, the
+    last stage of the staged pipeline (see `process_chunk_task`).
+
+    The reservations of the debts are restarted before sending, and the
+    debts whose reservation was lost are skipped, like in
+    `generate_boletos_task`. The debts whose email was sent are committed
+    to the dedup index, and the chunk is completed (see `finish_chunk`).
 
-        logger.info(f"Finished processing chunk with {len(results)} results")
-        return results
+    Args:
+        messages (dict): The debt ID, email address and message of each
+        debt, in columnar format.
+        job_id (str, optional): The ID of the job the chunk belongs to.
+        checkpoint (list[str], optional): The checkpoint digests of the
+        chunk, or None if some of its debts already failed.
+        summary (dict): The counters of the chunk so far.
+        seconds (float): The processing time of the chunk so far.
+        token (str): The token of the claim of the debts.
+
+    Returns:
+        dict: The counters of the chunk.
+    """
+    started = time.perf_counter()
+    try:
+        records = list(iter_records(messages))
+        held = set(
+            get_dedup_index(redis_client).extend(
+                [record["debtId"] for record in records], token
+            )
+        )
+        summary = merge_summary(
+            summary,
+            duplicates=sum(record["debtId"] not in held for record in records),
+        )
+        records = [record for record in records if record["debtId"] in held]
+        errors = build_email_service().send_emails(
+            [(record["email"], record["message"]) for record in records]
+        )
+        processed_ids, failures = split_results(
+            [record["debtId"] for record in records], errors
+        )
+        summary = merge_summary(
+            summary,
+            processed=len(processed_ids),
+            failed=len(failures),
+            errors=failures,
+        )
+        finish_chunk(
+            job_id,
+            checkpoint if not failures else None,
+            summary,
+            seconds + time.perf_counter() - started,
+            processed_ids,
+        )
+        return summary
     except Exception as e:
-        logger.error(f"Error processing chunk data: {e}")
+        logger.error(f"Error sending emails: {e}")
+        CHUNK_FAILURES.labels("send_emails_task").inc()
+        if job_id is not None:
+            record_failed_chunk(job_id, messages, e, summary)
+        raise
+    finally:
+        CHUNK_TASK_SECONDS.labels("send_emails_task").observe(
+            time.perf_counter() - started
+        )
+
+
+def record_failed_chunk(
+    job_id: str, chunk_data, error: Exception, summary: Optional[dict] = None
+) -> None:
+    """
+    Counts all the rows of a chunk that failed as a whole as failed in its
+    job, and triggers the completion of the job if it was its last chunk.
+    Errors while doing so are logged, so that they do not hide the
+    original error.
+
+    Args:
+        job_id (str): The ID of the job the chunk belongs to.
+        chunk_data (dict | list): The rows of the chunk that failed.
+        error (Exception): The error raised by the chunk.
+        summary (dict, optional): The counters of the previous stages of
+        the chunk, in the staged pipeline.
+    """
+    try:
+        if JobTracker(redis_client).record_chunk(
+            job_id,
+            merge_summary(
+                summary or chunk_summary(),
+                failed=count_records(chunk_data),
+                errors=[f"Error processing chunk: {error}"],
+            ),
+        ):
+            complete_job(job_id)
+    except Exception as e:
+        logger.error(f"Error recording failed chunk of job {job_id}: {e}")
+
+
+@shared_task(queue="debt_queue", ignore_result=CHUNK_TASKS_IGNORE_RESULT)
+def process_file_range_task(
+    file_id: str,
+    offset: int,
+    length: int,
+    job_id: Optional[str] = None,
+    checkpoint: Optional[list[str]] = None,
+) -> dict:
+    """
+    Processes a byte range of a file kept in the shared upload storage.
+
+    In claim-check mode, only the location of the rows travels through the
+    broker. The worker reads the header and its own range of the file
+    from the shared storage, parses them into a columnar chunk and
+    processes it like `process_chunk_task`. Ranges of a cancelled job are
+    skipped without reading the file, which may already be deleted.
+
+    Args:
+        file_id (str): The ID of the stored file.
+        offset (int): The offset of the range, aligned on a line start.
+        length (int): The length of the range, aligned on a line end.
+        job_id (str, optional): The ID of the job the range belongs to.
+        checkpoint (list[str], optional): The digests of the first range
+        of the file and of this range.
+
+    Returns:
+        dict: The number of processed, duplicate and failed debts of the
+        range, with a sample of the error messages.
+    """
+    if job_id is not None and JobTracker(redis_client).is_cancelled(job_id):
+        return process_chunk_task([], job_id, checkpoint)
+    try:
+        storage = LocalFileStorage()
+        data = storage.read_header(file_id) + storage.read_range(
+            file_id, offset, length
+        )
+        chunk = pd.read_csv(BytesIO(data))
+    except Exception as e:
+        logger.error(f"Error reading range of file {file_id}: {e}")
+        CHUNK_FAILURES.labels("process_file_range_task").inc()
+        if job_id is not None:
+            record_failed_chunk(job_id, [], e)
         raise
+    return process_chunk_task(to_columnar(chunk), job_id, checkpoint)
+
+
+def complete_job(job_id: str) -> None:
+    """
+    Triggers `all_tasks_done_task` for a job whose completion was claimed
+    by the caller (see `app.utils.jobs.JobTracker.claim_completion`), so
+    that it runs once per job.
+
+    Args:
+        job_id (str): The ID of the job.
+    """
+    all_tasks_done_task.apply_async((job_id,))
+
+
+def delete_job_file(job_id: str) -> None:
+    """
+    Deletes the file kept in the upload storage for a job that ended, in
+    claim-check mode. Errors are logged, as the job itself is unaffected.
+
+    Args:
+        job_id (str): The ID of the job.
+    """
+    try:
+        file_id = JobTracker(redis_client).stored_file(job_id)
+        if file_id is not None:
+            LocalFileStorage().delete(file_id)
+    except Exception as e:
+        logger.error(f"Error deleting the stored file of job {job_id}: {e}")
 
 
 @shared_task(queue="default")
-def all_tasks_done_task(results) -> dict:
+def all_tasks_done_task(job_id: str) -> dict:
     """
     Callback task that is triggered after all chunk processing
     tasks are complete.
 
-    This function processes the results from completed chunk tasks
-    to generate a summary of the task execution. It calculates the number
-    of completed tasks and the total number of processed debts.
+    Completion is detected from the counters of the job, by the last chunk
+    to complete or by the end of the dispatch if it comes last (see
+    `complete_job`), so chunk tasks do not need to store their results.
+    This function reads those counters and the error samples of the job
+    (see `app.utils.jobs.JobTracker.error_samples`) to generate a summary
+    of the job, and deletes the stored file of the job, in claim-check mode.
+    Unlike the chunk tasks, its result is stored in the result backend,
+    when enabled.
 
     Args:
-        results (list): A list of results from the completed chunk tasks.
-        Each result is expected to contain a dictionary with information
-        on the number of processed debts.
+        job_id (str): The ID of the completed job.
 
     Returns:
         dict: A dictionary containing the following keys:
+              - "job_id": The ID of the job.
               - "processed_count": The number of chunk tasks that have
               been completed.
               - "total_debts": The total number of debts processed across
               all chunk tasks.
+              - "duplicates": The total number of duplicate debts skipped.
+              - "failed": The total number of invalid or failed debts.
+              - "errors": Up to `CHUNK_ERROR_SAMPLES` error messages of
+              the job, the most recent first.
               - "error" (optional): An error message, if any
               exception occurred during the task execution.
     """
     try:
-        processed_count = len(results)
-
-        total_processed_debts = sum(
-            result.get("processed_debts", 0)
-            for result in results
-            if isinstance(result, dict)
+        tracker = JobTracker(redis_client)
+        job = tracker.get(job_id)
+        if job is None:
+            raise ValueError(f"Job {job_id} not found")
+        delete_job_file(job_id)
+
+        logger.info(f"Tasks completed: {job['completed_chunks']}")
+        logger.info(f"Total debts processed: {job['processed']}")
+        logger.info(
+            f"Total duplicates: {job['duplicates']}, "
+            f"total failed: {job['failed']}"
         )
 
-        logger.info(f"Tasks completed: {processed_count}")
-        logger.info(f"Total debts processed: {total_processed_debts}")
-
         return {
-            "processed_count": processed_count,
-            "total_debts": total_processed_debts,
+            "job_id": job_id,
+            "processed_count": job["completed_chunks"],
+            "total_debts": job["processed"],
+            "duplicates": job["duplicates"],
+            "failed": job["failed"],
+            "errors": tracker.error_samples(job_id),
         }
     except Exception as e:
         logger.error(f"Error in all_tasks_done_task: {e}")
-        return {"processed_count": 0, "total_debts": 0, "error": str(e)}
+        return {
+            "job_id": job_id,
+            "processed_count": 0,
+            "total_debts": 0,
+            "error": str(e),
+        }
 
 
-@app.task(queue="boleto_queue")
+@app.task(queue="boleto_queue", ignore_result=CHUNK_TASKS_IGNORE_RESULT)
 def generate_boleto(debt: dict) -> None:
     """
     Simulate the creation of a boleto for a given debt ID.
@@ -162,7 +943,7 @@ def generate_boleto(debt: dict) -> None:
     logger.info(f"Generating boleto for Debt ID: {debt['debtId']}")
 
 
-@app.task(queue="email_queue")
+@app.task(queue="email_queue", ignore_result=CHUNK_TASKS_IGNORE_RESULT)
 def send_email(email: str, message: str) -> None:
     """
     Simulate the process of sending an email.
@@ -0,0 +1,62 @@
+import fakeredis
+import numpy as np
+
+from app.utils.validation import DEBT_FIELDS, validate_chunk
+from benchmarks.data import generate_csv, synthetic_debts
+from benchmarks.harness import bench_dedup, bench_ingest, compare
+
+
+def test_synthetic_debts_are_valid():
+    frame = synthetic_debts(1000, np.random.default_rng(0))
+
+    valid, errors = validate_chunk(frame.astype(str))
+
+    assert errors == []
+    assert len(valid) == 1000
+    assert frame["debtId"].is_unique
+
+
+def test_generate_csv(tmp_path):
+    path = generate_csv(tmp_path / "debts.csv", 250)
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",".join(DEBT_FIELDS)
+    assert len(lines) == 251
+
+
+def test_bench_ingest(tmp_path):
+    path = generate_csv(tmp_path / "debts.csv", 1200)
+
+    result = bench_ingest(path, 1200)
+
+    assert result["scenario"] == "ingest"
+    assert result["rows"] == 1200
+    assert result["chunks"] >= 1
+    assert result["rows_per_second"] > 0
+
+
+def test_bench_dedup():
+    client = fakeredis.FakeRedis(decode_responses=True)
+
+    results = bench_dedup(client, 400, batch_rows=100, samples=2)
+
+    assert [r["processed_set_size"] for r in results] == [100, 300]
+    assert not any(r["representative"] for r in results)
+    assert client.scard("processed_debts") == 400
+
+
+def test_compare_reports_regressions():
+    baseline = [
+        {"scenario": "ingest", "rows": 10, "rows_per_second": 1000.0},
+        {"scenario": "chunk", "rows": 10, "rows_per_second": 1000.0},
+    ]
+    current = [
+        {"scenario": "ingest", "rows": 10, "rows_per_second": 700.0},
+        {"scenario": "chunk", "rows": 10, "rows_per_second": 900.0},
+        {"scenario": "dedup", "rows": 10, "rows_per_second": 1.0},
+    ]
+
+    regressions = compare(baseline, current, max_regression=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("ingest (10 rows)")
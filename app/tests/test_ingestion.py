@@ -0,0 +1,248 @@
+from hashlib import sha256
+from io import BytesIO
+
+import fakeredis
+import pytest
+
+from app.ingestion import (
+    ChunkDispatcher,
+    JobCancelled,
+    dispatch_chunks,
+    file_size,
+    ingest_file,
+    run_dispatch,
+)
+from app.utils.chunking import ChunkSizer
+from app.utils.csv_stream import CsvChunk
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import JobTracker
+
+
+@pytest.fixture
+def mock_redis(mocker):
+    mock_redis = mocker.patch("app.ingestion.redis_client")
+    mock_redis.hmget.return_value = [None, None]
+    return mock_redis
+
+
+@pytest.fixture
+def mock_chunk_task(mocker):
+    return mocker.patch("app.ingestion.process_chunk_task")
+
+
+def test_ingest_file_dispatches_chunks(mocker, mock_redis, mock_chunk_task):
+    mocker.patch("app.ingestion.CHUNK_BLOCK_ROWS", 1)
+    mocker.patch("app.ingestion.INGESTION_READ_SIZE", 8)
+    mock_sizer = mocker.patch("app.ingestion.ChunkSizer")
+    mock_sizer.from_stats.return_value = ChunkSizer(
+        min_rows=1, concurrency=1, chunks_per_worker=1
+    )
+    data = b"name,governmentId\nJohn,100\nDoe,200\nJane,300\n"
+    root = sha256(data[:27]).hexdigest()
+    mock_redis.smembers.return_value = set()
+    fileobj = BytesIO(data)
+
+    ingest_file("abc", fileobj, "test.csv")
+
+    assert mock_chunk_task.apply_async.call_count == 2
+    mock_chunk_task.apply_async.assert_called_with(
+        (
+            {"columns": ["name", "governmentId"], "data": [["Jane"], [300]]},
+            "abc",
+            [root, sha256(data).hexdigest()],
+        ),
+        priority=0,
+    )
+    assert mock_chunk_task.apply_async.call_args_list[0].args[0][2] == [
+        root,
+        root,
+        sha256(data[:35]).hexdigest(),
+    ]
+    mock_redis.smembers.assert_called_once_with(f"checkpoint:{root}")
+    mock_redis.hset.assert_any_call("file_progress", "test.csv", root)
+    mock_pipeline = mock_redis.pipeline.return_value
+    mock_pipeline.hincrby.assert_any_call("job:abc", "dispatched_rows", 2)
+    mock_pipeline.hincrby.assert_any_call("job:abc", "dispatched_rows", 1)
+    assert mock_pipeline.execute.call_count == 3
+    mock_pipeline.hset.assert_called_with("job:abc", "status", "dispatched")
+    assert fileobj.closed
+
+
+def test_ingest_file_skips_completed_blocks(
+    mocker, mock_redis, mock_chunk_task
+):
+    mocker.patch("app.ingestion.CHUNK_BLOCK_ROWS", 1)
+    data = b"name,governmentId\nJohn,100\nDoe,200\nJane,300\n"
+    mock_redis.smembers.return_value = {
+        sha256(data[:27]).hexdigest(),
+        sha256(data[:35]).hexdigest(),
+    }
+
+    ingest_file("abc", BytesIO(data), "test.csv")
+
+    mock_chunk_task.apply_async.assert_called_once()
+    assert mock_chunk_task.apply_async.call_args.args[0][0]["data"] == [
+        ["Jane"],
+        [300],
+    ]
+
+
+def test_ingest_file_failure(mocker, mock_redis, mock_chunk_task):
+    mock_redis.smembers.side_effect = Exception("Redis error")
+    fileobj = BytesIO(b"name\nJohn\n")
+
+    ingest_file("abc", fileobj, "test.csv")
+
+    mock_chunk_task.apply_async.assert_not_called()
+    mock_redis.hset.assert_called_with(
+        "job:abc", mapping={"status": "failed", "error": "Redis error"}
+    )
+    assert fileobj.closed
+
+
+def test_dispatch_chunks_sends_urgent_chunks_first(
+    mocker, mock_redis, mock_chunk_task
+):
+    mocker.patch("app.ingestion.chunk_priority", side_effect=[0, 9, 3])
+    chunks = [
+        CsvChunk([f"digest{i}"], {"columns": ["id"], "data": [[i]]})
+        for i in range(3)
+    ]
+
+    dispatch_chunks("abc", chunks, "root")
+
+    assert [
+        (call.args[0][2], call.kwargs["priority"])
+        for call in mock_chunk_task.apply_async.call_args_list
+    ] == [
+        (["root", "digest1"], 9),
+        (["root", "digest2"], 3),
+        (["root", "digest0"], 0),
+    ]
+    mock_redis.zrem.assert_called_once_with("active_jobs", "abc")
+
+
+def test_chunk_dispatcher_waits_for_completed_chunks(mocker, mock_redis):
+    mock_sleep = mocker.patch("app.ingestion.time.sleep")
+    mock_task = mocker.Mock()
+    mock_pipeline = mock_redis.pipeline.return_value
+    mock_pipeline.execute.side_effect = [
+        [],
+        [],
+        [[None, "0"], 1, 0, 1],
+        [[None, "1"], 1, 0, 1],
+        [],
+    ]
+    dispatcher = ChunkDispatcher("abc", max_in_flight=2, poll_interval=0.1)
+
+    for i in range(3):
+        dispatcher.submit(mock_task, i, rows=10, priority=5)
+
+    assert mock_task.apply_async.call_count == 3
+    mock_task.apply_async.assert_called_with((2,), priority=5)
+    assert dispatcher.dispatched == 3
+    mock_pipeline.hmget.assert_called_with(
+        "job:abc", ["cancelled", "completed_chunks"]
+    )
+    assert mock_pipeline.hmget.call_count == 2
+    mock_pipeline.zadd.assert_called_with("active_jobs", {"abc": mocker.ANY})
+    mock_sleep.assert_called_once_with(0.1)
+
+
+def test_chunk_dispatcher_shares_window_between_jobs(mocker, mock_redis):
+    mock_sleep = mocker.patch("app.ingestion.time.sleep")
+    mock_task = mocker.Mock()
+    mock_redis.pipeline.return_value.execute.side_effect = [
+        [],
+        [],
+        [],
+        [],
+        [[None, "2"], 1, 0, 2],
+        [[None, "3"], 1, 0, 2],
+        [],
+    ]
+    dispatcher = ChunkDispatcher(
+        "abc", max_in_flight=4, poll_interval=0.1, min_in_flight=1
+    )
+
+    for i in range(5):
+        dispatcher.submit(mock_task, i)
+
+    assert dispatcher.window == 2
+    assert mock_task.apply_async.call_count == 5
+    mock_sleep.assert_called_once_with(0.1)
+
+
+def test_chunk_dispatcher_stops_cancelled_job(mocker, mock_redis):
+    mock_task = mocker.Mock()
+    mock_redis.pipeline.return_value.execute.side_effect = [
+        [],
+        [["1", "0"], 1, 0, 1],
+    ]
+    dispatcher = ChunkDispatcher("abc", max_in_flight=1)
+
+    dispatcher.submit(mock_task, 1)
+    with pytest.raises(JobCancelled):
+        dispatcher.submit(mock_task, 2)
+
+    mock_task.apply_async.assert_called_once_with((1,), priority=None)
+    dispatcher.close()
+    mock_redis.zrem.assert_called_once_with("active_jobs", "abc")
+
+
+def test_run_dispatch_completes_job_whose_chunks_completed(mocker):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.ingestion.redis_client", client)
+    mocker.patch("app.ingestion.ChunkDispatcher")
+    mock_complete_job = mocker.patch("app.ingestion.complete_job")
+    tracker = JobTracker(client)
+    job_id = tracker.create("test.csv")
+    tracker.record_dispatch(job_id, chunks=1, rows=1)
+    tracker.record_chunk(job_id, {"processed": 1})
+
+    run_dispatch(job_id, lambda dispatcher: None)
+
+    mock_complete_job.assert_called_once_with(job_id)
+    assert tracker.get(job_id)["status"] == "completed"
+
+
+def test_run_dispatch_leaves_completion_to_last_chunk(mocker):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.ingestion.redis_client", client)
+    mocker.patch("app.ingestion.ChunkDispatcher")
+    mock_complete_job = mocker.patch("app.ingestion.complete_job")
+    tracker = JobTracker(client)
+    job_id = tracker.create("test.csv")
+    tracker.record_dispatch(job_id, chunks=1, rows=1)
+
+    run_dispatch(job_id, lambda dispatcher: None)
+
+    mock_complete_job.assert_not_called()
+    assert tracker.record_chunk(job_id, {"processed": 1}) is True
+
+
+def test_run_dispatch_deletes_stored_file_of_failed_job(mocker, tmp_path):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.ingestion.redis_client", client)
+    mocker.patch("app.tasks.tasks.redis_client", client)
+    mocker.patch("app.ingestion.ChunkDispatcher")
+    storage = LocalFileStorage(str(tmp_path))
+    mocker.patch("app.tasks.tasks.LocalFileStorage", return_value=storage)
+    file_id = storage.save(BytesIO(b"debtId\n1\n"))
+    job_id = JobTracker(client).create("test.csv", file_id)
+
+    def dispatch(dispatcher):
+        raise RuntimeError("Broker error")
+
+    run_dispatch(job_id, dispatch)
+
+    assert JobTracker(client).get(job_id)["status"] == "failed"
+    assert not storage.path(file_id).exists()
+
+
+def test_file_size_keeps_position():
+    fileobj = BytesIO(b"name\nJohn\n")
+    fileobj.read(5)
+
+    assert file_size(fileobj) == 5
+    assert fileobj.tell() == 5
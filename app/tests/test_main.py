@@ -1,9 +1,14 @@
+from hashlib import sha256
 from io import BytesIO
 
+import fakeredis
 import pytest
 from fastapi.testclient import TestClient
 
+import app.main
 from app.main import web_app
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import JobTracker
 
 
 @pytest.fixture
@@ -17,8 +22,22 @@ def mock_redis(mocker):
 
 
 @pytest.fixture
-def mock_celery(mocker):
-    return mocker.patch("app.main.chord")
+def mock_async_redis(mocker):
+    return mocker.patch(
+        "app.main.async_redis_client", new_callable=mocker.AsyncMock
+    )
+
+
+@pytest.fixture
+def mock_chunk_task(mocker):
+    return mocker.patch("app.ingestion.process_chunk_task")
+
+
+@pytest.fixture
+def mock_ingestion_redis(mocker):
+    mock_redis = mocker.patch("app.ingestion.redis_client")
+    mock_redis.hmget.return_value = [None, None]
+    return mock_redis
 
 
 def create_csv_file(content: str) -> BytesIO:
@@ -28,7 +47,7 @@ def create_csv_file(content: str) -> BytesIO:
     return file
 
 
-def test_upload_invalid_file_type(client, mock_redis, mock_celery):
+def test_upload_invalid_file_type(client, mock_redis, mock_chunk_task):
     file = create_csv_file("Name,Age\nJohn,30\nDoe,25")
     response = client.post(
         "/upload_csv", files={"file": ("test.txt", file, "text/plain")}
@@ -38,7 +57,7 @@ def test_upload_invalid_file_type(client, mock_redis, mock_celery):
     assert response.json() == {"detail": "File must be a CSV"}
 
 
-def test_upload_empty_file(client, mock_redis, mock_celery):
+def test_upload_empty_file(client, mock_redis, mock_chunk_task):
     file = create_csv_file("")
     response = client.post(
         "/upload_csv", files={"file": ("empty.csv", file, "text/csv")}
@@ -48,12 +67,15 @@ def test_upload_empty_file(client, mock_redis, mock_celery):
     assert response.json() == {"detail": "Uploaded file is empty"}
 
 
-def test_upload_no_new_rows(client, mock_redis, mock_celery):
+def test_upload_no_new_rows(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
     file_content = "name,governmentId\nJohn,100\nDoe,200"
     file = create_csv_file(file_content)
 
-    mock_redis.hget.return_value = "3"
-    mock_redis.hset.return_value = None
+    mock_ingestion_redis.smembers.return_value = {
+        sha256(file_content.encode() + b"\n").hexdigest()
+    }
 
     response = client.post(
         "/upload_csv", files={"file": ("test.csv", file, "text/csv")}
@@ -63,31 +85,60 @@ def test_upload_no_new_rows(client, mock_redis, mock_celery):
     assert response.json() == {"detail": "No new rows to process"}
 
 
-def test_upload_csv_success(client, mock_redis, mock_celery):
+@pytest.fixture(autouse=True)
+def temp_dir(mocker, tmp_path):
+    mocker.patch("tempfile.tempdir", str(tmp_path))
+    return tmp_path
+
+
+def test_upload_csv_success(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
     file_content = "name,governmentId\nJohn,100\nDoe,200"
     file = create_csv_file(file_content)
+    root = sha256(file_content.encode() + b"\n").hexdigest()
 
-    mock_redis.hget.return_value = "0"
-    mock_redis.hset.return_value = None
-
-    mock_celery.return_value.id = "task_id"
-    mock_celery.return_value.get.return_value = (
-        "Processing completed successfully"
-    )
+    mock_ingestion_redis.smembers.return_value = set()
 
     response = client.post(
         "/upload_csv", files={"file": ("test.csv", file, "text/csv")}
     )
 
     assert response.status_code == 200
-    assert response.json() == {"message": "File processing started"}
+    job_id = response.json()["job_id"]
+    assert response.json() == {
+        "message": "File processing started",
+        "job_id": job_id,
+    }
+    mock_ingestion_redis.hset.assert_any_call(
+        "file_progress", "test.csv", root
+    )
+    mock_chunk_task.apply_async.assert_called_once_with(
+        (
+            {
+                "columns": ["name", "governmentId"],
+                "data": [["John", "Doe"], [100, 200]],
+            },
+            job_id,
+            [root, root],
+        ),
+        priority=0,
+    )
+    mock_ingestion_redis.pipeline.return_value.hincrby.assert_any_call(
+        f"job:{job_id}", "dispatched_rows", 2
+    )
+    mock_ingestion_redis.pipeline.return_value.hset.assert_called_with(
+        f"job:{job_id}", "status", "dispatched"
+    )
 
 
-def test_upload_csv_internal_error(client, mock_redis, mock_celery):
+def test_upload_csv_internal_error(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
     file_content = "Name,Age\nJohn,30\nDoe,25"
     file = create_csv_file(file_content)
 
-    mock_redis.hget.side_effect = Exception("Internal error")
+    mock_ingestion_redis.smembers.side_effect = Exception("Internal error")
 
     response = client.post(
         "/upload_csv", files={"file": ("test.csv", file, "text/csv")}
@@ -98,7 +149,7 @@ def test_upload_csv_internal_error(client, mock_redis, mock_celery):
 
 
 def test_reset_progress_success(client, mock_redis):
-    mock_redis.hdel.return_value = 1
+    mock_redis.hget.return_value = "abc"
 
     response = client.post("/reset_progress?file_name=test.csv")
 
@@ -106,12 +157,337 @@ def test_reset_progress_success(client, mock_redis):
     assert response.json() == {
         "message": "Progress for test.csv has been reset."
     }
+    mock_pipeline = mock_redis.pipeline.return_value
+    mock_pipeline.delete.assert_called_once_with("checkpoint:abc")
+    mock_pipeline.hdel.assert_called_once_with("file_progress", "test.csv")
 
 
 def test_reset_progress_failure(client, mock_redis):
-    mock_redis.hdel.side_effect = Exception("Redis error")
+    mock_redis.hget.side_effect = Exception("Redis error")
 
     response = client.post("/reset_progress?file_name=test.csv")
 
     assert response.status_code == 500
     assert response.json() == {"detail": "Failed to reset progress"}
+
+
+@pytest.mark.parametrize("content", ["a,b\n1,2", ""])
+def test_upload_csv_deletes_temporary_file(
+    client,
+    temp_dir,
+    mock_redis,
+    mock_chunk_task,
+    mock_ingestion_redis,
+    content,
+):
+    mock_ingestion_redis.smembers.return_value = set()
+
+    client.post(
+        "/upload_csv",
+        files={"file": ("test.csv", create_csv_file(content), "text/csv")},
+    )
+
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_upload_csv_stream_success(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
+    file = create_csv_file("name,governmentId\nJohn,100\nDoe,200")
+    root = sha256(b"name,governmentId\nJohn,100\nDoe,200\n").hexdigest()
+    mock_ingestion_redis.smembers.return_value = set()
+
+    response = client.post(
+        "/upload_csv/stream", files={"file": ("test.csv", file, "text/csv")}
+    )
+
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    assert response.json() == {
+        "message": "File processing started",
+        "job_id": job_id,
+        "chunks": 1,
+        "rows": 2,
+    }
+    mock_chunk_task.apply_async.assert_called_once_with(
+        (
+            {
+                "columns": ["name", "governmentId"],
+                "data": [["John", "Doe"], [100, 200]],
+            },
+            job_id,
+            [root, root],
+        ),
+        priority=0,
+    )
+    mock_ingestion_redis.hset.assert_called_once_with(
+        "file_progress", "test.csv", root
+    )
+    mock_redis.pipeline.return_value.hset.assert_called_with(
+        f"job:{job_id}", "status", "dispatched"
+    )
+
+
+def test_upload_csv_stream_parses_off_event_loop(
+    client, mocker, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
+    mock_ingestion_redis.smembers.return_value = set()
+    run_in_threadpool = mocker.spy(app.main, "run_in_threadpool")
+
+    response = client.post(
+        "/upload_csv/stream",
+        files={"file": ("test.csv", create_csv_file("a,b\n1,2"), "text/csv")},
+    )
+
+    assert response.status_code == 200
+    offloaded = {
+        getattr(call.args[0], "__name__", None)
+        for call in run_in_threadpool.call_args_list
+    }
+    assert {"feed", "close", "mark_dispatched"} <= offloaded
+
+
+def test_upload_csv_stream_invalid_file_type(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
+    file = create_csv_file("Name,Age\nJohn,30")
+    response = client.post(
+        "/upload_csv/stream", files={"file": ("test.txt", file, "text/plain")}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "File must be a CSV"}
+    mock_chunk_task.apply_async.assert_not_called()
+
+
+def test_upload_csv_stream_no_new_rows(
+    client, mock_redis, mock_chunk_task, mock_ingestion_redis
+):
+    file = create_csv_file("name,governmentId\nJohn,100\nDoe,200")
+    mock_ingestion_redis.smembers.return_value = {
+        sha256(b"name,governmentId\nJohn,100\nDoe,200\n").hexdigest()
+    }
+
+    response = client.post(
+        "/upload_csv/stream", files={"file": ("test.csv", file, "text/csv")}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "No new rows to process"}
+
+
+def test_upload_csv_async_returns_job_id(client, mock_redis, mocker):
+    mock_executor = mocker.patch("app.main.ingestion_executor")
+    file = create_csv_file("name,governmentId\nJohn,100\nDoe,200")
+
+    response = client.post(
+        "/upload_csv/async", files={"file": ("test.csv", file, "text/csv")}
+    )
+
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+    assert response.json() == {
+        "message": "File processing started",
+        "job_id": job_id,
+    }
+    mock_redis.hset.assert_called_once_with(
+        f"job:{job_id}",
+        mapping={
+            "file": "test.csv",
+            "status": "running",
+            "created_at": mocker.ANY,
+        },
+    )
+    _, submitted_job_id, fileobj, filename = (
+        mock_executor.submit.call_args.args
+    )
+    assert submitted_job_id == job_id
+    assert filename == "test.csv"
+    assert fileobj.read() == b"name,governmentId\nJohn,100\nDoe,200"
+    fileobj.close()
+
+
+def test_upload_csv_async_empty_file(client, mock_redis, mocker):
+    mock_executor = mocker.patch("app.main.ingestion_executor")
+    file = create_csv_file("")
+
+    response = client.post(
+        "/upload_csv/async", files={"file": ("empty.csv", file, "text/csv")}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Uploaded file is empty"}
+    mock_executor.submit.assert_not_called()
+
+
+def test_upload_csv_claim_check(
+    client, mock_redis, mock_ingestion_redis, mocker, tmp_path
+):
+    mocker.patch(
+        "app.main.LocalFileStorage",
+        return_value=LocalFileStorage(str(tmp_path)),
+    )
+    mock_executor = mocker.patch("app.main.ingestion_executor")
+    mock_executor.submit.side_effect = lambda fn, *args: fn(*args)
+    mock_range_task = mocker.patch("app.ingestion.process_file_range_task")
+    file = create_csv_file("name,governmentId\nJohn,100\nDoe,200\n")
+
+    response = client.post(
+        "/upload_csv/claim_check",
+        files={"file": ("test.csv", file, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    file_id = response.json()["file_id"]
+    job_id = response.json()["job_id"]
+    assert response.json() == {
+        "message": "File processing started",
+        "job_id": job_id,
+        "file_id": file_id,
+        "chunks": 1,
+    }
+    assert (tmp_path / f"{file_id}.csv").exists()
+    root = sha256(b"name,governmentId\nJohn,100\nDoe,200\n").hexdigest()
+    mock_range_task.apply_async.assert_called_once_with(
+        (file_id, 18, 17, job_id, [root, root]), priority=None
+    )
+    mock_redis.hset.assert_any_call("file_progress", "test.csv", root)
+    mock_ingestion_redis.pipeline.return_value.hincrby.assert_called_once_with(
+        f"job:{job_id}", "dispatched_chunks", 1
+    )
+    mock_ingestion_redis.pipeline.return_value.hset.assert_called_with(
+        f"job:{job_id}", "status", "dispatched"
+    )
+
+
+def test_upload_csv_claim_check_no_rows(client, mocker, tmp_path):
+    mocker.patch(
+        "app.main.LocalFileStorage",
+        return_value=LocalFileStorage(str(tmp_path)),
+    )
+    mock_range_task = mocker.patch("app.ingestion.process_file_range_task")
+    file = create_csv_file("name,governmentId\n")
+
+    response = client.post(
+        "/upload_csv/claim_check",
+        files={"file": ("test.csv", file, "text/csv")},
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "No new rows to process"}
+    assert list(tmp_path.iterdir()) == []
+    mock_range_task.apply_async.assert_not_called()
+
+
+def test_get_job(client, mock_async_redis):
+    mock_async_redis.hgetall.return_value = {
+        "file": "test.csv",
+        "status": "dispatched",
+        "created_at": "100.0",
+        "updated_at": "104.0",
+        "dispatched_chunks": "2",
+        "dispatched_rows": "20",
+        "completed_chunks": "2",
+        "processed": "15",
+        "duplicates": "3",
+        "failed": "2",
+    }
+
+    response = client.get("/jobs/abc")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "job_id": "abc",
+        "file": "test.csv",
+        "status": "completed",
+        "dispatched_chunks": 2,
+        "dispatched_rows": 20,
+        "completed_chunks": 2,
+        "processed": 15,
+        "duplicates": 3,
+        "failed": 2,
+        "elapsed_seconds": 4.0,
+        "rows_per_second": 5.0,
+        "eta_seconds": 0.0,
+    }
+    mock_async_redis.hgetall.assert_called_once_with("job:abc")
+
+
+def test_get_job_not_found(client, mock_async_redis):
+    mock_async_redis.hgetall.return_value = {}
+
+    response = client.get("/jobs/abc")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Job not found"}
+
+
+def test_get_job_events(client, mock_async_redis, mocker):
+    mocker.patch("app.main.JOB_EVENTS_INTERVAL", 0)
+    running = {
+        "file": "test.csv",
+        "status": "running",
+        "created_at": "100.0",
+    }
+    mock_async_redis.hgetall.side_effect = [
+        running,
+        {**running, "status": "failed", "error": "Redis error"},
+    ]
+
+    response = client.get("/jobs/abc/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        line for line in response.text.splitlines() if line.startswith("data")
+    ]
+    assert len(events) == 2
+    assert '"status": "failed"' in events[1]
+
+
+def test_get_job_events_closes_on_cancellation(client, mocker):
+    server = fakeredis.FakeServer()
+    mocker.patch(
+        "app.main.async_redis_client",
+        fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+    )
+    job_id = JobTracker(
+        fakeredis.FakeRedis(server=server, decode_responses=True)
+    ).create("test.csv")
+
+    assert client.post(f"/jobs/{job_id}/cancel").status_code == 200
+    response = client.get(f"/jobs/{job_id}/events")
+
+    events = [
+        line for line in response.text.splitlines() if line.startswith("data")
+    ]
+    assert len(events) == 1
+    assert '"status": "cancelled"' in events[0]
+
+
+def test_cancel_job(client, mock_async_redis):
+    mock_async_redis.exists.return_value = 1
+
+    response = client.post("/jobs/abc/cancel")
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "Job abc has been cancelled."}
+    mock_async_redis.hset.assert_called_once_with("job:abc", "cancelled", 1)
+
+
+def test_cancel_job_not_found(client, mock_async_redis):
+    mock_async_redis.exists.return_value = 0
+
+    response = client.post("/jobs/abc/cancel")
+
+    assert response.status_code == 404
+    mock_async_redis.hset.assert_not_called()
+
+
+def test_metrics(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "upload_parse_seconds" in response.text
+    assert "redis_command_seconds" in response.text
@@ -1,17 +1,25 @@
 from datetime import datetime
 from uuid import uuid4
 
+import numpy as np
 import pytest
 
 from app.models import DebtRecord
-from app.services.boleto_services import BoletoService
+from app.services.boleto_engine import (
+    BoletoEngine,
+    LocalDirectoryBoletoSink,
+    compute_codes,
+    due_factors,
+    format_digitable_line,
+)
+from app.services.boleto_services import BoletoService, PdfBoletoService
 from app.services.email_services import EmailService
-from app.utils.logger import logger
+from app.utils.logger import debt_logger
 
 
 @pytest.fixture
 def mock_logger(mocker):
-    mock_info = mocker.patch.object(logger, "info", autospec=True)
+    mock_info = mocker.patch.object(debt_logger, "info", autospec=True)
     yield mock_info
 
 
@@ -29,7 +37,7 @@ def test_generate_boleto(mock_logger):
     boleto_service.generate_boleto(debt)
 
     mock_logger.assert_called_once_with(
-        f"Simulating boleto generation for Debt ID: {debt.debtId}"
+        "Simulating boleto generation for Debt ID: %s", debt.debtId
     )
 
 
@@ -41,5 +49,94 @@ def test_send_email(mock_logger):
     email_service.send_email(email, message)
 
     mock_logger.assert_called_once_with(
-        f"Simulating email sent to: {email} with message: {message}"
+        "Simulating email sent to: %s with message: %s", email, message
     )
+
+
+def test_generate_boletos_falls_back_to_single_records(mocker):
+    debts = [
+        DebtRecord(
+            name="Test User",
+            governmentId=12345678900,
+            email="test@example.com",
+            debtAmount=1000,
+            debtDueDate=datetime(2023, 12, 31),
+            debtId=uuid4(),
+        )
+        for _ in range(2)
+    ]
+    boleto_service = BoletoService()
+    error = Exception("Boleto error")
+    mocker.patch.object(
+        boleto_service, "generate_boleto", side_effect=[None, error]
+    )
+
+    assert boleto_service.generate_boletos(debts) == [None, error]
+    boleto_service.generate_boleto.assert_has_calls(
+        [mocker.call(debt) for debt in debts]
+    )
+
+
+def test_send_emails_falls_back_to_single_messages(mock_logger):
+    messages = [("a@example.com", "First"), ("b@example.com", "Second")]
+
+    email_service = EmailService()
+
+    assert email_service.send_emails(messages) == [None, None]
+    mock_logger.assert_any_call(
+        "Simulating email sent to: %s with message: %s",
+        "b@example.com",
+        "Second",
+    )
+
+
+def test_compute_codes():
+    barcodes, lines = compute_codes(
+        np.array([100]),
+        np.array([3737]),
+        ["0500940144816060680935031"],
+        "001",
+    )
+
+    assert barcodes == ["00193373700000001000500940144816060680935031"]
+    assert (
+        format_digitable_line(lines[0])
+        == "00190.50095 40144.816069 06809.350314 3 37370000000100"
+    )
+
+
+def test_due_factors_reset_after_9999():
+    factors = due_factors(
+        [
+            datetime(2025, 2, 21),
+            datetime(2025, 2, 22),
+            datetime(1997, 10, 6),
+        ]
+    )
+
+    assert factors.tolist() == [9999, 1000, -1]
+
+
+def test_pdf_boleto_service_writes_documents(tmp_path):
+    engine = BoletoEngine(sink=LocalDirectoryBoletoSink(str(tmp_path)))
+    debts = [
+        DebtRecord(
+            name="Test User",
+            governmentId=12345678900,
+            email="test@example.com",
+            debtAmount=amount,
+            debtDueDate=datetime(due_year, 12, 31),
+            debtId=uuid4(),
+        )
+        for amount, due_year in ((1000, 2023), (1500, 1990))
+    ]
+
+    errors = PdfBoletoService(engine).generate_boletos(debts)
+
+    assert errors[0] is None
+    assert isinstance(errors[1], ValueError)
+    document = (tmp_path / f"{debts[0].debtId}.pdf").read_bytes()
+    assert document.startswith(b"%PDF")
+    assert len(document) == len(engine.template.document)
+    assert b"R$ 1.000,00" in document
+    assert not (tmp_path / f"{debts[1].debtId}.pdf").exists()
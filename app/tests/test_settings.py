@@ -0,0 +1,78 @@
+import pytest
+from pydantic import ValidationError
+
+from app.celery import celery_config
+from app.config.settings import Settings
+
+
+def test_settings_defaults(mocker):
+    mocker.patch.dict("os.environ", {}, clear=True)
+
+    settings = Settings(_env_file=None)
+
+    assert settings.CHUNK_SIZE == 10000
+    assert settings.CELERY_PREFETCH_MULTIPLIER == 1
+    assert settings.CELERY_RESULT_BACKEND_ENABLED is True
+    assert settings.DEDUP_BACKEND == "set"
+    assert settings.LOG_QUEUE_ENABLED is False
+    assert settings.DEBT_LOG_MODE == "all"
+
+
+def test_settings_from_environment(mocker):
+    mocker.patch.dict(
+        "os.environ",
+        {
+            "CHUNK_SIZE": "2500",
+            "CELERY_ACKS_LATE": "true",
+            "CELERY_BROKER_URL": "amqp://broker:5672//",
+            "DUE_DATE_PRIORITIES": "[[2, 8], [10, 4]]",
+        },
+    )
+
+    settings = Settings(_env_file=None)
+
+    assert settings.CHUNK_SIZE == 2500
+    assert settings.CELERY_ACKS_LATE is True
+    assert settings.CELERY_BROKER == "amqp://broker:5672//"
+    assert settings.DUE_DATE_PRIORITIES == ((2, 8), (10, 4))
+
+
+def test_settings_from_env_file(mocker, tmp_path):
+    mocker.patch.dict("os.environ", {}, clear=True)
+    env_file = tmp_path / ".env"
+    env_file.write_text("DEDUP_BACKEND=sharded\nWORKER_CONCURRENCY=16\n")
+
+    settings = Settings(_env_file=env_file)
+
+    assert settings.DEDUP_BACKEND == "sharded"
+    assert settings.WORKER_CONCURRENCY == 16
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [("DEDUP_BACKEND", "list"), ("CHUNK_SIZE", "0"), ("LOG_FORMAT", "xml")],
+)
+def test_settings_rejects_invalid_values(mocker, name, value):
+    mocker.patch.dict("os.environ", {name: value})
+
+    with pytest.raises(ValidationError):
+        Settings(_env_file=None)
+
+
+def test_celery_config():
+    settings = Settings(
+        _env_file=None,
+        CELERY_PREFETCH_MULTIPLIER=4,
+        CELERY_ACKS_LATE=True,
+        CELERY_MAX_TASKS_PER_CHILD=1000,
+        CELERY_TASK_COMPRESSION="zlib",
+        CELERY_RESULT_BACKEND_ENABLED=False,
+    )
+
+    config = celery_config(settings)
+
+    assert config["worker_prefetch_multiplier"] == 4
+    assert config["task_acks_late"] is True
+    assert config["worker_max_tasks_per_child"] == 1000
+    assert config["task_compression"] == "zlib"
+    assert config["task_ignore_result"] is True
@@ -0,0 +1,150 @@
+import smtplib
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.services.smtp_email_services import SMTPEmailService
+
+
+class RecordingHandler:
+    def __init__(self, replies=(), rcpt_replies=()):
+        self.replies = list(replies)
+        self.rcpt_replies = list(rcpt_replies)
+        self.rcpt_attempts = 0
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, options):
+        self.rcpt_attempts += 1
+        self.sessions.add(id(session))
+        if self.rcpt_replies:
+            return self.rcpt_replies.pop(0)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.replies:
+            return self.replies.pop(0)
+        self.messages.append(envelope)
+        self.sessions.add(id(session))
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    def start(replies=(), rcpt_replies=()):
+        handler = RecordingHandler(replies, rcpt_replies)
+        controller = Controller(
+            handler, hostname="127.0.0.1", port=free_port()
+        )
+        controller.start()
+        controllers.append(controller)
+        return handler, controller
+
+    controllers = []
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+def build_service(controller, **kwargs):
+    return SMTPEmailService(
+        host=controller.hostname,
+        port=controller.port,
+        retry_backoff=0,
+        timeout=5,
+        **kwargs,
+    )
+
+
+def test_send_emails_reuses_pooled_connections(smtp_server):
+    handler, controller = smtp_server()
+    service = build_service(controller, pool_size=2)
+    messages = [(f"user{i}@example.com", f"Message {i}") for i in range(10)]
+
+    assert service.send_emails(messages) == [None] * 10
+
+    service.close()
+    assert sorted(m.rcpt_tos[0] for m in handler.messages) == sorted(
+        email for email, _ in messages
+    )
+    assert len(handler.sessions) <= 2
+
+
+def test_send_email_retries_transient_failures(smtp_server):
+    handler, controller = smtp_server(replies=["451 Try again later"])
+    service = build_service(controller)
+
+    service.send_email("test@example.com", "Test message")
+
+    service.close()
+    assert len(handler.messages) == 1
+    assert b"Test message" in handler.messages[0].content
+
+
+def test_send_email_raises_permanent_failures(smtp_server):
+    handler, controller = smtp_server(replies=["550 Mailbox unavailable"])
+    service = build_service(controller)
+
+    with pytest.raises(smtplib.SMTPResponseException) as error:
+        service.send_email("test@example.com", "Test message")
+
+    service.close()
+    assert error.value.smtp_code == 550
+    assert handler.messages == []
+
+
+def test_send_email_retries_deferred_recipients(smtp_server):
+    handler, controller = smtp_server(rcpt_replies=["450 Mailbox busy"])
+    service = build_service(controller)
+
+    service.send_email("test@example.com", "Test message")
+
+    service.close()
+    assert handler.rcpt_attempts == 2
+    assert len(handler.messages) == 1
+    assert len(handler.sessions) == 1
+
+
+def test_send_email_raises_refused_recipients(smtp_server):
+    handler, controller = smtp_server(rcpt_replies=["550 No such user"])
+    service = build_service(controller)
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused) as error:
+        service.send_email("test@example.com", "Test message")
+
+    assert handler.rcpt_attempts == 1
+    assert error.value.recipients["test@example.com"][0] == 550
+    service.send_email("other@example.com", "Test message")
+    service.close()
+    assert [m.rcpt_tos for m in handler.messages] == [["other@example.com"]]
+
+
+def test_send_email_raises_connection_errors():
+    service = SMTPEmailService(host="a" * 64 + ".example.com", timeout=5)
+
+    with pytest.raises(UnicodeError):
+        service.send_email("test@example.com", "Test message")
+
+
+def test_send_emails_reports_failures_per_message(smtp_server):
+    handler, controller = smtp_server(
+        replies=["451 Try again later", "451 Try again later"]
+    )
+    service = build_service(controller, pool_size=1, max_retries=1)
+
+    results = service.send_emails(
+        [("a@example.com", "First"), ("b@example.com", "Second")]
+    )
+
+    service.close()
+    assert isinstance(results[0], smtplib.SMTPResponseException)
+    assert results[1] is None
+    assert [m.rcpt_tos for m in handler.messages] == [["b@example.com"]]
@@ -1,12 +1,31 @@
+import asyncio
+from io import BytesIO
+
+import fakeredis
+import pandas as pd
 import pytest
+from prometheus_client import REGISTRY
 
+from app.models import DebtRecord
+from app.services.async_services import ThreadedBoletoService
+from app.services.interfaces import IAsyncBoletoService, IAsyncEmailService
+from app.tasks.batching import DebtBatcher, dispatch_debt_batch, submit_debt
 from app.tasks.tasks import (
     all_tasks_done_task,
+    chunk_summary,
     generate_boleto,
+    generate_boletos_task,
     process_chunk_task,
     process_debt_task,
+    process_debts_async,
+    process_file_range_task,
     send_email,
+    send_emails_task,
 )
+from app.utils.dedup import DedupIndex
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import JobTracker
+from app.utils.serialization import iter_records, to_columnar
 
 
 @pytest.fixture
@@ -26,86 +45,337 @@ def mock_services(mocker):
     mock_boleto_service = mocker.patch("app.tasks.tasks.BoletoService")
     mock_email_service = mocker.patch("app.tasks.tasks.EmailService")
     mock_logger = mocker.patch("app.tasks.tasks.logger")
+    mock_boleto_service.return_value.generate_boletos.side_effect = (
+        lambda debts: [None for _ in debts]
+    )
+    mock_email_service.return_value.send_emails.side_effect = (
+        lambda messages: [None for _ in messages]
+    )
 
     return mock_boleto_service, mock_email_service, mock_logger
 
 
 def test_process_debt_task_success(mocker, debt_data, mock_services):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_debt_logger = mocker.patch("app.tasks.tasks.debt_logger")
 
     result = process_debt_task(debt_data)
     assert result == "Processed Debt ID: 76403498-cffe-4c06-895e-f60ba27443b3"
     mock_boleto_service.return_value.generate_boleto.assert_called_once()
     mock_email_service.return_value.send_email.assert_called_once()
-    mock_logger.info.assert_called_with(
+    mock_debt_logger.info.assert_called_with(
         "Processed Debt ID: 76403498-cffe-4c06-895e-f60ba27443b3"
     )
 
 
 def test_process_debt_task_failure(mocker, mock_services):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_debt_logger = mocker.patch("app.tasks.tasks.debt_logger")
 
     invalid_data = {"email": "invalid_email"}
     result = process_debt_task(invalid_data)
     assert result.startswith("Error processing Debt ID")
-    mock_logger.info.assert_called()
+    mock_debt_logger.info.assert_called()
 
 
-def test_process_chunk_task_success(mocker, mock_services):
+def test_process_chunk_task_success(mocker, debt_data, mock_services):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
     mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
-    mock_process_debt_task = mocker.patch("app.tasks.tasks.process_debt_task")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_pipeline = mock_redis_client.pipeline.return_value
 
-    mock_redis_client.smembers.return_value = {"111"}
-    mock_process_debt_task.return_value = (
-        "Processed Debt ID: 76403498-cffe-4c06-895e-f60ba27443b3"
-    )
+    processed_id = "a2e2c3a0-1a53-4a3b-9c6e-2c1f1f6e1111"
+    mock_claim.return_value = [debt_data["debtId"]]
 
     chunk_data = [
-        {"debtId": "123", "email": "test@example.com", "debtAmount": 50.0},
+        debt_data,
         {
-            "debtId": "111",
+            **debt_data,
             "email": "already_processed@example.com",
-            "debtAmount": 100.0,
+            "debtId": processed_id,
         },
     ]
 
     result = process_chunk_task(chunk_data)
-    assert len(result) == 1
+    assert result == {
+        "processed": 1,
+        "duplicates": 1,
+        "failed": 0,
+        "errors": [],
+    }
+    mock_claim.assert_called_once_with(
+        keys=[
+            "processed_debts",
+            "processing_debts:" + debt_data["debtId"],
+            "processing_debts:" + processed_id,
+        ],
+        args=[300, mocker.ANY, debt_data["debtId"], processed_id],
+    )
+    mock_generate_boletos = mock_boleto_service.return_value.generate_boletos
+    mock_generate_boletos.assert_called_once()
+    [debt] = mock_generate_boletos.call_args.args[0]
+    assert str(debt.debtId) == debt_data["debtId"]
+    mock_email_service.return_value.send_emails.assert_called_once_with(
+        [
+            (
+                "test@example.com",
+                f"Your boleto with the debt uuid {debt_data['debtId']} "
+                "and value 1000 is ready.",
+            )
+        ]
+    )
+    mock_pipeline.sadd.assert_called_once_with(
+        "processed_debts", debt_data["debtId"]
+    )
+    mock_pipeline.delete.assert_called_once_with(
+        f"processing_debts:{debt_data['debtId']}"
+    )
     mock_logger.info.assert_called_with(
-        "Finished processing chunk with 1 results"
+        "Finished processing chunk: %d processed, %d duplicates, %d failed",
+        1,
+        1,
+        0,
+        extra={"job_id": None, "seconds": mocker.ANY, **result},
     )
 
 
-def test_process_chunk_task_failure(mocker, mock_services):
+def test_process_chunk_task_keeps_claim_of_failed_debts(
+    mocker, debt_data, mock_services
+):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
     mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_pipeline = mock_redis_client.pipeline.return_value
+
+    failing_id = "a2e2c3a0-1a53-4a3b-9c6e-2c1f1f6e2222"
+    invalid_data = {**debt_data, "debtId": "222", "email": "invalid_email"}
+    mock_claim.return_value = [debt_data["debtId"], failing_id]
+    mock_boleto_service.return_value.generate_boletos.side_effect = (
+        lambda debts: [None, Exception("Boleto error")]
+    )
 
-    mock_redis_client.smembers.side_effect = Exception("Redis error")
-    chunk_data = [
-        {"debtId": "123", "email": "test@example.com", "debtAmount": 50.0}
-    ]
+    result = process_chunk_task(
+        [debt_data, invalid_data, {**debt_data, "debtId": failing_id}]
+    )
+    assert result["processed"] == 1
+    assert result["duplicates"] == 0
+    assert result["failed"] == 2
+    assert result["errors"][0].startswith(
+        "Error processing Debt ID 222: email:"
+    )
+    assert (
+        result["errors"][1]
+        == f"Error processing Debt ID {failing_id}: Boleto error"
+    )
+    mock_claim.assert_called_once_with(
+        keys=[
+            "processed_debts",
+            "processing_debts:" + debt_data["debtId"],
+            "processing_debts:" + failing_id,
+        ],
+        args=[300, mocker.ANY, debt_data["debtId"], failing_id],
+    )
+    mock_email_service.return_value.send_emails.assert_called_once()
+    mock_pipeline.sadd.assert_called_once_with(
+        "processed_debts", debt_data["debtId"]
+    )
+    mock_pipeline.delete.assert_called_once_with(
+        f"processing_debts:{debt_data['debtId']}"
+    )
+
+
+def test_process_chunk_task_columnar_chunk(mocker, debt_data, mock_services):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_claim.return_value = [debt_data["debtId"]]
+    chunk_data = {
+        "columns": list(debt_data),
+        "data": [[value] for value in debt_data.values()],
+    }
+
+    result = process_chunk_task(chunk_data)
+    assert result["processed"] == 1
+    mock_claim.assert_called_once_with(
+        keys=[
+            "processed_debts",
+            "processing_debts:" + debt_data["debtId"],
+        ],
+        args=[300, mocker.ANY, debt_data["debtId"]],
+    )
+
+
+def test_process_chunk_task_failure(mocker, debt_data, mock_services):
+    mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+
+    mock_redis_client.register_script.return_value.side_effect = Exception(
+        "Redis error"
+    )
     with pytest.raises(Exception):
-        process_chunk_task(chunk_data)
+        process_chunk_task([debt_data])
     mock_logger.error.assert_called()
 
 
-def test_all_tasks_done_task_success(mocker, mock_services):
+def test_process_chunk_task_asyncio_mode(mocker, debt_data, mock_services):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mocker.patch("app.tasks.tasks.CHUNK_EXECUTION_MODE", "asyncio")
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    failing_id = "a2e2c3a0-1a53-4a3b-9c6e-2c1f1f6e2222"
+    mock_redis_client.register_script.return_value.return_value = [
+        debt_data["debtId"],
+        failing_id,
+    ]
+
+    def send_email(email, message):
+        if failing_id in message:
+            raise Exception("SMTP error")
+
+    mock_email_service.return_value.send_email.side_effect = send_email
+
+    result = process_chunk_task(
+        [debt_data, {**debt_data, "debtId": failing_id}]
+    )
+
+    assert result == {
+        "processed": 1,
+        "duplicates": 0,
+        "failed": 1,
+        "errors": [f"Error processing Debt ID {failing_id}: SMTP error"],
+    }
+    mock_boleto_service.return_value.generate_boletos.assert_called_once()
+    mock_boleto_service.return_value.generate_boleto.assert_not_called()
+    mock_redis_client.pipeline.return_value.sadd.assert_called_once_with(
+        "processed_debts", debt_data["debtId"]
+    )
+
+
+def test_process_debts_async_bounds_concurrency(debt_data):
+    in_flight = 0
+    max_in_flight = 0
 
-    results = [{"processed_debts": 2}, {"processed_debts": 3}]
-    result = all_tasks_done_task(results)
-    assert result["processed_count"] == 2
-    assert result["total_debts"] == 5
+    class SlowBoletoService(IAsyncBoletoService):
+        async def generate_boleto(self, debt):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if debt.name == "fail":
+                raise ValueError("Boleto error")
+
+    class RecordingEmailService(IAsyncEmailService):
+        def __init__(self):
+            self.sent = []
+
+        async def send_email(self, email, message):
+            self.sent.append(email)
+
+    debts = [
+        DebtRecord(**{**debt_data, "name": "fail" if i == 3 else "ok"})
+        for i in range(20)
+    ]
+    email_service = RecordingEmailService()
+
+    errors = asyncio.run(
+        process_debts_async(
+            debts, SlowBoletoService(), email_service, concurrency=5
+        )
+    )
+
+    assert max_in_flight == 5
+    assert [i for i, error in enumerate(errors) if error] == [3]
+    assert len(email_service.sent) == 19
+
+
+def test_threaded_boleto_service_generates_batch_in_one_call(mocker):
+    service = mocker.Mock()
+    service.generate_boletos.return_value = [None, None]
+    debts = [mocker.Mock(), mocker.Mock()]
+
+    errors = asyncio.run(
+        ThreadedBoletoService(service).generate_boletos(debts, 10)
+    )
+
+    assert errors == [None, None]
+    service.generate_boletos.assert_called_once_with(debts)
+    service.generate_boleto.assert_not_called()
+
+
+def test_process_file_range_task(mocker, tmp_path):
+    mocker.patch(
+        "app.tasks.tasks.LocalFileStorage",
+        return_value=LocalFileStorage(str(tmp_path)),
+    )
+    mock_chunk_task = mocker.patch("app.tasks.tasks.process_chunk_task")
+    (tmp_path / "abc.csv").write_bytes(
+        b"debtId,debtAmount\n1,10\n2,20\n3,30\n"
+    )
+
+    process_file_range_task("abc", 23, 10)
+
+    mock_chunk_task.assert_called_once_with(
+        {"columns": ["debtId", "debtAmount"], "data": [[2, 3], [20, 30]]},
+        None,
+        None,
+    )
+
+
+def test_process_file_range_task_skips_cancelled_job(mocker, tmp_path):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.hexists.return_value = True
+    mock_storage = mocker.patch("app.tasks.tasks.LocalFileStorage")
+    mock_chunk_task = mocker.patch("app.tasks.tasks.process_chunk_task")
+
+    process_file_range_task("abc", 23, 10, "job", ["root", "range"])
+
+    mock_storage.assert_not_called()
+    mock_chunk_task.assert_called_once_with([], "job", ["root", "range"])
+
+
+def test_all_tasks_done_task_deletes_stored_file(mocker, tmp_path):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.tasks.tasks.redis_client", client)
+    storage = LocalFileStorage(str(tmp_path))
+    mocker.patch("app.tasks.tasks.LocalFileStorage", return_value=storage)
+    file_id = storage.save(BytesIO(b"debtId\n1\n"))
+    job_id = JobTracker(client).create("test.csv", file_id)
+
+    all_tasks_done_task(job_id)
+
+    assert not storage.path(file_id).exists()
+
+
+def test_all_tasks_done_task_success(mocker, mock_services):
+    mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_tracker = mocker.patch("app.tasks.tasks.JobTracker")
+    mock_tracker.return_value.get.return_value = {
+        "completed_chunks": 2,
+        "processed": 5,
+        "duplicates": 1,
+        "failed": 1,
+    }
+    mock_tracker.return_value.error_samples.return_value = ["Boleto error"]
+
+    result = all_tasks_done_task("abc")
+    assert result == {
+        "job_id": "abc",
+        "processed_count": 2,
+        "total_debts": 5,
+        "duplicates": 1,
+        "failed": 1,
+        "errors": ["Boleto error"],
+    }
+    mock_tracker.return_value.get.assert_called_once_with("abc")
     mock_logger.info.assert_any_call("Tasks completed: 2")
     mock_logger.info.assert_any_call("Total debts processed: 5")
 
 
 def test_all_tasks_done_task_failure(mocker, mock_services):
     mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_tracker = mocker.patch("app.tasks.tasks.JobTracker")
+    mock_tracker.return_value.get.return_value = None
 
-    results = None
-    result = all_tasks_done_task(results)
+    result = all_tasks_done_task("abc")
     assert result["processed_count"] == 0
     assert "error" in result
     mock_logger.error.assert_called()
@@ -126,3 +396,378 @@ def test_send_email(mocker, mock_services):
     mock_logger.info.assert_called_with(
         "Sending email to: test@example.com with message: Test message"
     )
+
+
+def test_process_chunk_task_completes_job_of_last_chunk(
+    mocker, debt_data, mock_services
+):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.register_script.return_value.return_value = [
+        debt_data["debtId"]
+    ]
+    mock_redis_client.hexists.return_value = False
+    mock_redis_client.pipeline.return_value.execute.return_value = [
+        ["dispatched", "3", "3"]
+    ]
+    mock_redis_client.hsetnx.return_value = 1
+    mock_done_task = mocker.patch("app.tasks.tasks.all_tasks_done_task")
+
+    process_chunk_task([debt_data], "abc")
+
+    mock_redis_client.hsetnx.assert_called_once_with(
+        "job:abc", "finished_at", mocker.ANY
+    )
+    mock_done_task.apply_async.assert_called_once_with(("abc",))
+
+
+def test_process_chunk_task_does_not_complete_unfinished_job(
+    mocker, debt_data, mock_services
+):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.register_script.return_value.return_value = []
+    mock_redis_client.hexists.return_value = False
+    mock_redis_client.pipeline.return_value.execute.return_value = [
+        ["dispatched", "3", "2"]
+    ]
+    mock_done_task = mocker.patch("app.tasks.tasks.all_tasks_done_task")
+
+    process_chunk_task([debt_data], "abc")
+
+    mock_redis_client.hsetnx.assert_not_called()
+    mock_done_task.apply_async.assert_not_called()
+
+
+def test_chunk_tasks_ignore_results():
+    assert process_chunk_task.ignore_result
+    assert process_debt_task.ignore_result
+    assert generate_boletos_task.ignore_result
+    assert send_emails_task.ignore_result
+    assert not all_tasks_done_task.ignore_result
+
+
+def test_process_chunk_task_records_job_progress(
+    mocker, debt_data, mock_services
+):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.register_script.return_value.return_value = []
+    mock_redis_client.hexists.return_value = False
+    mock_pipeline = mock_redis_client.pipeline.return_value
+
+    process_chunk_task([debt_data], "abc")
+
+    mock_pipeline.hincrby.assert_any_call("job:abc", "completed_chunks", 1)
+    mock_pipeline.hincrby.assert_any_call("job:abc", "duplicates", 1)
+    mock_pipeline.hset.assert_called_once_with(
+        "job:abc", "updated_at", mocker.ANY
+    )
+    assert not mock_pipeline.hincrbyfloat.called
+
+
+def test_process_chunk_task_records_metrics(mocker, debt_data, mock_services):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_claim.return_value = [debt_data["debtId"]]
+    duplicate = {**debt_data, "debtId": "2d8f6f4a-0d1e-4c1b-9c7d-3f5e7a9b1c2d"}
+
+    def sample(name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    before = {
+        name: sample(name)
+        for name in (
+            "debts_processed_total",
+            "dedup_hits_total",
+            "chunk_processing_seconds_count",
+        )
+    }
+    task_count = sample(
+        "chunk_task_seconds_count", {"task": "process_chunk_task"}
+    )
+
+    process_chunk_task([debt_data, duplicate])
+
+    assert (
+        sample("debts_processed_total") == before["debts_processed_total"] + 1
+    )
+    assert sample("dedup_hits_total") == before["dedup_hits_total"] + 1
+    assert (
+        sample("chunk_processing_seconds_count")
+        == before["chunk_processing_seconds_count"] + 1
+    )
+    assert (
+        sample("chunk_task_seconds_count", {"task": "process_chunk_task"})
+        == task_count + 1
+    )
+
+
+def test_process_chunk_task_commits_checkpoint(
+    mocker, debt_data, mock_services
+):
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_claim.return_value = [debt_data["debtId"]]
+
+    process_chunk_task([debt_data], None, ["root", "block1", "block2"])
+
+    mock_pipeline = mock_redis_client.pipeline.return_value
+    mock_pipeline.sadd.assert_called_with(
+        "checkpoint:root", "block1", "block2"
+    )
+    mock_pipeline.execute.assert_called_once()
+
+
+def test_process_chunk_task_skips_checkpoint_of_failed_chunk(
+    mocker, debt_data, mock_services
+):
+    mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_claim.return_value = [debt_data["debtId"]]
+    mock_boleto_service.return_value.generate_boletos.side_effect = (
+        lambda debts: [Exception("Boleto error")]
+    )
+
+    process_chunk_task([debt_data], None, ["root", "digest"])
+
+    mock_redis_client.pipeline.return_value.sadd.assert_not_called()
+
+
+def test_process_chunk_task_skips_cancelled_job(
+    mocker, debt_data, mock_services
+):
+    mock_boleto_service, mock_email_service, mock_logger = mock_services
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.hexists.return_value = True
+
+    result = process_chunk_task([debt_data], "abc")
+
+    assert result["processed"] == 0
+    mock_redis_client.register_script.return_value.assert_not_called()
+    mock_boleto_service.return_value.generate_boletos.assert_not_called()
+    mock_redis_client.pipeline.return_value.hincrby.assert_called_once_with(
+        "job:abc", "completed_chunks", 1
+    )
+
+
+def test_process_chunk_task_staged_forwards_claimed_debts(
+    mocker, debt_data, mock_services
+):
+    mock_boleto_service, _, _ = mock_services
+    mocker.patch("app.tasks.tasks.PIPELINE_MODE", "staged")
+    mock_stage = mocker.patch("app.tasks.tasks.generate_boletos_task")
+    mock_redis_client = mocker.patch("app.tasks.tasks.redis_client")
+    mock_redis_client.hexists.return_value = False
+    mock_claim = mock_redis_client.register_script.return_value
+    mock_claim.return_value = [debt_data["debtId"]]
+
+    result = process_chunk_task(
+        [debt_data, debt_data, {"debtId": "bad"}], "abc", ["root", "block"]
+    )
+
+    assert result == {
+        "processed": 0,
+        "duplicates": 1,
+        "failed": 1,
+        "errors": [mocker.ANY],
+    }
+    mock_boleto_service.return_value.generate_boletos.assert_not_called()
+    token = mock_claim.call_args.kwargs["args"][1]
+    ((batch, *args),), kwargs = mock_stage.apply_async.call_args
+    assert list(iter_records(batch)) == [
+        {**debt_data, "debtDueDate": "2024-07-12T00:00:00"}
+    ]
+    assert args == ["abc", ["root", "block"], result, mocker.ANY, token, 9]
+    assert kwargs == {"priority": 9}
+    mock_redis_client.pipeline.return_value.hincrby.assert_not_called()
+
+
+def test_generate_boletos_task_forwards_emails(
+    mocker, debt_data, mock_services
+):
+    mock_boleto_service, _, _ = mock_services
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.tasks.tasks.redis_client", client)
+    mock_stage = mocker.patch("app.tasks.tasks.send_emails_task")
+    failing_data = {
+        **debt_data,
+        "debtId": "a2e2c3a0-1a53-4a3b-9c6e-2c1f1f6e2222",
+    }
+    DedupIndex(client, claim_ttl=5).claim(
+        [debt_data["debtId"], failing_data["debtId"]], "token"
+    )
+    mock_boleto_service.return_value.generate_boletos.side_effect = (
+        lambda debts: [None, Exception("Boleto error")]
+    )
+    summary = chunk_summary(duplicates=1)
+
+    result = generate_boletos_task(
+        to_columnar(pd.DataFrame([debt_data, failing_data])),
+        "abc",
+        ["root", "block"],
+        summary,
+        1.0,
+        "token",
+        9,
+    )
+
+    assert result["failed"] == 1
+    assert client.ttl(f"processing_debts:{debt_data['debtId']}") > 5
+    assert client.ttl(f"processing_debts:{failing_data['debtId']}") > 5
+    mock_stage.apply_async.assert_called_once_with(
+        (
+            {
+                "columns": ["debtId", "email", "message"],
+                "data": [
+                    [debt_data["debtId"]],
+                    ["test@example.com"],
+                    [
+                        f"Your boleto with the debt uuid "
+                        f"{debt_data['debtId']} and value 1000 is ready."
+                    ],
+                ],
+            },
+            "abc",
+            None,
+            result,
+            mocker.ANY,
+            "token",
+        ),
+        priority=9,
+    )
+
+
+def test_generate_boletos_task_skips_debts_claimed_again(
+    mocker, debt_data, mock_services
+):
+    mock_boleto_service, _, _ = mock_services
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.tasks.tasks.redis_client", client)
+    mock_stage = mocker.patch("app.tasks.tasks.send_emails_task")
+    index = DedupIndex(client)
+    index.claim([debt_data["debtId"]], "first upload")
+    client.delete(f"processing_debts:{debt_data['debtId']}")
+    index.claim([debt_data["debtId"]], "second upload")
+
+    result = generate_boletos_task(
+        to_columnar(pd.DataFrame([debt_data])),
+        "abc",
+        None,
+        chunk_summary(),
+        1.0,
+        "first upload",
+    )
+
+    assert result == chunk_summary(duplicates=1)
+    mock_boleto_service.return_value.generate_boletos.assert_called_once_with(
+        []
+    )
+    mock_stage.apply_async.assert_not_called()
+    assert (
+        client.get(f"processing_debts:{debt_data['debtId']}")
+        == "second upload"
+    )
+
+
+def test_send_emails_task_completes_chunk(mocker, debt_data, mock_services):
+    _, mock_email_service, _ = mock_services
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mocker.patch("app.tasks.tasks.redis_client", client)
+    lost_id = "a2e2c3a0-1a53-4a3b-9c6e-2c1f1f6e2222"
+    DedupIndex(client).claim([debt_data["debtId"], lost_id], "token")
+    client.set(f"processing_debts:{lost_id}", "other upload")
+    job_id = JobTracker(client).create("test.csv")
+    messages = {
+        "columns": ["debtId", "email", "message"],
+        "data": [
+            [debt_data["debtId"], lost_id],
+            ["test@example.com", "lost@example.com"],
+            ["Hello", "Lost"],
+        ],
+    }
+
+    result = send_emails_task(
+        messages,
+        job_id,
+        ["root", "block"],
+        chunk_summary(duplicates=1),
+        1.0,
+        "token",
+    )
+
+    assert result == chunk_summary(processed=1, duplicates=2)
+    mock_email_service.return_value.send_emails.assert_called_once_with(
+        [("test@example.com", "Hello")]
+    )
+    assert client.smembers("processed_debts") == {debt_data["debtId"]}
+    assert client.smembers("checkpoint:root") == {"block"}
+    assert not client.exists(f"processing_debts:{debt_data['debtId']}")
+    assert client.get(f"processing_debts:{lost_id}") == "other upload"
+    job = JobTracker(client).get(job_id)
+    assert job["completed_chunks"] == 1
+    assert job["processed"] == 1
+
+
+def test_debt_batcher_flushes_full_batch(mocker):
+    process = mocker.Mock()
+    messages = [mocker.Mock() for _ in range(3)]
+    batcher = DebtBatcher(process, max_size=2, max_wait=10)
+
+    for i, message in enumerate(messages):
+        batcher.add({"debtId": str(i)}, message)
+
+    process.assert_called_once_with([{"debtId": "0"}, {"debtId": "1"}])
+    messages[0].ack.assert_called_once()
+    messages[1].ack.assert_called_once()
+    messages[2].ack.assert_not_called()
+    assert len(batcher) == 1
+
+
+def test_debt_batcher_flushes_expired_batch(mocker):
+    mock_time = mocker.patch("app.tasks.batching.time.monotonic")
+    mock_time.return_value = 100.0
+    process = mocker.Mock()
+    batcher = DebtBatcher(process, max_size=10, max_wait=0.5)
+    batcher.add({"debtId": "0"}, mocker.Mock())
+
+    mock_time.return_value = 100.4
+    batcher.flush_expired()
+    process.assert_not_called()
+
+    mock_time.return_value = 100.5
+    batcher.flush_expired()
+    process.assert_called_once_with([{"debtId": "0"}])
+    assert len(batcher) == 0
+
+
+def test_debt_batcher_requeues_failed_batch(mocker):
+    mocker.patch("app.tasks.batching.logger")
+    process = mocker.Mock(side_effect=Exception("Broker error"))
+    message = mocker.Mock()
+    batcher = DebtBatcher(process, max_size=1)
+
+    batcher.add({"debtId": "0"}, message)
+
+    message.requeue.assert_called_once()
+    message.ack.assert_not_called()
+
+
+def test_dispatch_debt_batch(mocker, debt_data):
+    mock_chunk_task = mocker.patch("app.tasks.batching.process_chunk_task")
+
+    dispatch_debt_batch([debt_data, debt_data])
+
+    mock_chunk_task.apply_async.assert_called_once_with(
+        ([debt_data, debt_data],), priority=9
+    )
+
+
+def test_submit_debt(mocker, debt_data):
+    mock_acquire = mocker.patch("app.tasks.batching.app.producer_or_acquire")
+    mock_producer = mock_acquire.return_value.__enter__.return_value
+
+    submit_debt(debt_data)
+
+    mock_producer.publish.assert_called_once()
+    args, kwargs = mock_producer.publish.call_args
+    assert args == (debt_data,)
+    assert kwargs["routing_key"] == "debt_batch_queue"
@@ -1,9 +1,741 @@
+import asyncio
+import json
 import logging
+import sys
+import time
+import warnings
+from datetime import datetime
+from hashlib import sha256
+from io import BytesIO
 
-from app.utils.logger import configure_logging
+import fakeredis
+import pandas as pd
+import pytest
+from kombu import serialization
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+from redis import ConnectionPool
+
+from app.models import DebtRecord
+from app.utils.chunking import (
+    ChunkSizer,
+    observed_row_seconds,
+    record_row_seconds,
+)
+from app.utils.csv_stream import CsvChunkStream, CsvStreamError
+from app.utils.dedup import DedupIndex, ShardedDedupIndex, get_dedup_index
+from app.utils.file_storage import LocalFileStorage
+from app.utils.jobs import AsyncJobTracker, JobTracker, job_progress
+from app.utils.logger import (
+    JsonFormatter,
+    configure_debt_logger,
+    configure_logging,
+)
+from app.utils.metrics import observe_publish, start_publish_timer
+from app.utils.redis_client import (
+    InstrumentedRedis,
+    RedisClient,
+    create_async_redis_client,
+    create_redis_client,
+    redis_batch,
+)
+from app.utils.scheduling import chunk_priority, due_date_priority
+from app.utils.serialization import (
+    count_records,
+    dumps_columnar,
+    iter_records,
+    loads_columnar,
+    register_columnar_serializer,
+    to_columnar,
+)
+from app.utils.validation import to_frame, validate_chunk
 
 
 def test_configure_logging():
     logger = configure_logging()
     assert isinstance(logger, logging.Logger)
     assert logger.level == logging.INFO
+
+
+def test_configure_logging_writes_json_from_queue(capsys):
+    logger = configure_logging(log_format="json", use_queue=True)
+    try:
+        logger.info("Chunk of %d rows", 3, extra={"job_id": "abc"})
+    finally:
+        logger = configure_logging(use_queue=False)
+
+    entry = json.loads(capsys.readouterr().err)
+    assert entry["message"] == "Chunk of 3 rows"
+    assert entry["job_id"] == "abc"
+    assert entry["level"] == "INFO"
+
+
+def test_json_formatter_includes_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "app", logging.ERROR, "", 0, "Failed", (), sys.exc_info()
+        )
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Failed"
+    assert "ValueError: boom" in entry["exception"]
+
+
+@pytest.mark.parametrize(
+    "mode, rate, expected",
+    [("all", 0, 10), ("summary", 1, 0), ("sample", 0, 0), ("sample", 1, 10)],
+)
+def test_configure_debt_logger(mocker, mode, rate, expected):
+    debt_logger = configure_debt_logger(mode, rate)
+    mock_handle = mocker.patch.object(debt_logger, "callHandlers")
+    try:
+        for i in range(10):
+            debt_logger.info("Processed Debt ID: %s", i)
+    finally:
+        configure_debt_logger()
+
+    assert mock_handle.call_count == expected
+
+
+def test_csv_chunk_stream_splits_fed_pieces_into_chunks():
+    stream = CsvChunkStream(chunk_size=2, block_size=1)
+    data = b"name,governmentId\nJohn,100\nDoe,200\nJane,300\n"
+
+    pieces = [data[i:][:5] for i in range(0, len(data), 5)]
+    chunks = []
+    for piece in pieces:
+        chunks.extend(stream.feed(piece))
+    chunks.extend(stream.close())
+
+    assert [list(iter_records(chunk.data)) for chunk in chunks] == [
+        [
+            {"name": "John", "governmentId": 100},
+            {"name": "Doe", "governmentId": 200},
+        ],
+        [{"name": "Jane", "governmentId": 300}],
+    ]
+    assert stream.total_lines == 4
+    assert stream.rows_emitted == 3
+    assert stream.root == sha256(data[:27]).hexdigest()
+    assert chunks[0].digests == [
+        sha256(data[:27]).hexdigest(),
+        sha256(data[:35]).hexdigest(),
+    ]
+    assert chunks[1].digests == [sha256(data).hexdigest()]
+
+
+def test_csv_chunk_stream_keeps_quoted_newlines():
+    stream = CsvChunkStream(chunk_size=10)
+
+    chunks = stream.feed(b'name,note\nJohn,a\nDoe,"multi\nline"\n')
+    chunks.extend(stream.close())
+
+    assert [chunk.data for chunk in chunks] == [
+        {
+            "columns": ["name", "note"],
+            "data": [["John", "Doe"], ["a", "multi\nline"]],
+        }
+    ]
+    assert stream.rows_seen == 2
+    assert stream.rows_emitted == 2
+
+
+def test_csv_chunk_stream_skips_completed_blocks(mocker):
+    data = b"name,governmentId\nJohn,100\nDoe,200\nJane,300\n"
+    root = sha256(data[:27]).hexdigest()
+    completed_blocks = mocker.Mock(return_value={root})
+    stream = CsvChunkStream(
+        chunk_size=2, block_size=1, completed_blocks=completed_blocks
+    )
+
+    chunks = stream.feed(data) + stream.close()
+
+    assert [chunk.data["data"][0] for chunk in chunks] == [["Doe", "Jane"]]
+    completed_blocks.assert_called_once_with(root)
+    assert stream.blocks_skipped == 1
+    assert stream.rows_seen == 3
+    assert stream.rows_emitted == 2
+
+
+def test_csv_chunk_stream_sizes_chunks_from_remaining_rows():
+    data = b"id\n" + b"".join(b"%03d\n" % i for i in range(100))
+    sizer = ChunkSizer(
+        min_rows=5, max_rows=40, concurrency=2, chunks_per_worker=2
+    )
+    stream = CsvChunkStream(block_size=5, sizer=sizer, total_bytes=len(data))
+
+    chunks = stream.feed(data) + stream.close()
+
+    assert [len(chunk.data["data"][0]) for chunk in chunks] == [
+        25,
+        20,
+        15,
+        10,
+        10,
+        5,
+        5,
+        5,
+        5,
+    ]
+    assert stream.rows_emitted == 100
+
+
+def test_chunk_sizer_bounds_chunk_size():
+    sizer = ChunkSizer(
+        min_rows=10,
+        max_rows=1000,
+        default_rows=500,
+        concurrency=4,
+        chunks_per_worker=2,
+        target_seconds=10,
+    )
+
+    assert sizer.size() == 500
+    assert sizer.size(800) == 100
+    assert sizer.size(20) == 10
+    sizer.row_seconds = 0.05
+    assert sizer.size(10000) == 200
+    sizer.row_seconds = 0.001
+    assert sizer.size() == 1000
+
+
+def test_observed_row_seconds_over_window(mocker):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    mock_time = mocker.patch("app.utils.chunking.time.time", return_value=0)
+    assert observed_row_seconds(client, window=100) is None
+
+    record_row_seconds(client, 100, 1.0, window=100)
+    mock_time.return_value = 50
+    record_row_seconds(client, 100, 3.0, window=100)
+    assert observed_row_seconds(client, window=100) == 0.02
+
+    mock_time.return_value = 105
+    assert observed_row_seconds(client, window=100) == 0.03
+    assert 0 < client.ttl("processing_stats:5") <= 110
+
+
+def test_csv_chunk_stream_empty():
+    stream = CsvChunkStream()
+
+    with pytest.raises(CsvStreamError, match="Uploaded file is empty"):
+        stream.close()
+
+
+def test_sharded_dedup_index(mocker):
+    client = mocker.Mock()
+    claim_script = client.register_script.return_value
+    pipeline = client.pipeline.return_value
+    index = ShardedDedupIndex(client, claim_ttl=60, shards=2)
+    ids = ["a", "b", "c"]
+    groups = {}
+    for debt_id in ids:
+        groups.setdefault(index.shard_key(debt_id), []).append(debt_id)
+    pipeline.execute.return_value = [
+        [debt_id for debt_id in shard_ids if debt_id != "b"]
+        for shard_ids in groups.values()
+    ]
+
+    assert sorted(index.claim(ids, "token")) == ["a", "c"]
+    for shard_key, shard_ids in groups.items():
+        tag = shard_key.split(":", 1)[1]
+        processing_keys = [f"processing_debts:{tag}:{i}" for i in shard_ids]
+        claim_script.assert_any_call(
+            keys=[shard_key, *processing_keys],
+            args=[60, "token", *shard_ids],
+            client=pipeline,
+        )
+
+    index.commit(ids)
+    for shard_key, shard_ids in groups.items():
+        pipeline.sadd.assert_any_call(shard_key, *shard_ids)
+        pipeline.delete.assert_any_call(
+            *[index.processing_key(debt_id) for debt_id in shard_ids]
+        )
+
+
+@pytest.mark.parametrize("index_class", [DedupIndex, ShardedDedupIndex])
+def test_dedup_index_claim_script(index_class):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    index = index_class(client, claim_ttl=60)
+    index.commit(["processed"])
+
+    assert sorted(index.claim(["a", "a", "processed", "b"])) == ["a", "b"]
+    assert 0 < client.ttl(index.processing_key("a")) <= 60
+    assert index.claim(["a", "b", "c"]) == ["c"]
+
+    client.pexpire(index.processing_key("a"), 1)
+    time.sleep(0.01)
+    assert index.claim(["a", "b"]) == ["a"]
+
+
+def test_dedup_index_claim_and_commit(mocker):
+    client = mocker.Mock()
+    claim_script = client.register_script.return_value
+    claim_script.return_value = ["a"]
+    pipeline = client.pipeline.return_value
+    index = DedupIndex(client, claim_ttl=60)
+
+    assert index.claim(["a", "b"], "token") == ["a"]
+    claim_script.assert_called_once_with(
+        keys=["processed_debts", "processing_debts:a", "processing_debts:b"],
+        args=[60, "token", "a", "b"],
+    )
+
+    index.commit(["a"])
+    pipeline.sadd.assert_called_once_with("processed_debts", "a")
+    pipeline.delete.assert_called_once_with("processing_debts:a")
+    pipeline.execute.assert_called_once()
+
+
+@pytest.mark.parametrize("index_class", [DedupIndex, ShardedDedupIndex])
+def test_dedup_index_extend_keeps_claims_of_lagging_stages(index_class):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    index = index_class(client, claim_ttl=60)
+    index.claim(["a", "b", "c"], "token")
+    client.expire(index.processing_key("a"), 5)
+    client.delete(index.processing_key("b"))
+    index.claim(["b"], "other")
+
+    assert sorted(index.extend(["a", "b", "c", "d"], "token")) == ["a", "c"]
+    assert 55 < client.ttl(index.processing_key("a")) <= 60
+    assert client.get(index.processing_key("b")) == "other"
+    assert not client.exists(index.processing_key("d"))
+
+
+def test_get_dedup_index(mocker):
+    client = mocker.Mock()
+    assert type(get_dedup_index(client)) is DedupIndex
+
+    mocker.patch("app.utils.dedup.DEDUP_BACKEND", "sharded")
+    assert isinstance(get_dedup_index(client), ShardedDedupIndex)
+
+    mocker.patch("app.utils.dedup.DEDUP_BACKEND", "unknown")
+    with pytest.raises(ValueError):
+        get_dedup_index(client)
+
+
+def test_columnar_chunk_round_trip():
+    frame = pd.DataFrame(
+        {"debtId": ["a", "b"], "debtAmount": [10, 20], "email": ["x", "y"]}
+    )
+
+    chunk = to_columnar(frame)
+    body = ((chunk,), {}, {})
+    decoded = loads_columnar(dumps_columnar(body))
+
+    assert count_records(decoded[0][0]) == 2
+    assert list(iter_records(decoded[0][0])) == frame.to_dict(orient="records")
+    assert list(iter_records([{"debtId": "a"}])) == [{"debtId": "a"}]
+
+
+def test_columnar_serializer_is_registered():
+    register_columnar_serializer()
+
+    content_type, encoding, payload = serialization.dumps(
+        {"columns": ["debtId"], "data": [["a"]]}, serializer="columnar"
+    )
+
+    assert content_type == "application/x-columnar+zlib"
+    assert serialization.loads(payload, content_type, encoding) == {
+        "columns": ["debtId"],
+        "data": [["a"]],
+    }
+
+
+def test_local_file_storage_ranges(tmp_path):
+    storage = LocalFileStorage(str(tmp_path / "uploads"))
+    file_id = storage.save(BytesIO(b"h1,h2\na,1\nbb,22\nccc,333"))
+
+    ranges = storage.plan_ranges(file_id, range_bytes=5)
+
+    assert storage.read_header(file_id) == b"h1,h2\n"
+    assert [storage.read_range(file_id, *r) for r in ranges] == [
+        b"a,1\nbb,22\n",
+        b"ccc,333",
+    ]
+
+    storage.delete(file_id)
+    assert not storage.path(file_id).exists()
+
+
+def test_validate_chunk_matches_debt_record():
+    rows = [
+        {
+            "name": "John",
+            "governmentId": "11111111111",
+            "email": "john@example.com",
+            "debtAmount": 1000.0,
+            "debtDueDate": "2024-07-12",
+            "debtId": "76403498-cffe-4c06-895e-f60ba27443b3",
+        },
+        {
+            "name": "Doe",
+            "governmentId": "not a number",
+            "email": "invalid_email",
+            "debtAmount": 10.5,
+            "debtDueDate": "2024-07-12T10:00:00",
+            "debtId": "76403498cffe4c06895ef60ba27443b4",
+        },
+        {
+            "name": "Jane",
+            "governmentId": 33333333333,
+            "email": "jane@example.com",
+            "debtAmount": 30,
+            "debtDueDate": "not a date",
+            "debtId": "not a uuid",
+        },
+    ]
+    frame = to_frame(
+        {
+            "columns": list(rows[0]),
+            "data": [[row[field] for row in rows] for field in rows[0]],
+        }
+    )
+
+    valid, errors = validate_chunk(frame)
+
+    for i, row in enumerate(rows):
+        try:
+            DebtRecord(**row)
+            assert i in valid.index
+        except ValidationError:
+            assert i not in valid.index
+    assert valid["governmentId"].tolist() == [11111111111]
+    assert valid["debtAmount"].tolist() == [1000]
+    assert valid["debtDueDate"].tolist() == [datetime(2024, 7, 12)]
+    assert errors == [
+        {
+            "row": 1,
+            "debtId": "76403498cffe4c06895ef60ba27443b4",
+            "error": "governmentId: Input should be a valid integer; "
+            "email: value is not a valid email address; "
+            "debtAmount: Input should be a valid integer",
+        },
+        {
+            "row": 2,
+            "debtId": "not a uuid",
+            "error": "debtDueDate: Input should be a valid datetime; "
+            "debtId: Input should be a valid UUID",
+        },
+    ]
+
+
+PARITY_ROW = {
+    "name": "John",
+    "governmentId": "11111111111",
+    "email": "john@example.com",
+    "debtAmount": "1000",
+    "debtDueDate": "2024-07-12",
+    "debtId": "76403498-cffe-4c06-895e-f60ba27443b3",
+}
+
+
+@pytest.mark.parametrize(
+    "field, values",
+    [
+        ("debtAmount", ["1000", " 1000 ", "1000.0", "1_000", "+5", "1e3"]),
+        ("debtAmount", ["1000.", ".5", "1__0", "0x10", "1 000", "10.5"]),
+        (
+            "debtDueDate",
+            ["2024-07-12", "2024-07-12T10:00", "1700000000", "20240712"],
+        ),
+        (
+            "debtDueDate",
+            ["1700000000000", "-1700000000", "1700000000.5", "1.7e9"],
+        ),
+        (
+            "debtDueDate",
+            ["2024-07-12T10:00:00Z", "2024-07-12T10:00+03:00", "2024-07-12"],
+        ),
+        ("debtDueDate", ["2024-07-12T10", "2024-7-12", "2024-02-30"]),
+        (
+            "email",
+            [
+                "a..b@example.com",
+                ".a@example.com",
+                "a@-x.com",
+                "user@exa_mple.com",
+                "a@example.invalid",
+            ],
+        ),
+        (
+            "email",
+            [
+                "a@example.com ",
+                "John <a@example.com>",
+                "A@EXAMPLE.COM",
+                "a@Exämple.com",
+                "a@b",
+            ],
+        ),
+        (
+            "debtId",
+            [
+                "76403498-CFFE-4C06-895E-F60BA27443B3",
+                "76403498cffe4c06895ef60ba27443b3",
+                "{76403498-cffe-4c06-895e-f60ba27443b3}",
+                "urn:uuid:76403498-cffe-4c06-895e-f60ba27443b3",
+                "76403498-cffe4c06-895e-f60ba27443b3",
+            ],
+        ),
+    ],
+)
+def test_validate_chunk_parity_with_debt_record(field, values):
+    rows = [{**PARITY_ROW, field: value} for value in values]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        valid, _ = validate_chunk(to_frame(rows))
+
+    for i, row in enumerate(rows):
+        try:
+            record = DebtRecord(**row)
+        except ValidationError:
+            assert i not in valid.index, row[field]
+            continue
+        assert i in valid.index, row[field]
+        expected = getattr(record, field)
+        if field == "debtId":
+            expected = str(expected)
+        assert valid.loc[i, field] == expected, row[field]
+
+
+def test_validate_chunk_missing_fields():
+    valid, errors = validate_chunk(to_frame([{"name": "John"}]))
+
+    assert valid.empty
+    assert errors[0]["debtId"] == "Unknown"
+    assert errors[0]["error"].startswith("governmentId: Field required")
+
+
+def test_job_progress_estimates_remaining_time():
+    fields = {
+        "status": "dispatched",
+        "created_at": "100.0",
+        "dispatched_chunks": "4",
+        "dispatched_rows": "40",
+        "completed_chunks": "1",
+        "processed": "8",
+        "failed": "2",
+    }
+
+    progress = job_progress("abc", fields, now=110.0)
+
+    assert progress["status"] == "dispatched"
+    assert progress["rows_per_second"] == 1.0
+    assert progress["eta_seconds"] == 30.0
+
+
+def test_job_progress_estimates_from_chunks_without_row_count():
+    fields = {
+        "status": "dispatched",
+        "created_at": "100.0",
+        "dispatched_chunks": "4",
+        "completed_chunks": "1",
+        "processed": "10",
+    }
+
+    assert job_progress("abc", fields, now=110.0)["eta_seconds"] == 30.0
+
+
+def test_file_storage_range_digests(tmp_path):
+    storage = LocalFileStorage(str(tmp_path))
+    data = b"debtId,debtAmount\n1,10\n2,20\n3,30\n"
+    (tmp_path / "abc.csv").write_bytes(data)
+
+    digests = storage.range_digests("abc", [(18, 5), (23, 10)])
+
+    assert digests == [
+        sha256(data[:23]).hexdigest(),
+        sha256(data).hexdigest(),
+    ]
+
+
+def test_due_date_priority():
+    assert due_date_priority(-3) == 9
+    assert due_date_priority(1) == 9
+    assert due_date_priority(5) == 5
+    assert due_date_priority(30) == 3
+    assert due_date_priority(31) == 0
+    assert due_date_priority(None) == 0
+
+
+def test_chunk_priority_uses_most_urgent_debt():
+    today = datetime(2026, 10, 17).date()
+    chunk = {
+        "columns": ["debtId", "debtDueDate"],
+        "data": [["a", "b", "c"], ["2026-12-01", "2026-10-20", "invalid"]],
+    }
+
+    assert chunk_priority(chunk, today) == 7
+    assert chunk_priority([{"debtDueDate": "2026-11-10"}], today) == 3
+    assert chunk_priority([{"debtDueDate": 1792195200}], today) == 9
+    assert chunk_priority({"columns": ["debtId"], "data": [["a"]]}) == 0
+
+
+def redis_latency_count(command):
+    return (
+        REGISTRY.get_sample_value(
+            "redis_command_seconds_count", {"command": command}
+        )
+        or 0
+    )
+
+
+def test_instrumented_redis_records_latency():
+    client = InstrumentedRedis(
+        connection_pool=ConnectionPool(
+            connection_class=fakeredis.FakeRedisConnection,
+            server=fakeredis.FakeServer(),
+            decode_responses=True,
+        )
+    )
+    sets = redis_latency_count("SET")
+    pipelines = redis_latency_count("PIPELINE")
+
+    client.set("key", "value")
+    pipeline = client.pipeline()
+    pipeline.get("key")
+    pipeline.incr("counter")
+
+    assert pipeline.execute() == ["value", 1]
+    assert redis_latency_count("SET") == sets + 1
+    assert redis_latency_count("PIPELINE") == pipelines + 1
+
+
+def test_publish_signals_record_publish_time():
+    labels = {"task": "some_task"}
+    count = (
+        REGISTRY.get_sample_value("broker_publish_seconds_count", labels) or 0
+    )
+
+    start_publish_timer(headers={"id": "abc"})
+    observe_publish(sender="some_task", headers={"id": "abc"})
+    observe_publish(sender="some_task", headers={"id": "unknown"})
+
+    assert (
+        REGISTRY.get_sample_value("broker_publish_seconds_count", labels)
+        == count + 1
+    )
+
+
+def test_create_redis_client_bounds_pool():
+    client = create_redis_client("redis://localhost:6379/3", max_connections=3)
+    async_client = create_async_redis_client(
+        "redis://localhost:6379/3", max_connections=3
+    )
+
+    for pool in (client.connection_pool, async_client.connection_pool):
+        assert pool.max_connections == 3
+        assert pool.connection_kwargs["db"] == 3
+        assert pool.connection_kwargs["decode_responses"] is True
+
+
+def test_redis_client_resets_pools_after_fork(mocker):
+    mock_client = mocker.Mock()
+    mocker.patch.object(RedisClient, "_instance", mock_client)
+    mocker.patch.object(RedisClient, "_async_instance", None)
+
+    RedisClient.reset_after_fork()
+
+    mock_client.connection_pool.reset.assert_called_once()
+
+
+def test_redis_batch_sends_commands_together():
+    client = fakeredis.FakeRedis(decode_responses=True)
+
+    with redis_batch(client) as pipeline:
+        pipeline.sadd("set", "a")
+        JobTracker(client).record_chunk(
+            "abc", {"processed": 2}, client=pipeline
+        )
+        assert client.exists("set", "job:abc") == 0
+
+    assert client.smembers("set") == {"a"}
+    assert client.hget("job:abc", "processed") == "2"
+
+    with pytest.raises(ValueError):
+        with redis_batch(client) as pipeline:
+            pipeline.sadd("set", "b")
+            raise ValueError
+    assert client.smembers("set") == {"a"}
+
+
+def test_job_tracker_claims_completion_of_last_chunk_once():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    tracker = JobTracker(client)
+    job_id = tracker.create("test.csv")
+    tracker.record_dispatch(job_id, chunks=2, rows=0)
+
+    assert tracker.record_chunk(job_id, {"processed": 1}) is False
+    assert tracker.mark_dispatched(job_id) is False
+    assert tracker.record_chunk(job_id, {"processed": 1}) is True
+    assert tracker.claim_completion(job_id, ["dispatched", "2", "2"]) is False
+    assert tracker.get(job_id)["status"] == "completed"
+
+
+def test_job_tracker_claims_completion_when_dispatch_ends_last():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    tracker = JobTracker(client)
+    job_id = tracker.create("test.csv")
+    tracker.record_dispatch(job_id, chunks=1, rows=0)
+
+    assert tracker.record_chunk(job_id, {"failed": 1}) is False
+    assert tracker.mark_dispatched(job_id) is True
+
+
+def test_job_tracker_records_time_of_processed_rows():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    tracker = JobTracker(client)
+    job_id = tracker.create("test.csv")
+
+    tracker.record_chunk(
+        job_id, {"processed": 10, "duplicates": 90}, seconds=1.0
+    )
+    tracker.record_chunk(job_id, {"duplicates": 100}, seconds=0.1)
+
+    assert observed_row_seconds(client) == 0.1
+
+
+def test_job_tracker_keeps_most_recent_error_samples():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    tracker = JobTracker(client, max_errors=3)
+    job_id = tracker.create("test.csv")
+
+    tracker.record_chunk(job_id, {"failed": 2, "errors": ["a", "b"]})
+    tracker.record_chunk(job_id, {"processed": 1, "errors": []})
+    tracker.record_chunk(job_id, {"failed": 2, "errors": ["c", "d"]})
+
+    assert tracker.error_samples(job_id) == ["d", "c", "b"]
+    assert tracker.get(job_id)["failed"] == 4
+
+
+def test_async_job_tracker():
+    server = fakeredis.FakeServer()
+    job_id = JobTracker(
+        fakeredis.FakeRedis(server=server, decode_responses=True)
+    ).create("test.csv")
+    tracker = AsyncJobTracker(
+        fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+
+    async def run():
+        return (
+            await tracker.get(job_id),
+            await tracker.cancel(job_id),
+            await tracker.get(job_id),
+            await tracker.get("missing"),
+            await tracker.cancel("missing"),
+        )
+
+    job, cancelled, job_after, missing, cancelled_missing = asyncio.run(run())
+
+    assert job["file"] == "test.csv"
+    assert job["status"] == "running"
+    assert cancelled is True
+    assert job_after["status"] == "cancelled"
+    assert missing is None
+    assert cancelled_missing is False
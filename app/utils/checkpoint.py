@@ -0,0 +1,82 @@
+from redis import Redis
+
+from app.config.settings import CHECKPOINT_KEY_PREFIX, FILE_PROGRESS_KEY
+
+
+class ChunkCheckpoint:
+    """
+    Records which blocks of an uploaded file have been completed.
+
+    Blocks are the units of work that are checkpointed: fixed groups of
+    rows in streamed uploads (see `app.utils.csv_stream.CsvChunkStream`),
+    and byte ranges in claim-check mode. They are identified by content:
+    the digest of a block is the SHA-256 of the file from its first byte
+    up to the end of that block, so two blocks share a digest only if they
+    hold the same rows at the same position of the same file. The
+    completed blocks of a file are kept in a Redis set named after the
+    digest of its first block (the "root"), and are added by the workers
+    only once the chunk holding them has been fully processed. A re-upload
+    of the same content, under any file name, re-dispatches exactly the
+    blocks missing from the set, however they are grouped into chunks.
+
+    Attributes:
+        client (Redis): The Redis client.
+        root (str): The digest of the first block of the file.
+        key (str): The key of the set of completed block digests.
+    """
+
+    def __init__(
+        self, client: Redis, root: str, prefix: str = CHECKPOINT_KEY_PREFIX
+    ):
+        self.client = client
+        self.root = root
+        self.key = f"{prefix}{root}"
+
+    def completed(self) -> set[str]:
+        """
+        Returns the digests of the completed blocks of the file.
+
+        Returns:
+            set[str]: The completed block digests.
+        """
+        return set(self.client.smembers(self.key))
+
+    def commit(self, *digests: str, client=None) -> None:
+        """
+        Records blocks as completed, in a single round-trip.
+
+        Args:
+            *digests (str): The digests of the blocks.
+            client: A pipeline to queue the command on, instead of
+            sending it right away.
+        """
+        client = client if client is not None else self.client
+        if digests:
+            client.sadd(self.key, *digests)
+
+    def register(self, filename: str) -> None:
+        """
+        Records the checkpoint as the latest one of a file name, so that
+        its progress can be reset by name.
+
+        Args:
+            filename (str): The name of the uploaded file.
+        """
+        self.client.hset(FILE_PROGRESS_KEY, filename, self.root)
+
+    @staticmethod
+    def reset(client: Redis, filename: str) -> None:
+        """
+        Drops the checkpoint of the latest upload of a file name, so that
+        all of its blocks are dispatched again.
+
+        Args:
+            client (Redis): The Redis client.
+            filename (str): The name of the uploaded file.
+        """
+        root = client.hget(FILE_PROGRESS_KEY, filename)
+        pipeline = client.pipeline()
+        if root:
+            pipeline.delete(ChunkCheckpoint(client, root).key)
+        pipeline.hdel(FILE_PROGRESS_KEY, filename)
+        pipeline.execute()
@@ -0,0 +1,168 @@
+import math
+import time
+from typing import Optional
+
+from redis import Redis
+
+from app.config.settings import (
+    CHUNK_MAX_ROWS,
+    CHUNK_MIN_ROWS,
+    CHUNK_SIZE,
+    CHUNK_STATS_WINDOW,
+    CHUNK_TARGET_SECONDS,
+    CHUNKS_PER_WORKER,
+    PROCESSING_STATS_KEY,
+    WORKER_CONCURRENCY,
+)
+
+# Number of buckets the processing stats are split into over their window.
+STATS_BUCKETS = 10
+
+
+class ChunkSizer:
+    """
+    Picks the number of rows of each chunk of a job.
+
+    A chunk should take about `target_seconds` to process, based on the
+    per-row processing time observed by the workers, so that messages stay
+    small and cancellations and failures lose little work. It should also
+    leave at least `chunks_per_worker` chunks for each of the
+    `concurrency` worker processes among the remaining rows, so that small
+    files are still spread over all the workers. As the second bound
+    shrinks with the remaining rows, the chunks get smaller towards the
+    end of a job, and the workers that finish early pick up the tail
+    chunks instead of waiting on a single large one.
+
+    Sizes are clamped to [`min_rows`, `max_rows`]. Chunks are made of
+    whole blocks (see `app.utils.csv_stream.CsvChunkStream`), so they end
+    on the first block boundary past the chosen size.
+
+    Attributes:
+        min_rows (int): Minimum number of rows per chunk.
+        max_rows (int): Maximum number of rows per chunk.
+        default_rows (int): Number of rows per chunk while no processing
+        time has been observed.
+        concurrency (int): Number of worker processes.
+        chunks_per_worker (int): Minimum number of chunks left per worker.
+        target_seconds (float): Target processing time of a chunk.
+        row_seconds (float | None): Observed processing time per row.
+    """
+
+    def __init__(
+        self,
+        min_rows: int = CHUNK_MIN_ROWS,
+        max_rows: int = CHUNK_MAX_ROWS,
+        default_rows: int = CHUNK_SIZE,
+        concurrency: int = WORKER_CONCURRENCY,
+        chunks_per_worker: int = CHUNKS_PER_WORKER,
+        target_seconds: float = CHUNK_TARGET_SECONDS,
+        row_seconds: Optional[float] = None,
+    ):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.default_rows = default_rows
+        self.concurrency = concurrency
+        self.chunks_per_worker = chunks_per_worker
+        self.target_seconds = target_seconds
+        self.row_seconds = row_seconds
+
+    @classmethod
+    def from_stats(cls, client: Redis, **kwargs) -> "ChunkSizer":
+        """
+        Builds a sizer from the processing time observed by the workers.
+
+        Args:
+            client (Redis): The Redis client.
+            **kwargs: The other arguments of the sizer.
+
+        Returns:
+            ChunkSizer: The sizer.
+        """
+        return cls(row_seconds=observed_row_seconds(client), **kwargs)
+
+    def size(self, remaining_rows: Optional[int] = None) -> int:
+        """
+        Returns the number of rows of the next chunk.
+
+        Args:
+            remaining_rows (int, optional): The estimated number of rows
+            left in the file, including the next chunk.
+
+        Returns:
+            int: The number of rows of the next chunk.
+        """
+        rows = self.default_rows
+        if self.row_seconds:
+            rows = self.target_seconds / self.row_seconds
+        if remaining_rows is not None:
+            share = self.concurrency * self.chunks_per_worker
+            rows = min(rows, math.ceil(remaining_rows / share))
+        return int(min(max(rows, self.min_rows), self.max_rows))
+
+
+def stats_keys(
+    now: Optional[float] = None, window: int = CHUNK_STATS_WINDOW
+) -> list[str]:
+    """
+    Returns the keys of the buckets of processing stats covering the last
+    `window` seconds, the current one first.
+
+    Args:
+        now (float, optional): The current time, as a Unix timestamp.
+        window (int): The number of seconds covered by the buckets.
+
+    Returns:
+        list[str]: The keys of the buckets.
+    """
+    width = max(window // STATS_BUCKETS, 1)
+    current = int((time.time() if now is None else now) // width)
+    return [
+        f"{PROCESSING_STATS_KEY}:{bucket}"
+        for bucket in range(current, current - STATS_BUCKETS, -1)
+    ]
+
+
+def record_row_seconds(
+    client, rows: int, seconds: float, window: int = CHUNK_STATS_WINDOW
+) -> None:
+    """
+    Adds the processing time of a chunk to the bucket of processing stats
+    of the current time. Buckets expire once they leave the window, so
+    that the observed time per row follows changes of the workers or of
+    the services they call.
+
+    Args:
+        client: The Redis client or pipeline to send the commands on.
+        rows (int): The number of rows processed by the chunk.
+        seconds (float): The processing time of the chunk.
+        window (int): The number of seconds covered by the buckets.
+    """
+    key = stats_keys(window=window)[0]
+    client.hincrby(key, "rows", rows)
+    client.hincrbyfloat(key, "seconds", seconds)
+    client.expire(key, window + max(window // STATS_BUCKETS, 1))
+
+
+def observed_row_seconds(
+    client: Redis, window: int = CHUNK_STATS_WINDOW
+) -> Optional[float]:
+    """
+    Returns the average processing time per row over the last `window`
+    seconds, as recorded by the workers (see `record_row_seconds`).
+
+    Args:
+        client (Redis): The Redis client.
+        window (int): The number of seconds covered by the buckets.
+
+    Returns:
+        float | None: The average time per row in seconds, or None if no
+        row was processed in the window.
+    """
+    pipeline = client.pipeline(transaction=False)
+    for key in stats_keys(window=window):
+        pipeline.hmget(key, ["rows", "seconds"])
+    buckets = pipeline.execute()
+    rows = sum(int(bucket_rows or 0) for bucket_rows, _ in buckets)
+    if not rows:
+        return None
+    return sum(float(seconds or 0) for _, seconds in buckets) / rows
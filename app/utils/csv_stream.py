@@ -0,0 +1,373 @@
+from hashlib import sha256
+from io import BytesIO
+from typing import Callable, Collection, NamedTuple, Optional
+
+import pandas as pd
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+
+from app.config.settings import CHUNK_BLOCK_ROWS, CHUNK_SIZE
+from app.utils.chunking import ChunkSizer
+from app.utils.serialization import to_columnar
+
+
+class CsvStreamError(ValueError):
+    """
+    Raised when an uploaded CSV stream is malformed or unusable.
+    """
+
+
+class CsvChunk(NamedTuple):
+    """
+    A chunk of records emitted by a `CsvChunkStream`.
+
+    Attributes:
+        digests (list[str]): The digests of the blocks of the chunk.
+        data (dict): The records of the chunk, in columnar format.
+    """
+
+    digests: list[str]
+    data: dict
+
+
+class CsvChunkStream:
+    """
+    Incrementally splits raw CSV bytes into parsed chunks of records.
+
+    Bytes can be fed in arbitrary pieces as they arrive from the network.
+    Complete records are grouped into blocks of `block_size` rows, and
+    blocks are buffered until a chunk is complete, at which point its
+    records are parsed with Pandas (prefixed by the header line) and
+    emitted in columnar format. Line counting and hashing happen in the
+    same pass, so the data is never re-read. Quoted fields spanning several
+    lines are kept inside a single record.
+
+    Chunks hold `chunk_size` rows, or, when a `ChunkSizer` is given, a
+    number of rows chosen when the chunk starts, from the number of
+    remaining rows estimated from `total_bytes` (see
+    `app.utils.chunking.ChunkSizer`). Either way, a chunk ends on the first
+    block boundary past its size.
+
+    Each block is identified by the digest of the file up to its end (see
+    `app.utils.checkpoint.ChunkCheckpoint`), so checkpoints do not depend
+    on how blocks are grouped into chunks. To resume an interrupted upload,
+    `completed_blocks` is called once with the digest of the first block
+    (the "root"), and the blocks whose digest it returns are skipped
+    without being parsed.
+
+    Attributes:
+        chunk_size (int): Number of data rows per emitted chunk, without
+        a sizer.
+        block_size (int): Number of data rows per block.
+        root (str): The digest of the first block, once known.
+        total_lines (int): Number of lines seen so far, header included.
+        rows_seen (int): Number of data rows seen so far.
+        rows_emitted (int): Number of data rows emitted in chunks so far.
+        blocks_skipped (int): Number of completed blocks skipped so far.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        completed_blocks: Optional[Callable[[str], Collection[str]]] = None,
+        block_size: int = CHUNK_BLOCK_ROWS,
+        sizer: Optional[ChunkSizer] = None,
+        total_bytes: Optional[int] = None,
+    ):
+        self.chunk_size = chunk_size
+        self.block_size = block_size
+        self.header: Optional[bytes] = None
+        self.root: Optional[str] = None
+        self.total_lines = 0
+        self.rows_seen = 0
+        self.rows_emitted = 0
+        self.blocks_skipped = 0
+        self._completed_blocks = completed_blocks
+        self._completed: Collection[str] = ()
+        self._sizer = sizer
+        self._total_bytes = total_bytes
+        self._bytes_seen = 0
+        self._digest = sha256()
+        self._pending = b""
+        self._record: list[bytes] = []
+        self._quotes = 0
+        self._block: list[bytes] = []
+        self._records: list[bytes] = []
+        self._digests: list[str] = []
+        self._target = 0
+
+    def feed(self, data: bytes) -> list[CsvChunk]:
+        """
+        Feeds a piece of the CSV file into the stream.
+
+        Args:
+            data (bytes): The next piece of raw CSV data.
+
+        Returns:
+            list[CsvChunk]: The chunks completed by this piece of data.
+        """
+        data = self._pending + data
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+
+        chunks = []
+        for line in lines:
+            chunk = self._add_line(line + b"\n")
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def close(self) -> list[CsvChunk]:
+        """
+        Flushes the remaining data once the whole file has been fed.
+
+        Returns:
+            list[CsvChunk]: The remaining chunks, if any.
+
+        Raises:
+            CsvStreamError: If no data at all was received.
+        """
+        chunks = []
+        if self._pending:
+            chunk = self._add_line(self._pending + b"\n")
+            self._pending = b""
+            if chunk is not None:
+                chunks.append(chunk)
+        if self._record:
+            self._end_record()
+        if self.header is None:
+            raise CsvStreamError("Uploaded file is empty")
+        if self._block:
+            self._end_block()
+        if self._records:
+            chunks.append(self._flush())
+        return chunks
+
+    def remaining_rows(self) -> Optional[int]:
+        """
+        Estimates the number of data rows left in the file, from the
+        average size of the rows seen so far.
+
+        Returns:
+            int | None: The estimated number of remaining rows, or None if
+            the size of the file is unknown or no row has been seen yet.
+        """
+        if self._total_bytes is None or not self.rows_seen:
+            return None
+        bytes_per_row = (self._bytes_seen - len(self.header)) / self.rows_seen
+        remaining_bytes = max(self._total_bytes - self._bytes_seen, 0)
+        return int(remaining_bytes / bytes_per_row)
+
+    def _add_line(self, line: bytes) -> Optional[CsvChunk]:
+        self.total_lines += 1
+        self._digest.update(line)
+        self._record.append(line)
+        self._quotes += line.count(b'"')
+        if self._quotes % 2:
+            return None
+
+        self._end_record()
+        if len(self._block) < self.block_size:
+            return None
+        self._end_block()
+        if self._records and len(self._records) >= self._target:
+            return self._flush()
+        return None
+
+    def _end_record(self) -> None:
+        record = b"".join(self._record)
+        self._record = []
+        self._quotes = 0
+        self._bytes_seen += len(record)
+
+        if self.header is None:
+            self.header = record
+            return
+        if not record.strip():
+            return
+
+        self.rows_seen += 1
+        self._block.append(record)
+
+    def _end_block(self) -> None:
+        digest = self._digest.hexdigest()
+        block, self._block = self._block, []
+        if self.root is None:
+            self.root = digest
+            if self._completed_blocks is not None:
+                self._completed = self._completed_blocks(digest)
+        if digest in self._completed:
+            self.blocks_skipped += 1
+            return
+
+        if not self._records:
+            self._target = self._chunk_target(len(block))
+        self._records.extend(block)
+        self._digests.append(digest)
+
+    def _chunk_target(self, block_rows: int) -> int:
+        if self._sizer is None:
+            return self.chunk_size
+        remaining = self.remaining_rows()
+        if remaining is None:
+            return self._sizer.size()
+        return self._sizer.size(remaining + block_rows)
+
+    def _flush(self) -> CsvChunk:
+        records, self._records = self._records, []
+        digests, self._digests = self._digests, []
+        chunk = pd.read_csv(BytesIO(self.header + b"".join(records)))
+        self.rows_emitted += len(records)
+        return CsvChunk(digests, to_columnar(chunk))
+
+
+class MultipartCsvStream:
+    """
+    Streams the CSV file part of a multipart/form-data request body.
+
+    The request body is parsed incrementally with `python_multipart`, and
+    the bytes of the selected file field are forwarded to a
+    `CsvChunkStream` as soon as they arrive, so the upload is never held
+    entirely in memory nor written to disk.
+
+    Attributes:
+        filename (str): The name of the uploaded file, available once the
+        headers of the file part have been parsed.
+        csv (CsvChunkStream): The underlying chunk stream, created once the
+        file part starts.
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        completed_blocks: Optional[Callable[[str], Collection[str]]] = None,
+        field_name: str = "file",
+        chunk_size: int = CHUNK_SIZE,
+        block_size: int = CHUNK_BLOCK_ROWS,
+        sizer: Optional[ChunkSizer] = None,
+        total_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            content_type (str): The `Content-Type` header of the request.
+            completed_blocks (Callable[[str], Collection[str]], optional):
+            Called with the digest of the first block, returns the digests
+            of the blocks to skip (see `CsvChunkStream`).
+            field_name (str): The form field holding the CSV file.
+            chunk_size (int): Number of data rows per emitted chunk,
+            without a sizer.
+            block_size (int): Number of data rows per block.
+            sizer (ChunkSizer, optional): Picks the size of each chunk.
+            total_bytes (int, optional): The size of the request body, used
+            to estimate the number of remaining rows.
+
+        Raises:
+            CsvStreamError: If the request is not a multipart upload.
+        """
+        mime_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if mime_type != b"multipart/form-data" or not boundary:
+            raise CsvStreamError("Request must be multipart/form-data")
+
+        self.filename: Optional[str] = None
+        self.csv: Optional[CsvChunkStream] = None
+        self._field_name = field_name
+        self._stream_options = {
+            "chunk_size": chunk_size,
+            "completed_blocks": completed_blocks,
+            "block_size": block_size,
+            "sizer": sizer,
+            "total_bytes": total_bytes,
+        }
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._chunks: list[CsvChunk] = []
+        self._error: Optional[CsvStreamError] = None
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    def feed(self, data: bytes) -> list[CsvChunk]:
+        """
+        Feeds a piece of the request body into the parser.
+
+        Args:
+            data (bytes): The next piece of the raw request body.
+
+        Returns:
+            list[CsvChunk]: The CSV chunks completed by this piece of data.
+
+        Raises:
+            CsvStreamError: If the file part is not a CSV file.
+        """
+        self._parser.write(data)
+        if self._error is not None:
+            raise self._error
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+    def close(self) -> list[CsvChunk]:
+        """
+        Finalizes the request body once it has been fully received.
+
+        Returns:
+            list[CsvChunk]: The remaining CSV chunks, if any.
+
+        Raises:
+            CsvStreamError: If no file part was found or the file is empty.
+        """
+        self._parser.finalize()
+        if self.csv is None:
+            raise CsvStreamError(f"Missing '{self._field_name}' file field")
+        return self._chunks + self.csv.close()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(
+            self._headers.get(b"content-disposition", b"")
+        )
+        name = options.get(b"name", b"").decode()
+        if name != self._field_name or self.csv is not None:
+            return
+
+        content_type, _ = parse_options_header(
+            self._headers.get(b"content-type", b"")
+        )
+        if content_type != b"text/csv":
+            self._error = CsvStreamError("File must be a CSV")
+            return
+
+        self.filename = options.get(b"filename", b"").decode()
+        self.csv = CsvChunkStream(**self._stream_options)
+        self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file and self._error is None:
+            self._chunks.extend(self.csv.feed(data[start:end]))
+
+    def _on_part_end(self) -> None:
+        self._in_file = False
@@ -0,0 +1,285 @@
+from collections import defaultdict
+from typing import Optional
+from uuid import uuid4
+from zlib import crc32
+
+from redis import Redis
+
+from app.config.settings import (
+    DEDUP_BACKEND,
+    DEDUP_CLAIM_TTL,
+    DEDUP_SHARDS,
+    PROCESSED_DEBTS_KEY,
+    PROCESSING_DEBTS_KEY,
+)
+
+# KEYS[1]: processed set, KEYS[2..]: processing keys of the debt IDs.
+# ARGV[1]: claim TTL, ARGV[2]: claim token, ARGV[3..]: debt IDs, in the
+# order of their keys. Returns the IDs that were claimed.
+CLAIM_SCRIPT = """
+local claimed = {}
+for i = 2, #KEYS do
+    local debt_id = ARGV[i + 1]
+    if redis.call("SISMEMBER", KEYS[1], debt_id) == 0
+        and redis.call("SET", KEYS[i], ARGV[2], "NX", "EX", ARGV[1])
+    then
+        table.insert(claimed, debt_id)
+    end
+end
+return claimed
+"""
+
+# KEYS: processing keys of the debt IDs. ARGV[1]: claim TTL in
+# milliseconds, ARGV[2]: claim token, ARGV[3..]: debt IDs, in the order of
+# their keys. Returns the IDs whose reservation is still held by the token.
+EXTEND_SCRIPT = """
+local kept = {}
+for i = 1, #KEYS do
+    if redis.call("GET", KEYS[i]) == ARGV[2] then
+        redis.call("PEXPIRE", KEYS[i], ARGV[1])
+        table.insert(kept, ARGV[i + 2])
+    end
+end
+return kept
+"""
+
+
+class DedupIndex:
+    """
+    Tracks the IDs of the debts that have already been processed.
+
+    The index is backed by a single Redis set. Claims only look up the IDs
+    of the current batch, so their cost does not depend on how many debts
+    have been processed in the past.
+
+    Debts being processed are reserved with a "processing" key that expires
+    after `claim_ttl` seconds, so that two workers can never handle the same
+    debt, while debts whose processing failed or whose worker crashed can
+    be claimed again once the reservation expires. Each reservation holds
+    the token of its claim, so that a later stage can tell whether it still
+    owns the debt before extending the reservation.
+
+    Methods:
+        claim(debt_ids: list[str], token: Optional[str] = None)
+        -> list[str]:
+            Atomically reserves the IDs that are neither processed nor
+            being processed.
+        extend(debt_ids: list[str], token: str) -> list[str]:
+            Restarts the reservations still held by a claim.
+        commit(debt_ids: list[str], client=None) -> None:
+            Records claimed IDs as processed and drops their reservations.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        key: str = PROCESSED_DEBTS_KEY,
+        processing_key: str = PROCESSING_DEBTS_KEY,
+        claim_ttl: int = DEDUP_CLAIM_TTL,
+    ):
+        self.client = client
+        self.key = key
+        self.processing_prefix = f"{processing_key}:"
+        self.claim_ttl = claim_ttl
+        self._claim_script = client.register_script(CLAIM_SCRIPT)
+        self._extend_script = client.register_script(EXTEND_SCRIPT)
+
+    def claim(
+        self, debt_ids: list[str], token: Optional[str] = None
+    ) -> list[str]:
+        """
+        Atomically reserves the IDs that are neither processed nor
+        being processed by another worker.
+
+        The check and the reservation of the whole batch run in a single
+        server-side script, in one round-trip. Duplicated IDs are only
+        claimed once.
+
+        Args:
+            debt_ids (list[str]): The debt IDs to claim.
+            token (str, optional): A token unique to this claim, to extend
+            its reservations later (see `extend`). A random one is used
+            by default.
+
+        Returns:
+            list[str]: The IDs claimed by the caller.
+        """
+        if not debt_ids:
+            return []
+        return self._claim_script(
+            keys=[self.key, *map(self.processing_key, debt_ids)],
+            args=[self.claim_ttl, token or uuid4().hex, *debt_ids],
+        )
+
+    def processing_key(self, debt_id: str) -> str:
+        """
+        Returns the key reserving a debt while it is being processed.
+
+        Args:
+            debt_id (str): The debt ID.
+
+        Returns:
+            str: The key of the reservation.
+        """
+        return f"{self.processing_prefix}{debt_id}"
+
+    def extend(self, debt_ids: list[str], token: str) -> list[str]:
+        """
+        Restarts the reservations of claimed IDs for another `claim_ttl`
+        seconds, so that they do not expire while later stages of the
+        pipeline wait in their queues.
+
+        Each reservation is only restarted if it still holds the token of
+        the claim, in the same server-side script. A reservation that
+        expired, and may have been claimed again by another upload, is not
+        held anymore, and its debt must not be processed by the caller.
+
+        Args:
+            debt_ids (list[str]): The claimed debt IDs still being
+            processed.
+            token (str): The token of the claim.
+
+        Returns:
+            list[str]: The IDs whose reservation is still held.
+        """
+        if not debt_ids:
+            return []
+        return self._extend_script(
+            keys=list(map(self.processing_key, debt_ids)),
+            args=[self.claim_ttl * 1000, token, *debt_ids],
+        )
+
+    def commit(self, debt_ids: list[str], client=None) -> None:
+        """
+        Records claimed IDs as processed and drops their reservations,
+        in a single pipelined call.
+
+        Claimed IDs that are not committed stay reserved until their
+        reservation expires, after which they can be retried.
+
+        Args:
+            debt_ids (list[str]): The claimed debt IDs that were processed.
+            client: A pipeline to queue the commands on, instead of
+            sending them right away.
+        """
+        if not debt_ids:
+            return
+        pipeline = (
+            client
+            if client is not None
+            else self.client.pipeline(transaction=False)
+        )
+        pipeline.sadd(self.key, *debt_ids)
+        pipeline.delete(
+            *[self.processing_key(debt_id) for debt_id in debt_ids]
+        )
+        if client is None:
+            pipeline.execute()
+
+
+class ShardedDedupIndex(DedupIndex):
+    """
+    Dedup index spread over several Redis sets.
+
+    Each ID is assigned to one of `shards` sets by its CRC32 checksum, so
+    no single key grows with the whole processing history, and the shards
+    can be spread over the nodes of a Redis cluster. The reservations of
+    the IDs of a shard share its hash tag, so that every script call only
+    touches keys of a single cluster slot. A batch claim is still a single
+    round-trip, sent as one pipeline with one script call per shard.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        key: str = PROCESSED_DEBTS_KEY,
+        processing_key: str = PROCESSING_DEBTS_KEY,
+        claim_ttl: int = DEDUP_CLAIM_TTL,
+        shards: int = DEDUP_SHARDS,
+    ):
+        super().__init__(client, key, processing_key, claim_ttl)
+        self.shards = shards
+
+    def _shard(self, debt_id: str) -> int:
+        return crc32(debt_id.encode()) % self.shards
+
+    def shard_key(self, debt_id: str) -> str:
+        """
+        Returns the key of the set holding the given ID.
+
+        Args:
+            debt_id (str): The debt ID.
+
+        Returns:
+            str: The key of the shard.
+        """
+        return f"{self.key}:{{{self._shard(debt_id)}}}"
+
+    def processing_key(self, debt_id: str) -> str:
+        return f"{self.processing_prefix}{{{self._shard(debt_id)}}}:{debt_id}"
+
+    def _group(self, debt_ids: list[str]) -> dict[str, list[str]]:
+        groups = defaultdict(list)
+        for debt_id in debt_ids:
+            groups[self.shard_key(debt_id)].append(debt_id)
+        return groups
+
+    def claim(
+        self, debt_ids: list[str], token: Optional[str] = None
+    ) -> list[str]:
+        token = token or uuid4().hex
+        pipeline = self.client.pipeline(transaction=False)
+        for shard_key, shard_ids in self._group(debt_ids).items():
+            self._claim_script(
+                keys=[shard_key, *map(self.processing_key, shard_ids)],
+                args=[self.claim_ttl, token, *shard_ids],
+                client=pipeline,
+            )
+        return [
+            debt_id for claimed in pipeline.execute() for debt_id in claimed
+        ]
+
+    def extend(self, debt_ids: list[str], token: str) -> list[str]:
+        pipeline = self.client.pipeline(transaction=False)
+        for shard_ids in self._group(debt_ids).values():
+            self._extend_script(
+                keys=list(map(self.processing_key, shard_ids)),
+                args=[self.claim_ttl * 1000, token, *shard_ids],
+                client=pipeline,
+            )
+        return [debt_id for kept in pipeline.execute() for debt_id in kept]
+
+    def commit(self, debt_ids: list[str], client=None) -> None:
+        if not debt_ids:
+            return
+        pipeline = (
+            client
+            if client is not None
+            else self.client.pipeline(transaction=False)
+        )
+        for shard_key, shard_ids in self._group(debt_ids).items():
+            pipeline.sadd(shard_key, *shard_ids)
+            pipeline.delete(*map(self.processing_key, shard_ids))
+        if client is None:
+            pipeline.execute()
+
+
+def get_dedup_index(client: Redis) -> DedupIndex:
+    """
+    Builds the dedup index selected by the `DEDUP_BACKEND` setting.
+
+    Args:
+        client (Redis): The Redis client backing the index.
+
+    Returns:
+        DedupIndex: A plain set index for "set", or a sharded one
+        for "sharded".
+
+    Raises:
+        ValueError: If the configured backend is unknown.
+    """
+    if DEDUP_BACKEND == "set":
+        return DedupIndex(client)
+    if DEDUP_BACKEND == "sharded":
+        return ShardedDedupIndex(client)
+    raise ValueError(f"Unknown dedup backend: {DEDUP_BACKEND}")
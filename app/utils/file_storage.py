@@ -0,0 +1,163 @@
+import mmap
+import shutil
+from hashlib import sha256
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+from app.config.settings import (
+    CLAIM_CHECK_RANGE_BYTES,
+    INGESTION_READ_SIZE,
+    UPLOAD_STORAGE_DIR,
+)
+
+
+class LocalFileStorage:
+    """
+    Stores uploaded files in a directory shared by the API and the workers.
+
+    Files are identified by a generated file ID. The API only splits them
+    into byte ranges aligned on line boundaries, without parsing them, and
+    the workers read their own range directly from the shared directory.
+    Records are expected to fit on a single line, as quoted fields spanning
+    several lines could be split across two ranges.
+
+    Attributes:
+        root (Path): The directory holding the uploaded files.
+    """
+
+    def __init__(self, root: str = UPLOAD_STORAGE_DIR):
+        self.root = Path(root)
+
+    def path(self, file_id: str) -> Path:
+        """
+        Returns the path of a stored file.
+
+        Args:
+            file_id (str): The ID of the file.
+
+        Returns:
+            Path: The path of the file.
+        """
+        return self.root / f"{file_id}.csv"
+
+    def save(self, fileobj: BinaryIO) -> str:
+        """
+        Copies an uploaded file into the storage directory.
+
+        Args:
+            fileobj (BinaryIO): The uploaded file, read from its start.
+
+        Returns:
+            str: The ID of the stored file.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        file_id = uuid4().hex
+        fileobj.seek(0)
+        with open(self.path(file_id), "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return file_id
+
+    def delete(self, file_id: str) -> None:
+        """
+        Removes a stored file, if it exists.
+
+        Args:
+            file_id (str): The ID of the file.
+        """
+        self.path(file_id).unlink(missing_ok=True)
+
+    def read_header(self, file_id: str) -> bytes:
+        """
+        Returns the header line of a stored file.
+
+        Args:
+            file_id (str): The ID of the file.
+
+        Returns:
+            bytes: The first line of the file, newline included.
+        """
+        with open(self.path(file_id), "rb") as f:
+            return f.readline()
+
+    def plan_ranges(
+        self, file_id: str, range_bytes: int = CLAIM_CHECK_RANGE_BYTES
+    ) -> list[tuple[int, int]]:
+        """
+        Splits the data rows of a stored file into byte ranges.
+
+        Each range starts roughly `range_bytes` after the previous one and
+        is extended to the end of its last line, so that no row is split.
+        Only the bytes around each boundary are read.
+
+        Args:
+            file_id (str): The ID of the file.
+            range_bytes (int): The approximate size of each range.
+
+        Returns:
+            list[tuple[int, int]]: The (offset, length) of each range.
+        """
+        ranges = []
+        with open(self.path(file_id), "rb") as f:
+            size = f.seek(0, 2)
+            f.seek(0)
+            f.readline()
+            start = f.tell()
+            while start < size:
+                f.seek(min(start + range_bytes, size) - 1)
+                f.readline()
+                end = f.tell()
+                ranges.append((start, end - start))
+                start = end
+        return ranges
+
+    def range_digests(
+        self, file_id: str, ranges: list[tuple[int, int]]
+    ) -> list[str]:
+        """
+        Computes the digest of each range of a stored file, in a single
+        sequential read.
+
+        The digest of a range is the SHA-256 of the file from its first
+        byte up to the end of the range (see
+        `app.utils.checkpoint.ChunkCheckpoint`).
+
+        Args:
+            file_id (str): The ID of the file.
+            ranges (list[tuple[int, int]]): The (offset, length) of each
+            range, in file order, as returned by `plan_ranges`.
+
+        Returns:
+            list[str]: The hex digest of each range.
+        """
+        digests = []
+        digest = sha256()
+        with open(self.path(file_id), "rb") as f:
+            position = 0
+            for offset, length in ranges:
+                end = offset + length
+                while position < end:
+                    data = f.read(min(INGESTION_READ_SIZE, end - position))
+                    if not data:
+                        break
+                    digest.update(data)
+                    position += len(data)
+                digests.append(digest.hexdigest())
+        return digests
+
+    def read_range(self, file_id: str, offset: int, length: int) -> bytes:
+        """
+        Reads a byte range of a stored file through a memory map.
+
+        Args:
+            file_id (str): The ID of the file.
+            offset (int): The offset of the range.
+            length (int): The length of the range.
+
+        Returns:
+            bytes: The content of the range.
+        """
+        with open(self.path(file_id), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.seek(offset)
+                return mm.read(length)
@@ -0,0 +1,487 @@
+import time
+from typing import Optional
+from uuid import uuid4
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config.settings import (
+    ACTIVE_JOB_TTL,
+    ACTIVE_JOBS_KEY,
+    CHUNK_ERROR_SAMPLES,
+    JOB_KEY_PREFIX,
+)
+from app.utils.chunking import record_row_seconds
+
+JOB_COUNTERS = ("processed", "duplicates", "failed")
+COMPLETION_FIELDS = ("status", "dispatched_chunks", "completed_chunks")
+
+
+class JobTracker:
+    """
+    Tracks the progress of upload jobs in Redis hashes.
+
+    Each job is a hash at `<prefix><job ID>`. The API records the chunks
+    and rows it dispatches, and each worker adds the counters of the chunk
+    it completed (see `app.tasks.tasks.chunk_summary`) with a single
+    pipelined round-trip of increments, so tracking adds no lock to the
+    hot path. Throughput and ETA are derived when the job is read.
+
+    Completion is detected from the same counters, without storing the
+    results of the chunk tasks: the round-trip of each chunk, and the one
+    marking the job as dispatched, read back the status and the number of
+    dispatched and completed chunks. Whichever sees the last chunk
+    completed claims the completion of the job (see `claim_completion`),
+    so that exactly one caller triggers what follows it.
+
+    The error samples of the chunks are pushed on a list next to the job
+    hash, at `<prefix><job ID>:errors`, trimmed in the same round-trip to
+    the `max_errors` most recent ones.
+
+    Attributes:
+        client (Redis): The Redis client.
+        prefix (str): The prefix of the job keys.
+        active_key (str): The key of the set of jobs being dispatched.
+        active_ttl (float): Seconds after which a job being dispatched
+        without a heartbeat is no longer counted.
+        max_errors (int): The number of error samples kept per job.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        prefix: str = JOB_KEY_PREFIX,
+        active_key: str = ACTIVE_JOBS_KEY,
+        active_ttl: float = ACTIVE_JOB_TTL,
+        max_errors: int = CHUNK_ERROR_SAMPLES,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.active_key = active_key
+        self.active_ttl = active_ttl
+        self.max_errors = max_errors
+
+    def key(self, job_id: str) -> str:
+        """
+        Returns the Redis key of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            str: The key of the job hash.
+        """
+        return f"{self.prefix}{job_id}"
+
+    def errors_key(self, job_id: str) -> str:
+        """
+        Returns the Redis key of the error samples of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            str: The key of the list of error samples.
+        """
+        return f"{self.key(job_id)}:errors"
+
+    def create(self, filename: str, file_id: Optional[str] = None) -> str:
+        """
+        Creates a new running job.
+
+        Args:
+            filename (str): The name of the uploaded file.
+            file_id (str, optional): The ID of the file kept in the upload
+            storage for the job, in claim-check mode, to be deleted once
+            the job ends (see `stored_file`).
+
+        Returns:
+            str: The ID of the job.
+        """
+        job_id = uuid4().hex
+        fields = {
+            "file": filename,
+            "status": "running",
+            "created_at": time.time(),
+        }
+        if file_id is not None:
+            fields["file_id"] = file_id
+        self.client.hset(self.key(job_id), mapping=fields)
+        return job_id
+
+    def stored_file(self, job_id: str) -> Optional[str]:
+        """
+        Returns the ID of the file kept in the upload storage for a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            str | None: The ID of the stored file, or None if the job has
+            none.
+        """
+        return self.client.hget(self.key(job_id), "file_id")
+
+    def record_dispatch(
+        self, job_id: str, chunks: int, rows: int, client=None
+    ) -> None:
+        """
+        Records chunks dispatched to the workers.
+
+        Args:
+            job_id (str): The ID of the job.
+            chunks (int): The number of dispatched chunks.
+            rows (int): The number of dispatched rows, or 0 if unknown.
+            client: A pipeline to queue the increments on, instead of
+            sending them right away.
+        """
+        client = client if client is not None else self.client
+        client.hincrby(self.key(job_id), "dispatched_chunks", chunks)
+        if rows:
+            client.hincrby(self.key(job_id), "dispatched_rows", rows)
+
+    def mark_dispatched(self, job_id: str) -> bool:
+        """
+        Marks a job as fully dispatched, so that it completes once all of
+        its chunks are.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            bool: Whether all the chunks of the job had already completed,
+            and the caller claimed its completion.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.hset(self.key(job_id), "status", "dispatched")
+        pipeline.hmget(self.key(job_id), COMPLETION_FIELDS)
+        return self.claim_completion(job_id, pipeline.execute()[-1])
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """
+        Marks a job as failed.
+
+        Args:
+            job_id (str): The ID of the job.
+            error (str): The error message.
+        """
+        self.client.hset(
+            self.key(job_id), mapping={"status": "failed", "error": error}
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job. The flag is kept apart from the status, so that it
+        is never overwritten by the dispatcher.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            bool: Whether the job exists.
+        """
+        if not self.client.exists(self.key(job_id)):
+            return False
+        self.client.hset(self.key(job_id), "cancelled", 1)
+        return True
+
+    def is_cancelled(self, job_id: str) -> bool:
+        """
+        Returns whether a job has been cancelled.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            bool: Whether the job has been cancelled.
+        """
+        return bool(self.client.hexists(self.key(job_id), "cancelled"))
+
+    def dispatch_state(self, job_id: str) -> tuple[bool, int, int]:
+        """
+        Returns what a dispatcher needs to know about a job, in a single
+        round-trip, and records the job as being dispatched (see
+        `heartbeat`).
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            tuple[bool, int, int]: Whether the job has been cancelled, its
+            number of completed chunks, and the number of jobs being
+            dispatched, this one included.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.hmget(self.key(job_id), ["cancelled", "completed_chunks"])
+        self.heartbeat(job_id, client=pipeline)
+        pipeline.zcard(self.active_key)
+        (cancelled, completed_chunks), *_, active_jobs = pipeline.execute()
+        return cancelled is not None, int(completed_chunks or 0), active_jobs
+
+    def heartbeat(self, job_id: str, client=None) -> None:
+        """
+        Records a job as being dispatched.
+
+        Jobs being dispatched are kept in a sorted set scored by the time
+        of their last heartbeat, and those without a heartbeat for
+        `active_ttl` seconds are dropped from it, so that a crashed
+        dispatcher does not hold its share of the dispatch capacity.
+
+        Args:
+            job_id (str): The ID of the job.
+            client: A pipeline to queue the commands on, instead of
+            sending them right away.
+        """
+        client = client if client is not None else self.client
+        now = time.time()
+        client.zadd(self.active_key, {job_id: now})
+        client.zremrangebyscore(
+            self.active_key, "-inf", f"({now - self.active_ttl}"
+        )
+
+    def finish_dispatch(self, job_id: str) -> None:
+        """
+        Records that a job is no longer being dispatched.
+
+        Args:
+            job_id (str): The ID of the job.
+        """
+        self.client.zrem(self.active_key, job_id)
+
+    def record_chunk(
+        self,
+        job_id: str,
+        summary: dict,
+        seconds: Optional[float] = None,
+        client=None,
+    ) -> bool:
+        """
+        Adds the counters of a completed chunk to its job, in a single
+        round-trip, along with its error samples. When the processing time
+        of the chunk is given, it is also added, with the number of debts
+        it processed, to the processing stats shared by all jobs, from
+        which the size of the next chunks is derived (see
+        `app.utils.chunking.record_row_seconds`). Only processed debts are
+        counted, so that duplicates and invalid rows, which take almost no
+        time, do not lower the observed time per row.
+
+        The last command reads back the completion fields of the job. When
+        a pipeline is given, its caller must pass the last result of the
+        pipeline to `claim_completion`.
+
+        Args:
+            job_id (str): The ID of the job.
+            summary (dict): The counters and error samples of the chunk.
+            seconds (float, optional): The processing time of the chunk.
+            client: A pipeline to queue the commands on, instead of
+            sending them right away.
+
+        Returns:
+            bool: Whether the chunk was the last one of the job, and the
+            caller claimed its completion. Always False when a pipeline is
+            given.
+        """
+        key = self.key(job_id)
+        pipeline = (
+            client
+            if client is not None
+            else self.client.pipeline(transaction=False)
+        )
+        pipeline.hincrby(key, "completed_chunks", 1)
+        for counter in JOB_COUNTERS:
+            if summary.get(counter):
+                pipeline.hincrby(key, counter, summary[counter])
+        pipeline.hset(key, "updated_at", time.time())
+        errors = summary.get("errors")
+        if errors and self.max_errors:
+            errors_key = self.errors_key(job_id)
+            pipeline.lpush(errors_key, *errors[: self.max_errors])
+            pipeline.ltrim(errors_key, 0, self.max_errors - 1)
+        if seconds is not None and summary.get("processed"):
+            record_row_seconds(pipeline, summary["processed"], seconds)
+        pipeline.hmget(key, COMPLETION_FIELDS)
+        if client is not None:
+            return False
+        return self.claim_completion(job_id, pipeline.execute()[-1])
+
+    def claim_completion(self, job_id: str, fields: list) -> bool:
+        """
+        Claims the completion of a job, if it is fully dispatched and all
+        of its chunks completed. The claim is an `HSETNX` of its
+        `finished_at` field, so it succeeds once per job, even when
+        several callers see the job completed.
+
+        Args:
+            job_id (str): The ID of the job.
+            fields (list): The values of `COMPLETION_FIELDS`, as read after
+            recording the chunk or the end of the dispatch.
+
+        Returns:
+            bool: Whether the caller claimed the completion of the job.
+        """
+        state = dict(zip(COMPLETION_FIELDS, fields))
+        if state.get("status") != "dispatched" or int(
+            state.get("completed_chunks") or 0
+        ) < int(state.get("dispatched_chunks") or 0):
+            return False
+        return bool(
+            self.client.hsetnx(self.key(job_id), "finished_at", time.time())
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns the progress of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            dict | None: The file, status and counters of the job, along
+            with its throughput in rows per second and its estimated time
+            to completion in seconds, or None if the job does not exist.
+        """
+        fields = self.client.hgetall(self.key(job_id))
+        if not fields:
+            return None
+        return job_progress(job_id, fields)
+
+    def error_samples(self, job_id: str) -> list[str]:
+        """
+        Returns the error samples of a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            list[str]: At most `max_errors` error messages, the most
+            recent first.
+        """
+        return self.client.lrange(self.errors_key(job_id), 0, -1)
+
+
+class AsyncJobTracker:
+    """
+    Reads and cancels jobs from the event loop of the API, through a
+    `redis.asyncio` client, so that polling jobs takes no thread of the
+    pool. Jobs are the same hashes as those of `JobTracker`.
+
+    Attributes:
+        client (redis.asyncio.Redis): The asynchronous Redis client.
+        prefix (str): The prefix of the job keys.
+    """
+
+    def __init__(self, client: AsyncRedis, prefix: str = JOB_KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def key(self, job_id: str) -> str:
+        return f"{self.prefix}{job_id}"
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns the progress of a job (see `JobTracker.get`).
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            dict | None: The progress of the job, or None if the job does
+            not exist.
+        """
+        fields = await self.client.hgetall(self.key(job_id))
+        if not fields:
+            return None
+        return job_progress(job_id, fields)
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job (see `JobTracker.cancel`).
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            bool: Whether the job exists.
+        """
+        if not await self.client.exists(self.key(job_id)):
+            return False
+        await self.client.hset(self.key(job_id), "cancelled", 1)
+        return True
+
+
+def job_progress(
+    job_id: str, fields: dict, now: Optional[float] = None
+) -> dict:
+    """
+    Derives the progress of a job from the fields of its hash.
+
+    The job is completed once it is fully dispatched and every dispatched
+    chunk has been completed, and cancelled if it was cancelled before
+    completing. The ETA is based on the remaining rows when
+    the number of dispatched rows is known, and on the remaining chunks
+    otherwise (in claim-check mode, rows are not counted by the API).
+
+    Args:
+        job_id (str): The ID of the job.
+        fields (dict): The fields of the job hash.
+        now (float, optional): The current time, as a Unix timestamp.
+
+    Returns:
+        dict: The progress of the job.
+    """
+    counters = {
+        name: int(fields.get(name, 0))
+        for name in (
+            "dispatched_chunks",
+            "dispatched_rows",
+            "completed_chunks",
+            *JOB_COUNTERS,
+        )
+    }
+    status = fields.get("status", "running")
+    if (
+        status == "dispatched"
+        and counters["completed_chunks"] >= counters["dispatched_chunks"]
+    ):
+        status = "completed"
+    elif "cancelled" in fields:
+        status = "cancelled"
+
+    created_at = float(fields.get("created_at", 0))
+    if status == "completed":
+        end = float(fields.get("updated_at", created_at))
+    else:
+        end = now if now is not None else time.time()
+    elapsed = max(end - created_at, 0.0)
+
+    done_rows = sum(counters[name] for name in JOB_COUNTERS)
+    rows_per_second = done_rows / elapsed if elapsed else 0.0
+
+    eta_seconds = None
+    if status == "completed":
+        eta_seconds = 0.0
+    elif status in ("running", "dispatched") and counters["completed_chunks"]:
+        if counters["dispatched_rows"] and rows_per_second:
+            remaining_rows = max(counters["dispatched_rows"] - done_rows, 0)
+            eta_seconds = remaining_rows / rows_per_second
+        else:
+            remaining_chunks = max(
+                counters["dispatched_chunks"] - counters["completed_chunks"],
+                0,
+            )
+            eta_seconds = (
+                elapsed * remaining_chunks / counters["completed_chunks"]
+            )
+
+    progress = {
+        "job_id": job_id,
+        "file": fields.get("file"),
+        "status": status,
+        **counters,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_per_second, 1),
+        "eta_seconds": None if eta_seconds is None else round(eta_seconds, 1),
+    }
+    if "error" in fields:
+        progress["error"] = fields["error"]
+    return progress
@@ -1,20 +1,200 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
+from app.config.settings import (
+    DEBT_LOG_MODE,
+    DEBT_LOG_SAMPLE_RATE,
+    LOG_FORMAT,
+    LOG_QUEUE_ENABLED,
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes of every LogRecord, to tell them apart from the fields passed
+# through `extra`.
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON objects, with the fields passed
+    through `extra` as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in record.__dict__.items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler leaving the formatting of records to the listener thread.
+
+    The base `QueueHandler` formats each record in the logging thread, so
+    that it can be pickled. Records here stay in the process, so the
+    calling thread only pays for creating the record and enqueuing it.
+    Arguments must therefore not be mutated after being logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through a random fraction of the records.
+
+    Attributes:
+        rate (float): The fraction of records to keep, between 0 and 1.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return random.random() < self.rate
+
+
+class LogQueue:
+    """
+    Writes records from a background thread, so that logging never blocks
+    the caller on I/O.
+
+    The listener thread does not survive a fork, so a new queue and
+    listener are started in child processes, such as the prefork workers
+    of Celery.
+    """
+
+    def __init__(self, handlers: list[logging.Handler]):
+        self.handler = DeferredQueueHandler(queue.SimpleQueue())
+        self.handlers = handlers
+        self.listener: Optional[QueueListener] = None
+
+    def start(self) -> None:
+        self.listener = QueueListener(
+            self.handler.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_in_child(self) -> None:
+        self.handler.queue = queue.SimpleQueue()
+        self.start()
+
+
+_log_queue: Optional[LogQueue] = None
+
+
+def _restart_log_queue_in_child() -> None:
+    if _log_queue is not None:
+        _log_queue.restart_in_child()
+
+
+def _stop_log_queue() -> None:
+    if _log_queue is not None:
+        _log_queue.stop()
+
+
+os.register_at_fork(after_in_child=_restart_log_queue_in_child)
+atexit.register(_stop_log_queue)
+
+
+def configure_debt_logger(
+    mode: str = DEBT_LOG_MODE, sample_rate: float = DEBT_LOG_SAMPLE_RATE
+) -> logging.Logger:
+    """
+    Configures the logger of per-debt records, whose volume grows with the
+    number of rows.
+
+    Args:
+        mode (str): "all" to log every debt, "sample" to log a random
+        `sample_rate` fraction of them, or "summary" to only log the
+        summary record of each chunk (the per-debt records are then
+        discarded before being created).
+        sample_rate (float): The fraction of per-debt records to keep in
+        "sample" mode.
+
+    Returns:
+        logging.Logger: The per-debt logger.
+    """
+    debt_logger = logging.getLogger(f"{__name__}.debts")
+    for log_filter in list(debt_logger.filters):
+        debt_logger.removeFilter(log_filter)
+    if mode == "summary":
+        debt_logger.setLevel(logging.WARNING)
+    else:
+        debt_logger.setLevel(logging.NOTSET)
+    if mode == "sample":
+        debt_logger.addFilter(SamplingFilter(sample_rate))
+    return debt_logger
+
+
+def configure_logging(
+    log_format: str = LOG_FORMAT, use_queue: bool = LOG_QUEUE_ENABLED
+):
+    """
+    Configures the logger of the application.
+
+    Args:
+        log_format (str): "json" for one JSON object per line, or "text".
+        use_queue (bool): Whether to write records from a background
+        thread (see `LogQueue`).
+
+    Returns:
+        logging.Logger: The logger of the application.
+    """
+    global _log_queue
 
-def configure_logging():
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.INFO)
 
-    log_format = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    if log_format == "json":
+        log_format = JsonFormatter()
+    else:
+        log_format = logging.Formatter(TEXT_FORMAT)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(log_format)
-    logger.addHandler(console_handler)
+
+    _stop_log_queue()
+    _log_queue = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if use_queue:
+        _log_queue = LogQueue([console_handler])
+        _log_queue.start()
+        logger.addHandler(_log_queue.handler)
+    else:
+        logger.addHandler(console_handler)
 
     return logger
 
 
 logger = configure_logging()
+debt_logger = configure_debt_logger()
@@ -0,0 +1,171 @@
+import os
+import time
+from typing import Optional
+
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    worker_init,
+    worker_process_shutdown,
+)
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+from app.config.settings import WORKER_METRICS_PORT
+
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+LONG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SHORT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1,
+)
+
+UPLOAD_PARSE_SECONDS = Histogram(
+    "upload_parse_seconds",
+    "Time taken to parse an uploaded file into chunks.",
+    ["endpoint"],
+    buckets=LONG_BUCKETS,
+)
+JOB_DISPATCH_SECONDS = Histogram(
+    "job_dispatch_seconds",
+    "Time taken to dispatch all the chunks of a job, including the time "
+    "spent waiting for the workers to catch up.",
+    buckets=LONG_BUCKETS,
+)
+CHUNK_TASK_SECONDS = Histogram(
+    "chunk_task_seconds",
+    "Time taken by each task processing a chunk.",
+    ["task"],
+    buckets=LONG_BUCKETS,
+)
+CHUNK_SECONDS = Histogram(
+    "chunk_processing_seconds",
+    "Processing time of completed chunks, over all the stages.",
+    buckets=LONG_BUCKETS,
+)
+DEBT_SECONDS = Histogram(
+    "debt_processing_seconds",
+    "Average processing time per debt of each completed chunk.",
+    buckets=SHORT_BUCKETS,
+)
+DEBTS_PROCESSED = Counter("debts_processed", "Debts successfully processed.")
+DEDUP_HITS = Counter(
+    "dedup_hits",
+    "Debts skipped as already processed, being processed, or repeated "
+    "in their chunk.",
+)
+DEBT_FAILURES = Counter("debt_failures", "Invalid or failed debts.")
+CHUNK_FAILURES = Counter(
+    "chunk_failures", "Chunks that failed as a whole.", ["task"]
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Latency of Redis calls, by command. Pipelines are timed as a whole.",
+    ["command"],
+    buckets=SHORT_BUCKETS,
+)
+BROKER_PUBLISH_SECONDS = Histogram(
+    "broker_publish_seconds",
+    "Time taken to publish a task message to the broker.",
+    ["task"],
+    buckets=SHORT_BUCKETS,
+)
+
+_publish_started: dict[str, float] = {}
+
+
+def record_chunk_metrics(summary: dict, seconds: float) -> None:
+    """
+    Records the counters of a completed chunk, and its processing time in
+    total and per debt.
+
+    Args:
+        summary (dict): The counters of the chunk (see
+        `app.tasks.tasks.chunk_summary`).
+        seconds (float): The processing time of the chunk.
+    """
+    DEBTS_PROCESSED.inc(summary.get("processed", 0))
+    DEDUP_HITS.inc(summary.get("duplicates", 0))
+    DEBT_FAILURES.inc(summary.get("failed", 0))
+    CHUNK_SECONDS.observe(seconds)
+    rows = sum(
+        summary.get(key, 0) for key in ("processed", "duplicates", "failed")
+    )
+    if rows:
+        DEBT_SECONDS.observe(seconds / rows)
+
+
+@before_task_publish.connect
+def start_publish_timer(headers: Optional[dict] = None, **kwargs) -> None:
+    if headers and "id" in headers:
+        _publish_started[headers["id"]] = time.perf_counter()
+
+
+@after_task_publish.connect
+def observe_publish(
+    sender: Optional[str] = None, headers: Optional[dict] = None, **kwargs
+) -> None:
+    started = _publish_started.pop((headers or {}).get("id"), None)
+    if started is not None:
+        BROKER_PUBLISH_SECONDS.labels(sender or "unknown").observe(
+            time.perf_counter() - started
+        )
+
+
+def multiprocess_dir() -> Optional[str]:
+    return os.environ.get(MULTIPROCESS_DIR_ENV) or None
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Returns the registry to expose.
+
+    With the prefork pool, each worker process has its own metrics. When
+    `PROMETHEUS_MULTIPROC_DIR` is set, processes write their metrics to
+    that directory, and they are aggregated on collection.
+
+    Returns:
+        CollectorRegistry: A registry aggregating the metrics of all
+        processes in multiprocess mode, or the default registry otherwise.
+    """
+    if multiprocess_dir() is None:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+@worker_init.connect
+def start_worker_exporter(**kwargs) -> None:
+    """
+    Serves the metrics of a Celery worker on `WORKER_METRICS_PORT`, from
+    its main process. In multiprocess mode, the directory must be emptied
+    before the worker starts, as the metrics files of a previous run would
+    be aggregated too.
+    """
+    if not WORKER_METRICS_PORT:
+        return
+    start_http_server(WORKER_METRICS_PORT, registry=metrics_registry())
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid: Optional[int] = None, **kwargs) -> None:
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -1,19 +1,195 @@
-from redis import Redis
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import redis.asyncio
+from redis import BlockingConnectionPool, Redis
+from redis.client import Pipeline
+
+from app.config.settings import (
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_URL,
+)
+from app.utils.metrics import REDIS_COMMAND_SECONDS
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True) -> list:
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(
+                time.perf_counter() - started
+            )
+
+
+class InstrumentedRedis(Redis):
+    """
+    Redis client recording the latency of each call, by command, in
+    `app.utils.metrics.REDIS_COMMAND_SECONDS`.
+    """
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(
+                time.perf_counter() - started
+            )
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
+
+
+class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(
+                time.perf_counter() - started
+            )
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+    """
+    Asynchronous counterpart of `InstrumentedRedis`.
+    """
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(str(args[0]).upper()).observe(
+                time.perf_counter() - started
+            )
+
+    def pipeline(
+        self, transaction=True, shard_hint=None
+    ) -> redis.asyncio.client.Pipeline:
+        return InstrumentedAsyncPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
+
+
+def pool_options() -> dict:
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "decode_responses": True,
+    }
+
+
+def create_redis_client(url: str = REDIS_URL, **options) -> Redis:
+    """
+    Builds a Redis client backed by a bounded connection pool.
+
+    Threads needing a connection while all `REDIS_MAX_CONNECTIONS` are in
+    use wait up to `REDIS_POOL_TIMEOUT` seconds for one to be released,
+    instead of opening ever more connections.
+
+    Args:
+        url (str): The URL of the Redis server.
+        **options: Options overriding those of the pool and connections.
+
+    Returns:
+        Redis: The client.
+    """
+    pool = BlockingConnectionPool.from_url(
+        url, **{**pool_options(), **options}
+    )
+    return InstrumentedRedis(connection_pool=pool)
+
+
+def create_async_redis_client(
+    url: str = REDIS_URL, **options
+) -> redis.asyncio.Redis:
+    """
+    Builds a `redis.asyncio` client backed by a bounded connection pool,
+    for coroutines running in the event loop of the API.
+
+    Args:
+        url (str): The URL of the Redis server.
+        **options: Options overriding those of the pool and connections.
+
+    Returns:
+        redis.asyncio.Redis: The client.
+    """
+    pool = redis.asyncio.BlockingConnectionPool.from_url(
+        url, **{**pool_options(), **options}
+    )
+    return InstrumentedAsyncRedis(connection_pool=pool)
+
+
+@contextmanager
+def redis_batch(client: Redis) -> Iterator[Pipeline]:
+    """
+    Queues commands on a pipeline, sent in a single round-trip when the
+    block exits without error.
+
+    Methods accepting a `client` argument, such as
+    `app.utils.jobs.JobTracker.record_chunk`, can be given the pipeline to
+    group their commands with others.
+
+    Args:
+        client (Redis): The Redis client.
+
+    Yields:
+        Pipeline: A non-transactional pipeline.
+    """
+    pipeline = client.pipeline(transaction=False)
+    yield pipeline
+    pipeline.execute()
 
 
 class RedisClient:
-    _instance = None
+    _instance: Optional[Redis] = None
+    _async_instance: Optional[redis.asyncio.Redis] = None
 
     @staticmethod
-    def get_instance():
+    def get_instance() -> Redis:
         if RedisClient._instance is None:
-            RedisClient._instance = Redis(
-                host="redis",
-                port=6379,
-                db=0,
-                decode_responses=True,
-            )
+            RedisClient._instance = create_redis_client()
         return RedisClient._instance
 
+    @staticmethod
+    def get_async_instance() -> redis.asyncio.Redis:
+        if RedisClient._async_instance is None:
+            RedisClient._async_instance = create_async_redis_client()
+        return RedisClient._async_instance
+
+    @staticmethod
+    def reset_after_fork() -> None:
+        """
+        Drops the connections inherited from the parent process, such as
+        the Celery master before it forks its pool, so that the child never
+        shares a socket with it.
+        """
+        for client in (RedisClient._instance, RedisClient._async_instance):
+            if client is not None:
+                client.connection_pool.reset()
+
+
+os.register_at_fork(after_in_child=RedisClient.reset_after_fork)
 
 redis_client = RedisClient.get_instance()
+async_redis_client = RedisClient.get_async_instance()
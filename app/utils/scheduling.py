@@ -0,0 +1,64 @@
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+
+from app.config.settings import DUE_DATE_PRIORITIES
+from app.utils.serialization import ChunkData
+from app.utils.validation import parse_datetimes
+
+
+def due_date_priority(
+    days_until_due: Optional[int],
+    priorities: tuple[tuple[int, int], ...] = DUE_DATE_PRIORITIES,
+) -> int:
+    """
+    Maps the number of days left until a due date to a task priority.
+
+    Args:
+        days_until_due (int | None): Days until the earliest due date,
+        negative if overdue, or None if unknown.
+        priorities (tuple[tuple[int, int], ...]): (maximum days, priority)
+        pairs, by increasing number of days.
+
+    Returns:
+        int: The priority, from 0 (lowest) up to `TASK_MAX_PRIORITY`.
+    """
+    if days_until_due is None:
+        return 0
+    for max_days, priority in priorities:
+        if days_until_due <= max_days:
+            return priority
+    return 0
+
+
+def chunk_priority(chunk_data: ChunkData, today: Optional[date] = None) -> int:
+    """
+    Returns the priority of a chunk, from its most urgent debt.
+
+    Chunks holding debts due soon are processed first by the workers, so
+    that urgent notices are not delayed behind debts due next month (see
+    `DUE_DATE_PRIORITIES`). Invalid due dates are ignored.
+
+    Args:
+        chunk_data (dict | list): A chunk in columnar format, or a list
+        of records.
+        today (date, optional): The current date, in UTC.
+
+    Returns:
+        int: The priority of the chunk.
+    """
+    if isinstance(chunk_data, dict):
+        columns = chunk_data["columns"]
+        if "debtDueDate" not in columns:
+            return 0
+        due_dates = chunk_data["data"][columns.index("debtDueDate")]
+    else:
+        due_dates = [record.get("debtDueDate") for record in chunk_data]
+
+    dates, valid = parse_datetimes(pd.Series(due_dates))
+    if not valid.any():
+        return 0
+    earliest = pd.to_datetime(dates[valid], utc=True).min().date()
+    today = today or pd.Timestamp.now(tz="UTC").date()
+    return due_date_priority((earliest - today).days)
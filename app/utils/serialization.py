@@ -0,0 +1,107 @@
+import json
+import zlib
+from typing import Iterator, Union
+
+import pandas as pd
+from kombu.serialization import register
+
+COLUMNAR_SERIALIZER = "columnar"
+COLUMNAR_CONTENT_TYPE = "application/x-columnar+zlib"
+
+ChunkData = Union[dict, list]
+
+
+def to_columnar(frame: pd.DataFrame) -> dict:
+    """
+    Converts a chunk of rows into its columnar wire format.
+
+    Field names are stored once, and each column as a plain list of values,
+    instead of one dictionary per row.
+
+    Args:
+        frame (pd.DataFrame): The chunk of rows.
+
+    Returns:
+        dict: A dictionary with the `columns` names and the `data` lists,
+        one per column.
+    """
+    return {
+        "columns": [str(column) for column in frame.columns],
+        "data": [frame[column].tolist() for column in frame.columns],
+    }
+
+
+def iter_records(chunk_data: ChunkData) -> Iterator[dict]:
+    """
+    Iterates over the records of a chunk, one dictionary per row.
+
+    Args:
+        chunk_data (dict | list): A chunk in columnar format, or a list
+        of records.
+
+    Returns:
+        Iterator[dict]: The records of the chunk.
+    """
+    if isinstance(chunk_data, dict):
+        columns = chunk_data["columns"]
+        for values in zip(*chunk_data["data"]):
+            yield dict(zip(columns, values))
+    else:
+        yield from chunk_data
+
+
+def count_records(chunk_data: ChunkData) -> int:
+    """
+    Returns the number of records of a chunk.
+
+    Args:
+        chunk_data (dict | list): A chunk in columnar format, or a list
+        of records.
+
+    Returns:
+        int: The number of records.
+    """
+    if isinstance(chunk_data, dict):
+        data = chunk_data["data"]
+        return len(data[0]) if data else 0
+    return len(chunk_data)
+
+
+def dumps_columnar(body) -> bytes:
+    """
+    Encodes a message body as compact, zlib-compressed JSON.
+
+    Args:
+        body: The message body, typically holding columnar chunks.
+
+    Returns:
+        bytes: The encoded body.
+    """
+    return zlib.compress(json.dumps(body, separators=(",", ":")).encode())
+
+
+def loads_columnar(data: bytes):
+    """
+    Decodes a message body encoded by `dumps_columnar`.
+
+    Args:
+        data (bytes): The encoded body.
+
+    Returns:
+        The decoded message body.
+    """
+    return json.loads(zlib.decompress(data))
+
+
+def register_columnar_serializer() -> None:
+    """
+    Registers the columnar serializer with Kombu, so that tasks can use
+    it with `serializer="columnar"`.
+    """
+    register(
+        COLUMNAR_SERIALIZER,
+        dumps_columnar,
+        loads_columnar,
+        content_type=COLUMNAR_CONTENT_TYPE,
+        content_encoding="binary",
+    )
@@ -0,0 +1,240 @@
+from typing import Optional
+from uuid import UUID
+
+import pandas as pd
+from pydantic import validate_email
+from pydantic_core import PydanticCustomError
+
+from app.utils.serialization import ChunkData
+
+DEBT_FIELDS = (
+    "name",
+    "governmentId",
+    "email",
+    "debtAmount",
+    "debtDueDate",
+    "debtId",
+)
+UUID_PATTERN = (
+    r"^(?:urn:uuid:)?\{?(?:[0-9a-fA-F]{32}|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}"
+    r"-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\}?$"
+)
+# Integers as accepted by pydantic: optional sign and surrounding spaces,
+# underscores between digits, and a fractional part made of zeros only.
+INTEGER_PATTERN = r"^\s*[+-]?\d+(?:_\d+)*(?:\.0+)?\s*$"
+TIMESTAMP_PATTERN = r"^[+-]?\d+(?:\.\d+)?$"
+ISO_DATETIME_PATTERN = (
+    r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?"
+    r"(?:Z|[+-]\d{2}:?\d{2})?)?$"
+)
+TIMEZONE_PATTERN = r"(?:Z|[+-]\d{2}:?\d{2})$"
+# Timestamps above this value are in milliseconds, as in pydantic.
+MILLISECONDS_THRESHOLD = 2e10
+
+
+def to_frame(chunk_data: ChunkData) -> pd.DataFrame:
+    """
+    Builds a DataFrame from a chunk, without going through one dictionary
+    per row for columnar chunks.
+
+    Args:
+        chunk_data (dict | list): A chunk in columnar format, or a list
+        of records.
+
+    Returns:
+        pd.DataFrame: The rows of the chunk.
+    """
+    if isinstance(chunk_data, dict):
+        return pd.DataFrame(
+            dict(zip(chunk_data["columns"], chunk_data["data"])),
+            columns=chunk_data["columns"],
+        )
+    return pd.DataFrame.from_records(chunk_data)
+
+
+def _is_string(column: pd.Series) -> pd.Series:
+    return column.map(type).eq(str)
+
+
+def _is_number(column: pd.Series) -> pd.Series:
+    return column.map(
+        lambda value: isinstance(value, (int, float))
+        and not isinstance(value, bool)
+    )
+
+
+def _to_integer(column: pd.Series) -> tuple[pd.Series, pd.Series]:
+    if pd.api.types.is_numeric_dtype(column):
+        numbers = pd.to_numeric(column, errors="coerce")
+    else:
+        text = column.where(_is_string(column))
+        integral = text.str.fullmatch(INTEGER_PATTERN, na=False)
+        numbers = pd.to_numeric(
+            text.where(integral).str.replace("_", "").str.strip(),
+            errors="coerce",
+        ).where(integral)
+        numbers = numbers.fillna(
+            pd.to_numeric(column.where(_is_number(column)), errors="coerce")
+        )
+    valid = numbers.notna() & numbers.eq(numbers.round())
+    return numbers.where(valid, 0).astype("int64"), valid
+
+
+def _from_timestamps(numbers: pd.Series) -> pd.Series:
+    seconds = numbers.where(
+        numbers.abs() <= MILLISECONDS_THRESHOLD, numbers / 1000
+    )
+    return pd.to_datetime(seconds, unit="s", utc=True, errors="coerce")
+
+
+def _normalize_email(value: str) -> Optional[str]:
+    try:
+        return validate_email(value)[1]
+    except PydanticCustomError:
+        return None
+
+
+def normalize_emails(column: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Validates and normalizes a column of email addresses like `EmailStr`,
+    through pydantic's `validate_email`. Each distinct address is only
+    validated once, as the same debtors often appear on many rows.
+
+    Args:
+        column (pd.Series): The raw values.
+
+    Returns:
+        tuple[pd.Series, pd.Series]: The normalized addresses (NaN where
+        invalid), and whether each value is a valid address.
+    """
+    text = column.where(_is_string(column))
+    unique = text.dropna().unique()
+    emails = text.map(
+        dict(zip(unique, map(_normalize_email, unique))), na_action="ignore"
+    )
+    return emails, emails.notna()
+
+
+def parse_datetimes(column: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Parses a column of ISO 8601 dates or Unix timestamps, with the same
+    rules as `DebtRecord`: timestamps may be numbers or numeric strings,
+    and are in milliseconds above `MILLISECONDS_THRESHOLD`.
+
+    Dates with a time zone are converted to UTC, and dates without one are
+    kept naive. When a column mixes both, the parsed column holds
+    `Timestamp` objects.
+
+    Args:
+        column (pd.Series): The raw values.
+
+    Returns:
+        tuple[pd.Series, pd.Series]: The parsed dates (NaT where invalid),
+        and whether each value is a valid date.
+    """
+    if pd.api.types.is_numeric_dtype(column) and not (
+        pd.api.types.is_bool_dtype(column)
+    ):
+        dates = _from_timestamps(pd.to_numeric(column, errors="coerce"))
+        return dates, dates.notna()
+
+    text = column.where(_is_string(column)).str.upper()
+    timestamp = _is_number(column) | text.str.fullmatch(
+        TIMESTAMP_PATTERN, na=False
+    )
+    iso = text.str.fullmatch(ISO_DATETIME_PATTERN, na=False)
+    aware = iso & text.str.contains(TIMEZONE_PATTERN, na=False)
+    naive = iso & ~aware
+
+    parts = [
+        _from_timestamps(pd.to_numeric(column[timestamp], errors="coerce")),
+        pd.to_datetime(
+            text[aware], format="ISO8601", utc=True, errors="coerce"
+        ),
+        pd.to_datetime(text[naive], format="ISO8601", errors="coerce"),
+    ]
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        dates = pd.Series(pd.NaT, index=column.index, dtype="datetime64[ns]")
+    else:
+        dates = pd.concat(parts).reindex(column.index)
+    return dates, dates.notna()
+
+
+def validate_chunk(frame: pd.DataFrame) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    Validates a chunk of debt rows column-wise, following the rules of
+    `DebtRecord`.
+
+    Each column is checked and coerced in a single vectorized pass instead
+    of building one `DebtRecord` per row: names must be strings, the
+    government ID and amount must be integral numbers, emails must be
+    valid addresses (see `normalize_emails`), due dates must be ISO 8601
+    dates or Unix timestamps, and debt IDs must be UUIDs. Emails are
+    normalized as by `EmailStr`, and debt IDs are canonicalized, lower
+    case with dashes, so that the same debt written differently is still
+    deduplicated.
+
+    Args:
+        frame (pd.DataFrame): The rows of the chunk.
+
+    Returns:
+        tuple[pd.DataFrame, list[dict]]: The valid rows, with coerced
+        dtypes, and one error per invalid row. Each error holds the `row`
+        index, the `debtId` ("Unknown" if missing) and an `error` message
+        listing the invalid fields.
+    """
+    checks = {}
+    coerced = {}
+    for field in DEBT_FIELDS:
+        if field not in frame:
+            missing = pd.Series(False, index=frame.index)
+            checks[field] = (missing, "Field required")
+            continue
+        column = frame[field]
+        if field in ("governmentId", "debtAmount"):
+            coerced[field], valid = _to_integer(column)
+            message = "Input should be a valid integer"
+        elif field == "debtDueDate":
+            coerced[field], valid = parse_datetimes(column)
+            message = "Input should be a valid datetime"
+        else:
+            valid = _is_string(column)
+            if field == "email":
+                coerced[field], valid = normalize_emails(column)
+                message = "value is not a valid email address"
+            elif field == "debtId":
+                valid &= column.where(valid, "").str.match(UUID_PATTERN)
+                coerced[field] = column.where(valid).map(
+                    lambda value: str(UUID(value)), na_action="ignore"
+                )
+                message = "Input should be a valid UUID"
+            else:
+                message = "Input should be a valid string"
+        checks[field] = (valid, message)
+
+    is_valid = pd.Series(True, index=frame.index)
+    for valid, _ in checks.values():
+        is_valid &= valid
+
+    errors = []
+    debt_ids = frame["debtId"] if "debtId" in frame else None
+    for row in frame.index[~is_valid]:
+        messages = [
+            f"{field}: {message}"
+            for field, (valid, message) in checks.items()
+            if not valid[row]
+        ]
+        debt_id = debt_ids[row] if debt_ids is not None else None
+        errors.append(
+            {
+                "row": row,
+                "debtId": "Unknown" if pd.isna(debt_id) else str(debt_id),
+                "error": "; ".join(messages),
+            }
+        )
+
+    valid_frame = frame.reindex(columns=list(DEBT_FIELDS)).loc[is_valid].copy()
+    for field, column in coerced.items():
+        valid_frame[field] = column[is_valid]
+    return valid_frame, errors
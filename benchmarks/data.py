@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.utils.validation import DEBT_FIELDS
+
+GENERATION_BLOCK_ROWS = 100_000
+
+
+def synthetic_debts(
+    rows: int, rng: np.random.Generator, start: int = 0
+) -> pd.DataFrame:
+    """
+    Generates valid synthetic debt rows, as in an uploaded file.
+
+    Args:
+        rows (int): The number of rows.
+        rng (np.random.Generator): The random generator.
+        start (int): The index of the first row, used in names and emails.
+
+    Returns:
+        pd.DataFrame: The rows, with the columns of `DEBT_FIELDS`.
+    """
+    index = np.arange(start, start + rows).astype(str)
+    hex_digits = rng.bytes(16 * rows).hex().encode()
+    hex_ids = pd.Series(np.frombuffer(hex_digits, dtype="S32").astype(str))
+    debt_ids = (
+        hex_ids.str[:8]
+        + "-"
+        + hex_ids.str[8:12]
+        + "-"
+        + hex_ids.str[12:16]
+        + "-"
+        + hex_ids.str[16:20]
+        + "-"
+        + hex_ids.str[20:]
+    )
+    due_dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 730, rows), unit="D"
+    )
+    return pd.DataFrame(
+        {
+            "name": np.char.add("Debtor ", index),
+            "governmentId": rng.integers(10**10, 10**11, rows),
+            "email": np.char.add(np.char.add("debtor", index), "@example.com"),
+            "debtAmount": rng.integers(100, 100_000, rows),
+            "debtDueDate": due_dates.strftime("%Y-%m-%d"),
+            "debtId": debt_ids,
+        },
+        columns=list(DEBT_FIELDS),
+    )
+
+
+def generate_csv(path: Path, rows: int, seed: int = 0) -> Path:
+    """
+    Writes a synthetic debt CSV file, block by block, so that files of
+    tens of millions of rows can be generated in bounded memory.
+
+    Args:
+        path (Path): The path of the file.
+        rows (int): The number of data rows.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        Path: The path of the file.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, GENERATION_BLOCK_ROWS):
+            block = synthetic_debts(
+                min(GENERATION_BLOCK_ROWS, rows - start), rng, start
+            )
+            block.to_csv(f, header=start == 0, index=False)
+        if rows == 0:
+            f.write(",".join(DEBT_FIELDS) + "\n")
+    return path
@@ -0,0 +1,330 @@
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from fastapi.testclient import TestClient
+from redis import Redis
+
+from app.celery import app
+from app.config.settings import CHUNK_BLOCK_ROWS, INGESTION_READ_SIZE
+from app.main import web_app
+from app.tasks.tasks import process_chunk_task
+from app.utils.chunking import ChunkSizer
+from app.utils.csv_stream import CsvChunkStream
+from app.utils.dedup import get_dedup_index
+from app.utils.jobs import JobTracker
+from app.utils.logger import logger
+from app.utils.redis_client import RedisClient
+from app.utils.serialization import to_columnar
+from benchmarks.data import synthetic_debts
+
+
+def make_redis(url: str) -> Redis:
+    """
+    Builds the Redis client of a benchmark run.
+
+    Args:
+        url (str): "fake" for an in-process fake Redis, or the URL of a
+        Redis server.
+
+    Returns:
+        Redis: The client.
+    """
+    if url == "fake":
+        import fakeredis
+
+        return fakeredis.FakeRedis(decode_responses=True)
+    return Redis.from_url(url, decode_responses=True)
+
+
+def is_fake(client: Redis) -> bool:
+    """
+    Returns whether a client is an in-process fake Redis, whose timings,
+    and those of its Lua scripts in particular, are not representative of
+    a Redis server.
+
+    Args:
+        client (Redis): The Redis client.
+
+    Returns:
+        bool: Whether the client is a `fakeredis` client.
+    """
+    return type(client).__module__.startswith("fakeredis")
+
+
+def configure_environment(client: Redis, quiet: bool = True) -> None:
+    """
+    Runs the whole pipeline in the current process: Celery tasks are
+    executed eagerly, and every module of the app imported so far uses
+    the given Redis client.
+
+    Args:
+        client (Redis): The Redis client.
+        quiet (bool): Whether to only log warnings and errors, so that
+        the output of the run is not flooded with chunk summaries.
+    """
+    app.set_default()
+    app.conf.task_always_eager = True
+    app.conf.task_eager_propagates = True
+    RedisClient._instance = client
+    for name, module in list(sys.modules.items()):
+        if name.startswith("app.") and hasattr(module, "redis_client"):
+            module.redis_client = client
+    if quiet:
+        logger.setLevel(logging.WARNING)
+
+
+def result(scenario: str, rows: int, seconds: float, **metrics) -> dict:
+    """
+    Builds the record of a measurement.
+
+    Args:
+        scenario (str): The name of the scenario.
+        rows (int): The number of rows handled.
+        seconds (float): The time taken.
+        **metrics: Other metrics of the scenario.
+
+    Returns:
+        dict: The record, with the throughput in rows per second.
+    """
+    return {
+        "scenario": scenario,
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        **metrics,
+    }
+
+
+def bench_ingest(path: Path, rows: int) -> dict:
+    """
+    Measures the parsing of an uploaded file into chunks, as done by the
+    upload endpoints, along with its peak Python memory usage.
+
+    Args:
+        path (Path): The CSV file.
+        rows (int): The number of data rows of the file.
+
+    Returns:
+        dict: The measurement.
+    """
+    stream = CsvChunkStream(
+        block_size=CHUNK_BLOCK_ROWS,
+        sizer=ChunkSizer(),
+        total_bytes=path.stat().st_size,
+    )
+    chunks = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(INGESTION_READ_SIZE), b""):
+            chunks += len(stream.feed(data))
+    chunks += len(stream.close())
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result(
+        "ingest",
+        rows,
+        seconds,
+        chunks=chunks,
+        peak_memory_mb=round(peak / 2**20, 1),
+    )
+
+
+def bench_chunk(chunk_rows: int, repeats: int = 5, seed: int = 1) -> dict:
+    """
+    Measures `process_chunk_task` on chunks of new debts.
+
+    Args:
+        chunk_rows (int): The number of rows per chunk.
+        repeats (int): The number of chunks to process.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        dict: The measurement, with the median time per chunk.
+    """
+    rng = np.random.default_rng(seed)
+    timings = []
+    for _ in range(repeats):
+        chunk = to_columnar(synthetic_debts(chunk_rows, rng))
+        started = time.perf_counter()
+        process_chunk_task(chunk)
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+    return result(
+        "chunk",
+        chunk_rows,
+        seconds,
+        repeats=repeats,
+        seconds_per_row=seconds / chunk_rows,
+    )
+
+
+def bench_dedup(
+    client: Redis,
+    total_rows: int,
+    batch_rows: int = 10_000,
+    samples: int = 10,
+    seed: int = 2,
+) -> list[dict]:
+    """
+    Measures the dedup index as the set of processed debts grows.
+
+    Batches of new IDs are claimed then committed until `total_rows` IDs
+    are processed, and the timings of a batch are recorded `samples`
+    times along the way.
+
+    Args:
+        client (Redis): The Redis client.
+        total_rows (int): The final number of processed debts.
+        batch_rows (int): The number of IDs per batch.
+        samples (int): The number of batches to record.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list[dict]: One measurement per recorded batch, with the size of
+        the processed set before the batch. Measurements taken on a fake
+        Redis are flagged as not representative.
+    """
+    rng = np.random.default_rng(seed)
+    index = get_dedup_index(client)
+    batch_rows = min(batch_rows, total_rows)
+    batches = max(total_rows // batch_rows, 1)
+    every = max(batches // samples, 1)
+    measurements = []
+    for batch in range(batches):
+        debt_ids = synthetic_debts(batch_rows, rng)["debtId"].tolist()
+        started = time.perf_counter()
+        claimed = index.claim(debt_ids)
+        claimed_at = time.perf_counter()
+        index.commit(claimed)
+        committed_at = time.perf_counter()
+        if batch % every == every - 1 or batch == batches - 1:
+            measurements.append(
+                result(
+                    "dedup",
+                    batch_rows,
+                    committed_at - started,
+                    processed_set_size=batch * batch_rows,
+                    claim_seconds=round(claimed_at - started, 6),
+                    commit_seconds=round(committed_at - claimed_at, 6),
+                    representative=not is_fake(client),
+                )
+            )
+    return measurements
+
+
+def bench_end_to_end(client: Redis, path: Path, rows: int) -> dict:
+    """
+    Measures the whole pipeline: the file is uploaded to
+    `/upload_csv/stream`, and its chunks are processed eagerly until its
+    job completes. The streaming endpoint never copies the file to disk
+    nor loads it in memory, so the peak Python memory usage of the upload,
+    processing included, is recorded too.
+
+    Args:
+        client (Redis): The Redis client.
+        path (Path): The CSV file.
+        rows (int): The number of data rows of the file.
+
+    Returns:
+        dict: The measurement.
+    """
+    with TestClient(web_app) as http, open(path, "rb") as f:
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = http.post(
+            "/upload_csv/stream", files={"file": (path.name, f, "text/csv")}
+        )
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    response.raise_for_status()
+    job = JobTracker(client).get(response.json()["job_id"])
+    return result(
+        "end_to_end",
+        rows,
+        seconds,
+        status=job["status"],
+        processed=job["processed"],
+        chunks=job["completed_chunks"],
+        peak_memory_mb=round(peak / 2**20, 1),
+    )
+
+
+def run_metadata(redis_url: str) -> dict:
+    """
+    Describes the environment of a benchmark run.
+
+    Args:
+        redis_url (str): The Redis used by the run.
+
+    Returns:
+        dict: The date, commit, Python version and platform of the run.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "redis": "fake" if redis_url == "fake" else "server",
+    }
+
+
+def result_key(record: dict) -> tuple:
+    return (
+        record["scenario"],
+        record["rows"],
+        record.get("processed_set_size"),
+    )
+
+
+def compare(
+    baseline: list[dict], current: list[dict], max_regression: float
+) -> list[str]:
+    """
+    Compares the throughput of two runs.
+
+    Args:
+        baseline (list[dict]): The measurements of the reference run.
+        current (list[dict]): The measurements of the new run.
+        max_regression (float): The tolerated throughput loss, as a
+        fraction of the baseline.
+
+    Returns:
+        list[str]: One message per measurement whose throughput dropped
+        by more than `max_regression`.
+    """
+    reference = {result_key(record): record for record in baseline}
+    regressions = []
+    for record in current:
+        previous = reference.get(result_key(record))
+        if not previous or not previous.get("rows_per_second"):
+            continue
+        before = previous["rows_per_second"]
+        after: Optional[float] = record.get("rows_per_second") or 0.0
+        if after < before * (1 - max_regression):
+            regressions.append(
+                f"{record['scenario']} ({record['rows']} rows): "
+                f"{after:.0f} rows/s, was {before:.0f} rows/s "
+                f"({after / before - 1:+.0%})"
+            )
+    return regressions
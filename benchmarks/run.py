@@ -0,0 +1,141 @@
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from app.config.settings import CHUNK_SIZE
+from benchmarks.data import generate_csv
+from benchmarks.harness import (
+    bench_chunk,
+    bench_dedup,
+    bench_end_to_end,
+    bench_ingest,
+    compare,
+    configure_environment,
+    make_redis,
+    run_metadata,
+)
+
+SCENARIOS = ("ingest", "chunk", "dedup", "end_to_end")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the ingestion and processing pipeline."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Sizes of the synthetic files, in rows.",
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--redis-url",
+        default="fake",
+        help='"fake" for an in-process fake Redis, or the URL of a '
+        "dedicated Redis database, flushed before each scenario.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        help="Where to keep the generated files, to reuse them across "
+        "runs. Defaults to a temporary directory.",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("benchmark_results.json")
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Results of a previous run, to compare the throughput with.",
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Keep the application logs."
+    )
+    return parser.parse_args(argv)
+
+
+def dataset(data_dir: Path, rows: int) -> Path:
+    path = data_dir / f"debts_{rows}.csv"
+    if not path.exists():
+        print(f"Generating {path}...")
+        generate_csv(path, rows)
+    return path
+
+
+def main(argv: list[str]) -> int:
+    """
+    Runs the selected benchmarks, writes their results as JSON and, given
+    a baseline, fails if the throughput regressed.
+
+    Args:
+        argv (list[str]): The command line arguments.
+
+    Returns:
+        int: The exit status: 1 if a regression was found, else 0.
+    """
+    args = parse_args(argv)
+    client = make_redis(args.redis_url)
+    configure_environment(client, quiet=not args.verbose)
+
+    temp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        data_dir = Path(temp_dir.name)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    try:
+        for scenario in args.scenarios:
+            client.flushdb()
+            if scenario == "chunk":
+                results.append(bench_chunk(args.chunk_rows))
+                continue
+            for rows in args.rows:
+                client.flushdb()
+                if scenario == "dedup":
+                    results.extend(bench_dedup(client, rows))
+                    continue
+                path = dataset(data_dir, rows)
+                if scenario == "ingest":
+                    results.append(bench_ingest(path, rows))
+                else:
+                    results.append(bench_end_to_end(client, path, rows))
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    for record in results:
+        print(json.dumps(record))
+    if args.redis_url == "fake" and "dedup" in args.scenarios:
+        print(
+            "Warning: the dedup timings were measured on fakeredis, whose "
+            "Lua emulation is orders of magnitude slower than Redis. Pass "
+            "--redis-url for representative numbers."
+        )
+    report = {**run_metadata(args.redis_url), "results": results}
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Results written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(baseline, results, args.max_regression)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))